@@ -6,6 +6,7 @@ import "@openzeppelin/contracts/access/Ownable.sol";
 
 contract NeuroWeaveNFT is ERC721URIStorage, Ownable {
     uint256 public nextTokenId;
+    uint256 public constant MAX_BATCH = 100;
 
     constructor() ERC721("NeuroWeave CoCreation", "NWEAVE") Ownable(msg.sender) {}
 
@@ -15,6 +16,42 @@ contract NeuroWeaveNFT is ERC721URIStorage, Ownable {
         _setTokenURI(tokenId, tokenUri);
     }
 
+    // Mints uris.length tokens with consecutive IDs in one transaction; token i goes to to[i].
+    function safeMintBatch(address[] calldata to, string[] calldata uris)
+        external
+        onlyOwner
+        returns (uint256 firstTokenId)
+    {
+        require(to.length == uris.length, "NeuroWeave: length mismatch");
+        firstTokenId = _reserve(uris.length);
+        for (uint256 i = 0; i < uris.length; ) {
+            _safeMint(to[i], firstTokenId + i);
+            _setTokenURI(firstTokenId + i, uris[i]);
+            unchecked { ++i; }
+        }
+    }
+
+    // Single-recipient variant: skips the address array in calldata.
+    function safeMintBatchTo(address to, string[] calldata uris)
+        external
+        onlyOwner
+        returns (uint256 firstTokenId)
+    {
+        firstTokenId = _reserve(uris.length);
+        for (uint256 i = 0; i < uris.length; ) {
+            _safeMint(to, firstTokenId + i);
+            _setTokenURI(firstTokenId + i, uris[i]);
+            unchecked { ++i; }
+        }
+    }
+
+    // The counter is written once per batch, before any onERC721Received callback runs.
+    function _reserve(uint256 count) private returns (uint256 firstTokenId) {
+        require(count > 0 && count <= MAX_BATCH, "NeuroWeave: bad batch size");
+        firstTokenId = nextTokenId;
+        nextTokenId = firstTokenId + count;
+    }
+
     function _baseURI() internal pure override returns (string memory) {
         return "ipfs://";
     }
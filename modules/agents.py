@@ -1,13 +1,22 @@
 import os
 import re
-import requests
-from urllib.parse import unquote, urlparse, parse_qs
-from typing import List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
 
 load_dotenv()
 
+# Imported after load_dotenv(): these modules read their settings from the environment.
+from modules.roles import MODES, SEQUENTIAL_MODES, SYSTEM_PRIMERS
+from modules.context import ContextWindow, CONTEXT_TOKEN_BUDGET
+from modules.convergence import ConvergenceDetector, NOVELTY_THRESHOLD
+from modules.llm_cache import cached_chat, get_cache, request_key
+from modules.scheduler import estimate_tokens, get_scheduler
+from modules.search import get_search_client
+from modules.enrich import Article, get_enricher, rank_articles
+from modules import telemetry
+
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 USE_OPENAI = bool(OPENAI_KEY)
 
@@ -16,122 +25,278 @@ def _client_openai():
     global _client
     if _client is None:
         from openai import OpenAI
-        _client = OpenAI(api_key=OPENAI_KEY)
+        _client = OpenAI(api_key=OPENAI_KEY, max_retries=0)  # retries live in modules.scheduler
     return _client
 
 # ------------------- MULTI-AGENT SYSTEM -------------------
-SYSTEM_PRIMERS = {
-    "Creative": "You are CreativeAI. Generate bold, novel, visual ideas.",
-    "Logic": "You are LogicAI. Structure, validate, and make plans.",
-    "Empathy": "You are EmpathAI. Understand human perspectives and emotions.",
-    "Data": "You are DataAI. Back insights with evidence and metrics.",
-}
-
-MODES = {
-    "Planner (Structured)": ["Logic", "Data", "Empathy", "Creative"],
-    "Debate (Critical)": ["Logic", "Creative", "Data"],
-    "Brainstorm (Divergent)": ["Creative", "Empathy", "Data", "Logic"],
-}
+# Personas and modes live in modules.roles; re-exported here for existing imports.
+SYNTHESIS_GROUP_SIZE = int(os.getenv("SYNTHESIS_GROUP_SIZE", "6"))
+# Search results fetched and ranked against the consensus for "related articles".
+ARTICLE_CANDIDATES = int(os.getenv("ARTICLE_CANDIDATES", "8"))
 
 # ------------------- CORE LLM AGENTS -------------------
-def _llm_call(prompt: str, temperature: float = 0.7, max_tokens: int = 900) -> str:
+def _messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": "Be concise, insightful, and actionable."},
+        {"role": "user", "content": prompt},
+    ]
+
+def _llm_call(prompt: str, temperature: float = 0.7, max_tokens: int = 900, label: str = "llm") -> str:
     """Run OpenAI call if available; otherwise return prompt preview."""
     if not USE_OPENAI:
         return prompt[:200] + " [...]"
-    client = _client_openai()
-    out = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "Be concise, insightful, and actionable."},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=temperature,
-        max_tokens=max_tokens,
+    return cached_chat(_client_openai(), _messages(prompt), temperature=temperature,
+                       max_tokens=max_tokens, label=label)
+
+def _llm_stream(prompt: str, temperature: float = 0.7, max_tokens: int = 900,
+                label: str = "llm") -> Iterator[str]:
+    """Streaming variant of _llm_call: yields text deltas as they arrive."""
+    if not USE_OPENAI:
+        yield prompt[:200] + " [...]"
+        return
+    started = time.perf_counter()
+    request = {"model": "gpt-4o-mini", "messages": _messages(prompt),
+               "temperature": temperature, "max_tokens": max_tokens}
+    cache, key = get_cache(), request_key(**request)
+    hit = cache.get(key) if cache else None
+    if hit is not None:
+        telemetry.record("llm", label, time.perf_counter() - started, model=request["model"], cached=True)
+        yield hit
+        return
+    parts, meta, ttft, usage = [], {}, None, None
+    try:
+        # The scheduler gates and retries opening the stream; chunks are read outside the slot.
+        stream = get_scheduler().call(
+            lambda: _client_openai().chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}
+            ),
+            est_tokens=estimate_tokens(request["messages"], max_tokens),
+            meta=meta,
+        )
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+    except Exception as e:
+        telemetry.record("llm", label, time.perf_counter() - started, model=request["model"],
+                         retries=meta.get("retries", 0), error=f"{type(e).__name__}: {e}")
+        raise
+    telemetry.record(
+        "llm", label, time.perf_counter() - started, model=request["model"], ttft_s=ttft,
+        retries=meta.get("retries", 0),
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
     )
-    return out.choices[0].message.content
+    if cache and parts:
+        cache.set(key, "".join(parts))
 
-def _agent_step(role: str, context: str, user_prompt: str, temperature: float) -> str:
+def _agent_prompt(role: str, context: str, user_prompt: str) -> str:
     primer = SYSTEM_PRIMERS[role]
-    prompt = (
+    return (
         f"{primer}\n"
         f"User: {user_prompt}\n"
-        f"Context: {context[-1200:]}\n"
+        f"Context: {context}\n"
         f"Reply as {role} with concise, non-repetitive points."
     )
-    return _llm_call(prompt, temperature=temperature, max_tokens=380)
 
-def run_collective_session(user_prompt: str, mode: str, temperature: float, max_steps: int):
-    roles = MODES.get(mode, MODES["Planner (Structured)"])
-    latest_per_role, context = {}, ""
-
-    for _ in range(max_steps):
-        for role in roles:
-            msg = _agent_step(role, context, user_prompt, temperature)
-            latest_per_role[role] = msg
-            context = (context + f"\n[{role}] {msg}")[-3000:]
+def _agent_step(role: str, context: str, user_prompt: str, temperature: float) -> str:
+    prompt = _agent_prompt(role, context, user_prompt)
+    return _llm_call(prompt, temperature=temperature, max_tokens=380, label=f"agent:{role}")
 
+def _synthesis_prompt(latest_per_role: Dict[str, str]) -> str:
     final_context = "\n".join(f"[{r}] {m}" for r, m in latest_per_role.items())
-    final_answer = _llm_call(
+    return (
         "Combine the agent insights below into ONE cohesive, complete final plan with:\n"
         "- Short executive summary (3–5 sentences)\n"
         "- Bullet points with concrete steps\n"
         "- Measurable goals/metrics\n"
-        "- Clear next actions\n\n" + final_context,
-        temperature=0.6,
-        max_tokens=950,
+        "- Clear next actions\n\n" + final_context
     )
-    ordered = [(r, latest_per_role[r]) for r in ["Logic", "Data", "Empathy", "Creative"] if r in latest_per_role]
-    return ordered, final_answer
 
-# ------------------- 🦆 DUCKDUCKGO ARTICLE SEARCH -------------------
-def _decode_duck_url(url: str) -> str:
-    """Convert DuckDuckGo redirect link (/l/?uddg=...) to real article URL."""
-    if "uddg=" in url:
-        try:
-            qs = parse_qs(urlparse(url).query)
-            return unquote(qs.get("uddg", [url])[0])
-        except Exception:
-            return url
-    return url
+def _group_prompt(insights: Dict[str, str]) -> str:
+    return (
+        "Condense the agent insights below into 4–6 bullet points. Keep every concrete step, "
+        "metric and disagreement; drop repetition.\n\n"
+        + "\n".join(f"[{r}] {m}" for r, m in insights.items())
+    )
+
+def _reduce_insights(insights: Dict[str, str], group_size: int, max_workers: int) -> Dict[str, str]:
+    """
+    Map-reduce large panels: summarize groups of `group_size` roles in parallel,
+    repeating until at most `group_size` entries remain, so the final synthesis
+    prompt stays bounded however many roles took part.
+    """
+    group_size = max(2, group_size)
+    while len(insights) > group_size:
+        items = list(insights.items())
+        groups = [dict(items[i:i + group_size]) for i in range(0, len(items), group_size)]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups)))) as pool:
+            futures = [telemetry.submit(pool, _llm_call, _group_prompt(g), temperature=0.4,
+                                        max_tokens=300, label="synthesis:group") for g in groups]
+            summaries = [f.result() for f in futures]
+        insights = {" + ".join(g): text for g, text in zip(groups, summaries)}
+    return insights
 
+def _run_round(roles: List[str], context: str, user_prompt: str, temperature: float,
+               max_workers: int) -> List[Tuple[str, str]]:
+    """Run every role of one turn concurrently against the same frozen context."""
+    workers = max(1, min(max_workers, len(roles)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [telemetry.submit(pool, _agent_step, r, context, user_prompt, temperature) for r in roles]
+        return [(r, f.result()) for r, f in zip(roles, futures)]
+
+def iter_collective_session(user_prompt: str, mode: str, temperature: float, max_steps: int,
+                            parallel: bool = False, max_workers: int = 4, stream: bool = True,
+                            context_tokens: int = CONTEXT_TOKEN_BUDGET,
+                            novelty_threshold: Optional[float] = None,
+                            history: Optional[List[Tuple[int, str, str]]] = None):
+    """
+    Generator form of run_collective_session. Yields event dicts:
+      {"type": "token", "role", "turn", "text"}    partial output (role "Final" for synthesis)
+      {"type": "message", "role", "turn", "text"}  one agent reply is complete
+      {"type": "turn", "turn", "novelty"}          all agents of a turn are done
+      {"type": "done", "ordered", "final", "stats", "telemetry"}
+                                                   run_collective_session's data plus stop
+                                                   reason, per-turn novelty and, inside a
+                                                   telemetry.session(), measured call stats
+    Parallel rounds emit whole messages only; sequential agents and the
+    synthesis stream tokens when stream=True. Each agent sees at most
+    context_tokens of dialogue (recent turns plus a summary of older ones).
+    With novelty_threshold set, the dialogue stops early once a turn's novelty
+    drops below it. Panels larger than SYNTHESIS_GROUP_SIZE are summarized in
+    groups before the final synthesis. `history` is a list of (turn, role, text)
+    from a stored session: those turns are replayed (message/turn events with
+    "replayed": True) without LLM calls and the dialogue continues after them.
+    """
+    roles = MODES.get(mode, MODES["Planner (Structured)"])
+    ctx = ContextWindow(budget=context_tokens)
+    detector = ConvergenceDetector(threshold=novelty_threshold if novelty_threshold is not None
+                                   else NOVELTY_THRESHOLD)
+    parallel = parallel and mode not in SEQUENTIAL_MODES
+
+    def _reply(prompt, temp, max_tokens, label):
+        if stream:
+            yield from _llm_stream(prompt, temperature=temp, max_tokens=max_tokens, label=label)
+        else:
+            yield _llm_call(prompt, temperature=temp, max_tokens=max_tokens, label=label)
+
+    replayed = {}
+    for turn, role, text in history or ():
+        replayed.setdefault(turn, []).append((role, text))
+    for turn in sorted(replayed):
+        for role, msg in replayed[turn]:
+            ctx.add(role, msg)
+            detector.observe(role, msg)
+            yield {"type": "message", "role": role, "turn": turn, "text": msg, "replayed": True}
+        yield {"type": "turn", "turn": turn, "novelty": round(detector.end_turn(), 3), "replayed": True}
+
+    stop_reason = "max_steps"
+    for turn in range(len(replayed), max_steps):
+        if novelty_threshold is not None and detector.converged:
+            stop_reason = "converged"
+            break
+        if parallel:
+            for role, msg in _run_round(roles, ctx.render(), user_prompt, temperature, max_workers):
+                ctx.add(role, msg)
+                detector.observe(role, msg)
+                yield {"type": "message", "role": role, "turn": turn, "text": msg}
+        else:
+            for role in roles:
+                parts = []
+                for piece in _reply(_agent_prompt(role, ctx.render(), user_prompt), temperature, 380,
+                                    f"agent:{role}"):
+                    parts.append(piece)
+                    yield {"type": "token", "role": role, "turn": turn, "text": piece}
+                msg = "".join(parts)
+                ctx.add(role, msg)
+                detector.observe(role, msg)
+                yield {"type": "message", "role": role, "turn": turn, "text": msg}
+        yield {"type": "turn", "turn": turn, "novelty": round(detector.end_turn(), 3)}
+
+    latest_per_role = ctx.latest()
+    parts = []
+    insights = _reduce_insights(latest_per_role, SYNTHESIS_GROUP_SIZE, max_workers)
+    for piece in _reply(_synthesis_prompt(insights), 0.6, 950, "synthesis"):
+        parts.append(piece)
+        yield {"type": "token", "role": "Final", "turn": len(detector.novelty), "text": piece}
+    final_answer = "".join(parts)
+    ordered = [(r, latest_per_role[r]) for r in roles if r in latest_per_role]
+    tel = telemetry.current()
+    yield {"type": "done", "ordered": ordered, "final": final_answer, "stats": detector.report(max_steps, stop_reason),
+           "telemetry": tel.summary() if tel else None}
+
+def run_collective_session(user_prompt: str, mode: str, temperature: float, max_steps: int,
+                           parallel: bool = False, max_workers: int = 4,
+                           context_tokens: int = CONTEXT_TOKEN_BUDGET,
+                           novelty_threshold: Optional[float] = None):
+    """
+    Run the multi-agent dialogue and synthesize a final plan.
+    With parallel=True, all roles of a turn run concurrently (up to max_workers)
+    on the context frozen at the start of the turn; modes in SEQUENTIAL_MODES
+    always run one agent after another.
+    """
+    for event in iter_collective_session(user_prompt, mode, temperature, max_steps,
+                                         parallel=parallel, max_workers=max_workers, stream=False,
+                                         context_tokens=context_tokens,
+                                         novelty_threshold=novelty_threshold):
+        pass
+    return event["ordered"], event["final"]
+
+# ------------------- 🦆 DUCKDUCKGO ARTICLE SEARCH -------------------
 def generate_concept_articles(concept_text: str, user_prompt: str = "") -> tuple:
     """
-    Fetch one relevant article (title + URL) using DuckDuckGo (HTML scrape).
+    Fetch one relevant article (title + URL) from the search backend
+    (DuckDuckGo HTML scrape by default, or the offline BM25 index).
     """
     try:
-        query = user_prompt or concept_text[:100]
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-        html_url = f"https://duckduckgo.com/html/?q={query.replace(' ', '+')}"
-        res = requests.get(html_url, headers=headers, timeout=20)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        a_tags = soup.select(".result__a, a.result__a")
-        for a in a_tags:
-            title = a.get_text(strip=True)
-            href = _decode_duck_url(a.get("href", ""))
-            if "http" in href:
-                return (title, href)
+        results = get_search_client().search(user_prompt or concept_text[:100])
+        if results:
+            return (results[0].title, results[0].url)
     except Exception as e:
         print("🦆 DuckDuckGo article fetch error:", e)
     return ("No related article found", "#")
 
-def fetch_more_articles(query: str) -> list:
+def fetch_more_articles(query: str, consensus: str = "") -> list:
     """
-    Fetch 3–5 additional articles (title + URL) from DuckDuckGo.
+    Fetch 3–5 additional articles (title + URL) from the search backend.
+    Shares the cached result list with generate_concept_articles. With a
+    consensus, candidate pages are fetched and ranked by relevance to it.
     """
     try:
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-        html_url = f"https://duckduckgo.com/html/?q={query.replace(' ', '+')}"
-        res = requests.get(html_url, headers=headers, timeout=20)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        results = []
-        for a in soup.select(".result__a, a.result__a")[:6]:
-            title = a.get_text(strip=True)
-            href = _decode_duck_url(a.get("href", ""))
-            if "http" in href:
-                results.append((title, href))
-        return results
+        if consensus:
+            ranked = rank_articles(article_candidates(query), consensus)
+            return [(a.title, a.url) for a in ranked[:6]]
+        return [(r.title, r.url) for r in get_search_client().search(query)[:6]]
     except Exception as e:
         print("🦆 DuckDuckGo 'More Articles' fetch error:", e)
         return []
+
+def article_candidates(query: str, limit: int = ARTICLE_CANDIDATES) -> List[Article]:
+    """Search results for a query with their pages fetched (concurrently) for ranking."""
+    try:
+        backend = get_search_client()
+        results = backend.search(query)[:limit]
+        if not backend.fetch_pages:
+            return [Article(*r) for r in results]
+        return get_enricher().enrich(results)
+    except Exception as e:
+        print("🦆 DuckDuckGo article fetch error:", e)
+        return []
+
+def pick_articles(candidates: List[Article], consensus: str) -> Tuple[tuple, list]:
+    """Main article plus up to six more, ranked by TF-IDF similarity to the consensus."""
+    ranked = rank_articles(candidates, consensus)
+    if not ranked:
+        return ("No related article found", "#"), []
+    return (ranked[0].title, ranked[0].url), [(a.title, a.url) for a in ranked[1:7]]
+
+def prefetch_articles(query: str) -> List[Article]:
+    """
+    Enriched article candidates for a query. The query is known before the
+    session starts, so callers can run this in the background while the agents
+    talk and rank the result with pick_articles once the consensus is in.
+    """
+    return article_candidates(query)
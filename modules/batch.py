@@ -0,0 +1,193 @@
+# modules/batch.py
+# Headless batch runner for collective sessions (CLI + Python API)
+#
+#   python -m modules.batch ideas.jsonl -o results.jsonl --workers 4
+#
+# Each input line is a JSON object with "prompt" and optionally "id",
+# "mode"/"modes", "temperature"/"temperatures", "steps", "parallel" and
+# "novelty_threshold" (stop early once agents converge).
+# List-valued modes/temperatures expand into one job per combination.
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, List, Optional
+
+from modules.agents import MODES, iter_collective_session
+from modules import telemetry
+
+DEFAULT_MODE = "Planner (Structured)"
+
+
+def _job_id(prompt: str, mode: str, temperature: float, steps: int, parallel: bool = False,
+            novelty_threshold: Optional[float] = None) -> str:
+    blob = json.dumps([prompt, mode, temperature, steps, parallel, novelty_threshold], ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def expand_jobs(rows: Iterable[dict], default_steps: int = 3) -> List[dict]:
+    """Turn input rows into one job per prompt × mode × temperature."""
+    jobs = []
+    for n, row in enumerate(rows, 1):
+        prompt = (row.get("prompt") or "").strip()
+        if not prompt:
+            print(f"⚠️ Skipping input line {n}: missing 'prompt'", file=sys.stderr)
+            continue
+        modes = row.get("modes") or [row.get("mode", DEFAULT_MODE)]
+        temps = row.get("temperatures") or [row.get("temperature", 0.7)]
+        steps = int(row.get("steps", default_steps))
+        parallel = bool(row.get("parallel", False))
+        threshold = row.get("novelty_threshold")
+        for mode in modes:
+            if mode not in MODES:
+                print(f"⚠️ Unknown mode {mode!r} on line {n}, using {DEFAULT_MODE}", file=sys.stderr)
+                mode = DEFAULT_MODE
+            for temp in temps:
+                temp = float(temp)
+                job_id = _job_id(prompt, mode, temp, steps, parallel, threshold)
+                if row.get("id"):
+                    job_id = f"{row['id']}:{job_id}" if len(modes) * len(temps) > 1 else str(row["id"])
+                jobs.append({
+                    "id": job_id, "prompt": prompt, "mode": mode, "temperature": temp,
+                    "steps": steps, "parallel": parallel, "novelty_threshold": threshold,
+                })
+    return jobs
+
+
+def completed_ids(output_path: str) -> set:
+    """Ids already written with status 'ok' (errored jobs are retried on resume)."""
+    done = set()
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # partial line from an interrupted run
+                if rec.get("status") == "ok":
+                    done.add(rec.get("id"))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def run_job(job: dict) -> dict:
+    """Run one session; the transcript is every agent message as [turn, role, text]."""
+    started = time.time()
+    rec = dict(job)
+    try:
+        transcript = []
+        with telemetry.session() as tel:
+            for event in iter_collective_session(job["prompt"], job["mode"], job["temperature"], job["steps"],
+                                                 parallel=job["parallel"], stream=False,
+                                                 novelty_threshold=job["novelty_threshold"]):
+                if event["type"] == "message":
+                    transcript.append([event["turn"], event["role"], event["text"]])
+        perf = tel.summary()
+        rec.update({
+            "status": "ok",
+            "transcript": transcript,
+            "final": event["final"],
+            "session": event["stats"],
+            "tokens": {
+                "prompt": perf["prompt_tokens"],
+                "completion": perf["completion_tokens"],
+                "total": perf["total_tokens"],
+            },
+            "telemetry": perf,
+        })
+    except Exception as e:
+        rec.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    rec["started_at"] = started
+    rec["seconds"] = round(time.time() - started, 3)
+    return rec
+
+
+def _trim_partial_line(path: str):
+    """Cut an interrupted run's unfinished last line, so appended records start on a line of their own."""
+    try:
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if not end:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = end
+            while pos > 0:
+                step = min(65536, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline >= 0:
+                    f.truncate(pos - step + newline + 1)
+                    return
+                pos -= step
+            f.truncate(0)
+    except FileNotFoundError:
+        pass
+
+
+def run_batch(jobs: List[dict], output_path: str, workers: int = 4, resume: bool = True,
+              on_result=None) -> dict:
+    """
+    Run jobs on a bounded thread pool, appending one JSON line per finished job
+    to output_path as soon as it completes. With resume=True, jobs already
+    recorded as 'ok' in output_path are skipped.
+    """
+    if resume:
+        _trim_partial_line(output_path)
+    skip = completed_ids(output_path) if resume else set()
+    pending = [j for j in jobs if j["id"] not in skip]
+    summary = {"total": len(jobs), "skipped": len(jobs) - len(pending), "ok": 0, "error": 0}
+    started = time.time()
+    write_lock = threading.Lock()
+
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(run_job, j) for j in pending]
+        for fut in as_completed(futures):
+            rec = fut.result()
+            summary[rec["status"]] += 1
+            with write_lock:
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                out.flush()
+            if on_result:
+                on_result(rec)
+
+    summary["seconds"] = round(time.time() - started, 3)
+    return summary
+
+
+def load_rows(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run NeuroWeave collective sessions in batch.")
+    parser.add_argument("input", help="JSONL file of prompts")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="concurrent sessions")
+    parser.add_argument("--steps", type=int, default=3, help="default dialogue turns per session")
+    parser.add_argument("--no-resume", action="store_true", help="overwrite output instead of resuming")
+    args = parser.parse_args(argv)
+
+    jobs = expand_jobs(load_rows(args.input), default_steps=args.steps)
+
+    def _progress(rec):
+        mark = "✅" if rec["status"] == "ok" else "❌"
+        print(f"{mark} {rec['id']} {rec['mode']} t={rec['temperature']} {rec['seconds']:.1f}s", flush=True)
+
+    summary = run_batch(jobs, args.output, workers=args.workers, resume=not args.no_resume,
+                        on_result=_progress)
+    print(json.dumps(summary))
+    return 0 if summary["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
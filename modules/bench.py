@@ -0,0 +1,366 @@
+# modules/bench.py
+# End-to-end session benchmark against the local mock OpenAI server, plus
+# search-result parsing (saved DuckDuckGo pages), offline BM25 search (synthetic
+# corpus), article enrichment (local page servers) and minting throughput
+# (local dev chain) benchmarks
+#
+#   python -m modules.bench --steps 3 --latency 0.3 --parallel
+#   python -m modules.bench --parser
+#   python -m modules.bench --search --docs 50000
+#   python -m modules.bench --enrich
+#   python -m modules.bench --mint
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import median
+from typing import List, Optional
+
+from modules.mock_openai import MockConfig, MockOpenAIServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "duckduckgo")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def run_benchmark(steps: int = 3, temperature: float = 0.7, parallel: bool = False, stream: bool = False,
+                  config: Optional[MockConfig] = None, modes: Optional[List[str]] = None) -> List[dict]:
+    """
+    Drive iter_collective_session once per mode against a fresh mock server and
+    return one result row per mode. The run gets its own OpenAI client for the
+    server and the response cache is off, so every call reaches the server;
+    both are put back afterwards, so it can be called repeatedly in one process.
+    """
+    from openai import OpenAI
+    from modules import agents, llm_cache
+
+    with MockOpenAIServer(config or MockConfig()) as server:
+        saved = (agents.OPENAI_KEY, agents.USE_OPENAI, agents._client, llm_cache.LLM_CACHE_ENABLED)
+        try:
+            agents.OPENAI_KEY, agents.USE_OPENAI = "mock", True
+            agents._client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            llm_cache.LLM_CACHE_ENABLED = False  # get_cache() returns None
+
+            rows = []
+            for mode in modes or list(agents.MODES):
+                server.stats.reset()
+                started = time.perf_counter()
+                first_token = None
+                for event in agents.iter_collective_session("Benchmark: AI nurse triage for rural clinics",
+                                                            mode, temperature, steps,
+                                                            parallel=parallel, stream=stream):
+                    if first_token is None and event["type"] in ("token", "message"):
+                        first_token = time.perf_counter() - started
+                wall = time.perf_counter() - started
+                lat = server.stats.latencies
+                rows.append({
+                    "mode": mode,
+                    "parallel": parallel,
+                    "stream": stream,
+                    "wall_s": round(wall, 3),
+                    "first_content_s": round(first_token or wall, 3),
+                    "calls": server.stats.calls,
+                    "p50_s": round(median(lat), 3) if lat else 0.0,
+                    "p95_s": round(_percentile(lat, 95), 3),
+                    "prompt_tokens": server.stats.prompt_tokens,
+                    "completion_tokens": server.stats.completion_tokens,
+                    "rate_limited": server.stats.rate_limited,
+                    "errors": server.stats.errors,
+                })
+            return rows
+        finally:
+            agents.OPENAI_KEY, agents.USE_OPENAI, agents._client, llm_cache.LLM_CACHE_ENABLED = saved
+
+
+def _full_tree_parse(html: str) -> list:
+    """The previous extraction: build the whole page tree, then select result anchors."""
+    from bs4 import BeautifulSoup
+    from modules.search import decode_duck_url
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+    for a in soup.select(".result__a, a.result__a"):
+        href = decode_duck_url(a.get("href", ""))
+        if "http" in href:
+            results.append((a.get_text(strip=True), href))
+    return results
+
+
+def run_parser_benchmark(fixtures_dir: str = FIXTURES_DIR, repeat: int = 20) -> List[dict]:
+    """Per-fixture parse cost (ms per page) of the full-tree parse vs modules.search.parse_results."""
+    from modules.search import HTML_PARSER, parse_results
+    rows = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(fixtures_dir, name), "r", encoding="utf-8") as f:
+            html = f.read()
+        timings = {}
+        for label, fn in (("full_tree", _full_tree_parse), ("strained", parse_results)):
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                results = fn(html)
+                runs.append(time.perf_counter() - started)
+            timings[label] = (median(runs) * 1000, len(results))
+        rows.append({
+            "fixture": name[:-5],
+            "kb": round(len(html) / 1024, 1),
+            "parser": HTML_PARSER,
+            "full_tree_ms": round(timings["full_tree"][0], 2),
+            "strained_ms": round(timings["strained"][0], 2),
+            "speedup": round(timings["full_tree"][0] / max(timings["strained"][0], 1e-9), 2),
+            "results": timings["strained"][1],
+        })
+    return rows
+
+
+def _synthetic_corpus(docs: int, seed: int = 7):
+    """Articles over a 20k-word vocabulary with Zipf-like word frequencies, like real text."""
+    rng = random.Random(seed)
+    vocab = [f"w{n}" for n in range(20000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    for n in range(docs):
+        words = rng.choices(vocab, weights, k=rng.randint(80, 400))
+        yield {"url": f"https://example.org/{n}", "title": " ".join(words[:6]), "text": " ".join(words)}
+
+
+def run_search_benchmark(docs: int = 50000, segments: int = 5, queries: int = 200, seed: int = 7) -> List[dict]:
+    """
+    Query latency of the offline BM25 index (modules.bm25) on a synthetic corpus,
+    added as `segments` incremental segments and then compacted into one.
+    """
+    from modules.bm25 import BM25Index
+    rng = random.Random(seed + 1)
+    texts = [f"w{rng.randint(0, 2000)} w{rng.randint(0, 20000)} w{rng.randint(0, 20000)}" for _ in range(queries)]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BM25Index(tmp)
+        corpus = _synthetic_corpus(docs, seed)
+        started = time.perf_counter()
+        for segment in range(segments):
+            index.add(doc for _, doc in zip(range(docs // segments), corpus))
+        build = time.perf_counter() - started
+        for label in ("segmented", "compacted"):
+            if label == "compacted":
+                started = time.perf_counter()
+                index.compact()
+                build = time.perf_counter() - started
+            times = []
+            for text in texts:
+                started = time.perf_counter()
+                index.search(text)
+                times.append((time.perf_counter() - started) * 1000)
+            rows.append({
+                "run": label,
+                "docs": index.doc_count,
+                "segments": segments if label == "segmented" else 1,
+                "build_s": round(build, 2),
+                "p50_ms": round(median(times), 2),
+                "p95_ms": round(_percentile(times, 95), 2),
+                "max_ms": round(max(times), 2),
+            })
+    return rows
+
+
+def _page_server(delay: float, body_kb: int) -> ThreadingHTTPServer:
+    """Local stand-in for article hosts: a slow first byte, then a large HTML page."""
+    filler = "<p>" + "lorem ipsum dolor sit amet " * 40 + "</p>\n"
+
+    class _Page(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            topic = self.path.strip("/").replace("-", " ")
+            body = (f"<html><head><title>{topic}</title>"
+                    f"<meta name=\"description\" content=\"An article about {topic}.\"></head><body>"
+                    + filler * max(1, body_kb * 1024 // len(filler)) + "</body></html>").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except ConnectionError:
+                pass  # the enricher hangs up once it has the head
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Page)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_enrich_benchmark(pages: int = 8, hosts: int = 4, delay: float = 0.2, body_kb: int = 512) -> List[dict]:
+    """Enrich `pages` candidates spread over `hosts` local servers, one at a time vs concurrently."""
+    from modules.enrich import ArticleEnricher, rank_articles
+    servers = [_page_server(delay, body_kb) for _ in range(hosts)]
+    topics = ["rural clinic triage", "solar microgrid", "crop yield sensors", "nurse staffing",
+              "telemedicine rural clinics", "battery storage", "ai triage nurses", "vertical farming"]
+    candidates = [
+        (f"Result {i}", f"http://127.0.0.1:{servers[i % hosts].server_port}/{topics[i % len(topics)].replace(' ', '-')}")
+        for i in range(pages)
+    ]
+    rows = []
+    try:
+        for label, workers in (("sequential", 1), ("concurrent", pages)):
+            enricher = ArticleEnricher(workers=workers)
+            started = time.perf_counter()
+            articles = enricher.enrich(candidates)
+            wall = time.perf_counter() - started
+            top = rank_articles(articles, "AI triage for nurses in rural clinics")[0]
+            rows.append({
+                "run": label,
+                "pages": pages,
+                "wall_s": round(wall, 3),
+                "kb_read": round(enricher.stats["bytes"] / 1024, 1),
+                "kb_served": pages * body_kb,
+                "errors": enricher.stats["errors"],
+                "top": top.description[:40],
+            })
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+    return rows
+
+
+# RPCs spent building mint transactions (fee quotes, gas estimates), as opposed to sending and tracking them
+_BUILD_RPCS = ("eth_getBlockByNumber", "eth_feeHistory", "eth_estimateGas", "eth_maxPriorityFeePerGas",
+               "eth_getCode", "eth_call")
+
+
+def run_mint_benchmark(mints: int = 20, block_time: float = 1.0, drop_rate: float = 0.0) -> List[dict]:
+    """
+    Mint one at a time (wait for each receipt), pipelined through MintQueue,
+    and as safeMintBatch calls on a local dev chain.
+    """
+    from eth_account import Account
+    from web3 import Web3
+    from modules.mint_queue import MintQueue
+    from modules.mock_chain import ChainConfig, MockChainServer
+
+    with open(os.getenv("CONTRACT_ABI_PATH", "contract_abi.json"), "r") as f:
+        abi = json.load(f)
+    contract = Web3.to_checksum_address("0x" + "11" * 20)
+    rows = []
+    for label in ("sequential", "pipelined", "batch"):
+        with MockChainServer(ChainConfig(block_time=block_time, drop_rate=drop_rate)) as server:
+            queue = MintQueue(Web3(Web3.HTTPProvider(server.url)), Account.create().key.hex(), contract, abi,
+                              poll=min(0.2, block_time / 4), rebroadcast_after=block_time * 2)
+            items = [(queue.account.address, f"ipfs://bench/{i}.json") for i in range(mints)]
+            queue.quote(queue.account.address, items[0][1])  # warm the fee quote and gas cache
+            before = dict(server.chain.calls)
+            if label == "sequential":
+                jobs = []
+                for recipient, uri in items:
+                    jobs.append(queue.submit(recipient, uri))
+                    jobs[-1].wait(timeout=60 * block_time)
+            elif label == "pipelined":
+                jobs = queue.submit_many(items)
+                queue.wait(jobs, timeout=60 * block_time)
+            else:
+                jobs = queue.submit_batch([r for r, _ in items], [u for _, u in items])
+                queue.wait(jobs, timeout=60 * block_time)
+            queue.oracle.stop()
+            report = queue.report(jobs)
+            build_calls = sum(server.chain.calls.get(m, 0) - before.get(m, 0) for m in _BUILD_RPCS)
+            rows.append({"run": label, "block_time_s": block_time, **{
+                k: report[k] for k in ("mints", "blocks", "mints_per_block", "wall_s", "rebroadcast", "replaced")},
+                "modelled_gas_per_token": report["gas_per_token"],
+                "build_rpc_per_mint": round(build_calls / mints, 2)})
+    return rows
+
+
+def _print_table(rows: List[dict], cols: List[str], wide: str):
+    print("  ".join(f"{c:>22}" if c == wide else f"{c:>10}" for c in cols))
+    for row in rows:
+        print("  ".join(f"{row[c]:>22}" if c == wide else f"{row[c]:>10}" for c in cols))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark collective sessions offline.")
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--parallel", action="store_true", help="use parallel agent rounds")
+    parser.add_argument("--stream", action="store_true", help="stream tokens (sequential agents + synthesis)")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=120.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    parser.add_argument("--parser", action="store_true", help="benchmark search-result parsing on saved pages")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of saved DuckDuckGo HTML pages")
+    parser.add_argument("--search", action="store_true", help="benchmark offline BM25 queries on a synthetic corpus")
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--enrich", action="store_true", help="benchmark article enrichment on local page servers")
+    parser.add_argument("--mint", action="store_true", help="benchmark minting throughput on a local dev chain")
+    parser.add_argument("--mints", type=int, default=20)
+    parser.add_argument("--block-time", type=float, default=1.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of transactions the chain loses")
+    args = parser.parse_args(argv)
+
+    if args.mint:
+        rows = run_mint_benchmark(args.mints, args.block_time, args.drop_rate)
+        if args.json:
+            for row in rows:
+                print(json.dumps(row))
+        else:
+            _print_table(rows, ["run", "block_time_s", "mints", "blocks", "mints_per_block", "modelled_gas_per_token",
+                                "wall_s", "rebroadcast", "replaced", "build_rpc_per_mint"], "run")
+            print("gas is mock_chain's model of NeuroWeaveNFT, not measured on an EVM")
+        return 0
+
+    if args.search:
+        rows = run_search_benchmark(args.docs, seed=args.seed)
+        if args.json:
+            for row in rows:
+                print(json.dumps(row))
+        else:
+            _print_table(rows, ["run", "docs", "segments", "build_s", "p50_ms", "p95_ms", "max_ms"], "run")
+        return 0
+
+    if args.enrich:
+        rows = run_enrich_benchmark()
+        if args.json:
+            for row in rows:
+                print(json.dumps(row))
+        else:
+            _print_table(rows, ["run", "pages", "wall_s", "kb_read", "kb_served", "errors", "top"], "top")
+        return 0
+
+    if args.parser:
+        rows = run_parser_benchmark(args.fixtures)
+        if args.json:
+            for row in rows:
+                print(json.dumps(row))
+        else:
+            _print_table(rows, ["fixture", "kb", "parser", "full_tree_ms", "strained_ms", "speedup", "results"],
+                         "fixture")
+        return 0
+
+    cfg = MockConfig(latency=args.latency, tps=args.tps, rate_limit=args.rate_limit,
+                     error_rate=args.error_rate, seed=args.seed)
+    rows = run_benchmark(steps=args.steps, parallel=args.parallel, stream=args.stream, config=cfg)
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+        return 0
+
+    _print_table(rows, ["mode", "wall_s", "first_content_s", "calls", "p50_s", "p95_s",
+                        "prompt_tokens", "completion_tokens", "rate_limited", "errors"], "mode")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+# modules/bm25.py
+# Offline BM25 article index (inverted index with memory-mapped postings)
+#
+#   python -m modules.bm25 add ./articles          # directory of .html/.htm/.md/.txt files
+#   python -m modules.bm25 add corpus.jsonl        # {"url", "title", "text"|"body"|"content"|"snippet"}
+#   python -m modules.bm25 query "ai triage for rural clinics"
+#
+# Layout of the index directory:
+#   index.sqlite    documents, per-segment lexicon (term -> postings slice) and indexed sources
+#   seg_<n>.post    uint32 (doc_id, term frequency) pairs grouped by term, read through np.memmap
+# Every add() writes a new segment, so updates are incremental; a re-indexed URL
+# supersedes its previous document, and a file deleted from an indexed directory
+# retires its document. compact() merges segments and drops superseded documents.
+import os
+import re
+import sys
+import json
+import heapq
+import hashlib
+import itertools
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", os.path.join(".neuroweave", "search_index"))
+
+_WORD_RE = re.compile(r"[a-z0-9]{2,}")
+_STOP = set(
+    "an the to for in of on with and or if from at by is are was were be been this that these those it its "
+    "as we you they our your their will can should would could may might not no also more most very just "
+    "than then so such into about over".split()
+)
+_TEXT_EXTS = (".html", ".htm", ".md", ".txt")
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOP]
+
+
+def _file_document(path: str) -> Optional[dict]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    if path.lower().endswith((".html", ".htm")):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(raw, "html.parser")
+        title = soup.title.get_text(strip=True) if soup.title else ""
+        desc = soup.find("meta", attrs={"name": "description"})
+        text = soup.get_text(" ", strip=True)
+        snippet = desc.get("content", "") if desc else ""
+    else:
+        lines = [l.strip() for l in raw.splitlines() if l.strip()]
+        title = lines[0].lstrip("# ") if lines else ""
+        text, snippet = raw, " ".join(lines[1:3])
+    if not text.strip():
+        return None
+    return {"url": "file://" + os.path.abspath(path), "title": title or os.path.basename(path),
+            "snippet": snippet or " ".join(text.split()[:40]), "text": text}
+
+
+def iter_corpus(path: str) -> Iterator[Tuple[str, str, dict]]:
+    """(source key, version, document) for a JSONL file or a directory of text/HTML files."""
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if not name.lower().endswith(_TEXT_EXTS):
+                    continue
+                full = os.path.join(root, name)
+                st = os.stat(full)
+                version = f"{st.st_mtime_ns}:{st.st_size}"
+                yield os.path.abspath(full), version, full
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            text = row.get("text") or row.get("body") or row.get("content") or row.get("snippet") or ""
+            doc = {"url": row.get("url") or f"{os.path.abspath(path)}#{n}", "title": row.get("title", ""),
+                   "snippet": row.get("snippet") or " ".join(text.split()[:40]), "text": text}
+            yield doc["url"], hashlib.sha1(line.encode("utf-8")).hexdigest(), doc
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an on-disk inverted index. Term lookups go through the
+    SQLite lexicon and postings are sliced out of memory-mapped segment files,
+    so only the per-document lengths are held in RAM.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1, self.b = k1, b
+        os.makedirs(path, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._segments: Dict[int, np.memmap] = {}
+        self._db().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                title TEXT,
+                snippet TEXT,
+                length INTEGER NOT NULL,
+                live INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS docs_url ON docs(url, live);
+            CREATE TABLE IF NOT EXISTS lexicon (
+                term TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (term, segment)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sources (key TEXT PRIMARY KEY, version TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY, postings INTEGER NOT NULL);
+            """
+        )
+        self._load_stats()
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.path, "index.sqlite"), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _load_stats(self):
+        """Document lengths and liveness, indexed by doc id (the only per-document state in memory)."""
+        rows = self._db().execute("SELECT id, length, live FROM docs").fetchall()
+        size = (max(r[0] for r in rows) + 1) if rows else 1
+        lengths = np.zeros(size, dtype=np.float32)
+        live = np.zeros(size, dtype=bool)
+        for doc_id, length, is_live in rows:
+            lengths[doc_id], live[doc_id] = length, bool(is_live)
+        self._lengths, self._live = lengths, live
+        self.doc_count = int(live.sum())
+        self.avgdl = float(lengths[live].mean()) if self.doc_count else 1.0
+
+    def _postings(self, segment: int) -> np.memmap:
+        mm = self._segments.get(segment)
+        if mm is None:
+            mm = np.memmap(os.path.join(self.path, f"seg_{segment}.post"), dtype=np.uint32, mode="r").reshape(-1, 2)
+            self._segments[segment] = mm
+        return mm
+
+    # ---- writes ----
+    def add(self, docs: Iterable[dict]) -> int:
+        """Index documents ({"url", "title", "snippet", "text"}) as one new segment."""
+        with self._write_lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                next_id = db.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM docs").fetchone()[0]
+                inverted: Dict[str, List[Tuple[int, int]]] = {}
+                added = 0
+                for doc in docs:
+                    terms = Counter(tokenize(" ".join((doc.get("title", ""),) * 2 + (doc.get("text", ""),))))
+                    if not terms:
+                        continue
+                    db.execute("UPDATE docs SET live = 0 WHERE url = ? AND live = 1", (doc["url"],))
+                    db.execute("INSERT INTO docs (id, url, title, snippet, length) VALUES (?, ?, ?, ?, ?)",
+                               (next_id, doc["url"], doc.get("title", ""), (doc.get("snippet") or "")[:500],
+                                sum(terms.values())))
+                    for term, tf in terms.items():
+                        inverted.setdefault(term, []).append((next_id, tf))
+                    next_id += 1
+                    added += 1
+                if inverted:
+                    segment = db.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM segments").fetchone()[0]
+                    lexicon, chunks, offset = [], [], 0
+                    for term in sorted(inverted):
+                        postings = inverted[term]
+                        lexicon.append((term, segment, offset, len(postings)))
+                        chunks.append(np.asarray(postings, dtype=np.uint32))
+                        offset += len(postings)
+                    np.concatenate(chunks).tofile(os.path.join(self.path, f"seg_{segment}.post"))
+                    db.executemany("INSERT INTO lexicon (term, segment, offset, count) VALUES (?, ?, ?, ?)", lexicon)
+                    db.execute("INSERT INTO segments (id, postings) VALUES (?, ?)", (segment, offset))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._load_stats()
+            return added
+
+    def _retire(self, keys: List[str]):
+        """Take the documents of deleted directory files out of the results."""
+        with self._write_lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany("UPDATE docs SET live = 0 WHERE url = ? AND live = 1", [("file://" + k,) for k in keys])
+                db.executemany("DELETE FROM sources WHERE key = ?", [(k,) for k in keys])
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._load_stats()
+
+    def add_corpus(self, path: str, batch_size: int = 5000) -> int:
+        """
+        Index new or changed documents from a directory or JSONL file; unchanged
+        ones are skipped, and files no longer in a directory are retired.
+        """
+        db = self._db()
+        total, batch, seen, present = 0, [], [], set()
+
+        def _flush():
+            nonlocal total
+            if batch:
+                total += self.add(batch)
+            db.executemany("INSERT OR REPLACE INTO sources (key, version) VALUES (?, ?)", seen)
+            batch.clear()
+            seen.clear()
+
+        for key, version, doc in iter_corpus(path):
+            present.add(key)
+            row = db.execute("SELECT version FROM sources WHERE key = ?", (key,)).fetchone()
+            if row and row[0] == version:
+                continue
+            doc = _file_document(doc) if isinstance(doc, str) else doc
+            if doc:
+                batch.append(doc)
+            seen.append((key, version))
+            if len(batch) >= batch_size:
+                _flush()
+        _flush()
+        if os.path.isdir(path):
+            prefix = os.path.join(os.path.abspath(path), "")
+            deleted = [k for (k,) in db.execute("SELECT key FROM sources WHERE substr(key, 1, ?) = ?",
+                                               (len(prefix), prefix)) if k not in present]
+            if deleted:
+                self._retire(deleted)
+        return total
+
+    def _segment_terms(self, segment: int) -> Iterator[Tuple[str, int, int, int]]:
+        for term, offset, count in self._db().execute(
+                "SELECT term, offset, count FROM lexicon WHERE segment = ? ORDER BY term", (segment,)):
+            yield term, segment, offset, count
+
+    def compact(self):
+        """
+        Merge all segments into one and drop superseded documents' postings. The
+        segments' lexicons are merged term by term, so only one term's postings
+        are in memory at a time.
+        """
+        with self._write_lock:
+            db = self._db()
+            segments = [r[0] for r in db.execute("SELECT id FROM segments ORDER BY id")]
+            if len(segments) < 2:
+                return
+            live = self._live
+            target = max(segments) + 1
+            out_path = os.path.join(self.path, f"seg_{target}.post")
+            lexicon, offset = [], 0
+            # lexicon rows arrive sorted by (term, segment), so a term's doc ids stay ascending
+            merged = heapq.merge(*(self._segment_terms(segment) for segment in segments))
+            with open(out_path, "wb") as out:
+                for term, rows in itertools.groupby(merged, key=lambda row: row[0]):
+                    count = 0
+                    for _, segment, start, n in rows:
+                        block = np.array(self._postings(segment)[start:start + n])
+                        block = block[live[block[:, 0]]]
+                        block.tofile(out)
+                        count += len(block)
+                    if count:
+                        lexicon.append((term, target, offset, count))
+                        offset += count
+            if not offset:
+                os.remove(out_path)
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM lexicon")
+            db.execute("DELETE FROM segments")
+            db.executemany("INSERT INTO lexicon (term, segment, offset, count) VALUES (?, ?, ?, ?)", lexicon)
+            db.execute("INSERT INTO segments (id, postings) VALUES (?, ?)", (target, offset))
+            db.execute("DELETE FROM docs WHERE live = 0")
+            db.execute("COMMIT")
+            for segment in segments:
+                self._segments.pop(segment, None)
+                try:
+                    os.remove(os.path.join(self.path, f"seg_{segment}.post"))
+                except OSError:
+                    pass
+            self._load_stats()
+
+    # ---- reads ----
+    def search(self, query: str, k: int = 10) -> List[dict]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_count:
+            return []
+        db = self._db()
+        scores = np.zeros(len(self._lengths), dtype=np.float32)
+        for term in terms:
+            blocks = [self._postings(seg)[off:off + cnt] for seg, off, cnt in db.execute(
+                "SELECT segment, offset, count FROM lexicon WHERE term = ?", (term,))]
+            if not blocks:
+                continue
+            postings = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+            ids = postings[:, 0].astype(np.int64)
+            tf = postings[:, 1].astype(np.float32)
+            known = ids < len(self._live)  # written by another process since our stats were loaded
+            ids, tf = ids[known], tf[known]
+            keep = self._live[ids]
+            ids, tf = ids[keep], tf[keep]
+            df = len(ids)
+            if not df:
+                continue
+            idf = np.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[ids] / self.avgdl)
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        top = hits[np.argsort(-scores[hits], kind="stable")[:k]]
+        marks = ",".join("?" * len(top))
+        rows = {r[0]: r for r in db.execute(f"SELECT id, url, title, snippet FROM docs WHERE id IN ({marks})",
+                                              [int(i) for i in top])}
+        return [{"url": rows[i][1], "title": rows[i][2], "snippet": rows[i][3], "score": round(float(scores[i]), 4)}
+                for i in map(int, top) if i in rows]
+
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+def get_index() -> BM25Index:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BM25Index()
+    return _index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build and query the offline BM25 article index.")
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH, help="index directory")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_add = sub.add_parser("add", help="index a directory or JSONL corpus (incremental)")
+    p_add.add_argument("corpus")
+    p_query = sub.add_parser("query", help="run a query")
+    p_query.add_argument("text")
+    p_query.add_argument("-k", type=int, default=10)
+    sub.add_parser("compact", help="merge segments and drop superseded documents")
+    args = parser.parse_args(argv)
+
+    index = BM25Index(args.index)
+    if args.cmd == "add":
+        added = index.add_corpus(args.corpus)
+        print(json.dumps({"added": added, "documents": index.doc_count}))
+    elif args.cmd == "compact":
+        index.compact()
+        print(json.dumps({"documents": index.doc_count}))
+    else:
+        for hit in index.search(args.text, k=args.k):
+            print(json.dumps(hit, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
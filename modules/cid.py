@@ -0,0 +1,171 @@
+# modules/cid.py
+# Local IPFS CID computation for file uploads, matching the go-ipfs/Pinata
+# importer defaults: UnixFS files in dag-pb, fixed 256 KiB chunks, balanced
+# layout with at most 174 links per node; directories are basic (unsharded)
+# UnixFS directories with links sorted by name.
+#   CIDv0: Qm... (sha2-256, protobuf leaves)      - Pinata's default
+#   CIDv1: bafy.../bafk... (base32, raw leaves)   - pinataOptions.cidVersion = 1
+import io
+import base64
+import hashlib
+from typing import Dict, List, Tuple
+
+CHUNK_SIZE = 262144
+MAX_LINKS = 174
+
+_B58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_DAG_PB, _RAW, _SHA2_256 = 0x70, 0x55, 0x12
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(num: int, wire: int) -> bytes:
+    return _varint((num << 3) | wire)
+
+
+def _bytes_field(num: int, value: bytes) -> bytes:
+    return _field(num, 2) + _varint(len(value)) + value
+
+
+def _uint_field(num: int, value: int) -> bytes:
+    return _field(num, 0) + _varint(value)
+
+
+def _unixfs_file(data: bytes = None, filesize: int = 0, blocksizes: List[int] = ()) -> bytes:
+    """UnixFS Data message (Type=File)."""
+    out = _uint_field(1, 2)
+    if data:
+        out += _bytes_field(2, data)
+    out += _uint_field(3, filesize)
+    for size in blocksizes:
+        out += _uint_field(4, size)
+    return out
+
+
+def _pb_node(data: bytes, links: List[Tuple[bytes, int]]) -> bytes:
+    """dag-pb PBNode: links (hash, empty name, cumulative size) first, then data."""
+    out = b""
+    for cid_bytes, tsize in links:
+        link = _bytes_field(1, cid_bytes) + _bytes_field(2, b"") + _uint_field(3, tsize)
+        out += _bytes_field(2, link)
+    return out + _bytes_field(1, data)
+
+
+def _multihash(block: bytes) -> bytes:
+    return bytes([_SHA2_256, 32]) + hashlib.sha256(block).digest()
+
+
+def _cid_bytes(block: bytes, codec: int, version: int) -> bytes:
+    mh = _multihash(block)
+    return mh if version == 0 else bytes([1]) + _varint(codec) + mh
+
+
+def _b58encode(raw: bytes) -> str:
+    n = int.from_bytes(raw, "big")
+    out = ""
+    while n:
+        n, rem = divmod(n, 58)
+        out = _B58[rem] + out
+    return "1" * (len(raw) - len(raw.lstrip(b"\0"))) + out
+
+
+def encode_cid(cid_bytes: bytes) -> str:
+    if cid_bytes[0] == _SHA2_256:  # v0 is a bare multihash
+        return _b58encode(cid_bytes)
+    return "b" + base64.b32encode(cid_bytes).decode("ascii").lower().rstrip("=")
+
+
+def _read_chunks(source, chunk_size: int):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    first = True
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            if first:
+                yield b""
+            return
+        # file objects may return short reads; IPFS chunks are fixed-size
+        while len(chunk) < chunk_size:
+            more = source.read(chunk_size - len(chunk))
+            if not more:
+                break
+            chunk += more
+        first = False
+        yield chunk
+
+
+def file_node(source, version: int = 0, chunk_size: int = CHUNK_SIZE) -> Tuple[bytes, int]:
+    """(binary CID, cumulative DAG size) of a UnixFS file, as used in directory links."""
+    # (cid bytes, file bytes covered, cumulative dag size)
+    level = []
+    for chunk in _read_chunks(source, chunk_size):
+        if version == 1:
+            level.append((_cid_bytes(chunk, _RAW, 1), len(chunk), len(chunk)))
+        else:
+            block = _pb_node(_unixfs_file(chunk, len(chunk)), [])
+            level.append((_cid_bytes(block, _DAG_PB, 0), len(chunk), len(block)))
+    while len(level) > 1:
+        parents = []
+        for i in range(0, len(level), MAX_LINKS):
+            group = level[i:i + MAX_LINKS]
+            sizes = [g[1] for g in group]
+            block = _pb_node(_unixfs_file(None, sum(sizes), sizes), [(g[0], g[2]) for g in group])
+            parents.append((_cid_bytes(block, _DAG_PB, version), sum(sizes), len(block) + sum(g[2] for g in group)))
+        level = parents
+    return level[0][0], level[0][2]
+
+
+def compute_cid(source, version: int = 0, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    CID that `ipfs add` / Pinata pinFileToIPFS would return for `source`
+    (bytes or a binary file object, read one chunk at a time from its current position).
+    """
+    return encode_cid(file_node(source, version, chunk_size)[0])
+
+
+def directory_node(entries: Dict[str, Tuple[bytes, int]], version: int = 0) -> Tuple[bytes, int]:
+    """(binary CID, cumulative DAG size) of a basic UnixFS directory of name -> (CID, size) entries."""
+    links = sorted(entries.items(), key=lambda e: e[0].encode("utf-8"))
+    out = b""
+    for name, (cid_bytes, tsize) in links:
+        link = _bytes_field(1, cid_bytes) + _bytes_field(2, name.encode("utf-8")) + _uint_field(3, tsize)
+        out += _bytes_field(2, link)
+    block = out + _bytes_field(1, _uint_field(1, 1))  # UnixFS Type=Directory
+    return _cid_bytes(block, _DAG_PB, version), len(block) + sum(t for _, (_, t) in links)
+
+
+def directory_cids(files: Dict[str, Tuple[bytes, int]], version: int = 0) -> Dict[str, str]:
+    """
+    CIDs of every directory in a tree given as relative path -> file_node().
+    The root is "", so result[""] is what a wrapped directory upload pins as.
+    """
+    tree: dict = {}
+    for path, node in files.items():
+        parts = [p for p in path.split("/") if p]
+        cur = tree
+        for part in parts[:-1]:
+            cur = cur.setdefault(part, {})
+        cur[parts[-1]] = node
+
+    out: Dict[str, str] = {}
+
+    def _walk(node: dict, prefix: str) -> Tuple[bytes, int]:
+        entries = {name: (_walk(child, f"{prefix}{name}/") if isinstance(child, dict) else child)
+                   for name, child in node.items()}
+        cid_bytes, tsize = directory_node(entries, version)
+        out[prefix.rstrip("/")] = encode_cid(cid_bytes)
+        return cid_bytes, tsize
+
+    _walk(tree, "")
+    return out
@@ -0,0 +1,101 @@
+# modules/context.py
+# Token-budgeted dialogue context for the multi-agent session
+import os
+import re
+from collections import deque
+from typing import Dict, List, Optional
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "400"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "120"))
+
+try:  # exact counts when tiktoken is installed, approximate otherwise
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")  # gpt-4o family
+except Exception:
+    _ENCODING = None
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def approx_tokens(text: str) -> int:
+    """Fast BPE estimate: one token per word/punctuation mark, plus one per extra 6 chars."""
+    return sum(1 + (len(t) - 1) // 6 for t in _TOKEN_RE.findall(text))
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return approx_tokens(text)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the head of `text` within max_tokens, cutting on a word boundary."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words, used, kept = text.split(), 0, []
+    for w in words:
+        used += count_tokens(" " + w)
+        if used > max_tokens:
+            break
+        kept.append(w)
+    return " ".join(kept) + " …"
+
+
+class ContextWindow:
+    """
+    Rolling dialogue context kept within a token budget.
+
+    Recent turns are stored whole with their token counts; when the budget is
+    exceeded the oldest turns are folded into a compressed summary (their lead
+    sentence), which is itself capped at `summary_budget` tokens. render() is
+    cached until the next add(), so every agent of a turn shares one string.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, summary_budget: int = SUMMARY_TOKEN_BUDGET):
+        self.budget = budget
+        self.summary_budget = min(summary_budget, budget // 2)
+        self.turns: Dict[str, List[str]] = {}
+        self._recent = deque()  # (line, tokens)
+        self._recent_tokens = 0
+        self._summary = deque()  # (line, tokens)
+        self._summary_tokens = 0
+        self._rendered: Optional[str] = None
+
+    def add(self, role: str, text: str):
+        self.turns.setdefault(role, []).append(text)
+        line = f"[{role}] " + truncate_tokens(" ".join(text.split()), self.budget - self.summary_budget)
+        tokens = count_tokens(line)
+        self._recent.append((line, tokens))
+        self._recent_tokens += tokens
+        while self._recent_tokens + self._summary_tokens > self.budget and len(self._recent) > 1:
+            old, old_tokens = self._recent.popleft()
+            self._recent_tokens -= old_tokens
+            self._fold(old)
+        self._rendered = None
+
+    def _fold(self, line: str):
+        """Compress an evicted turn to its first sentence and add it to the summary."""
+        lead = _SENTENCE_RE.split(line, maxsplit=1)[0]
+        lead = truncate_tokens(lead, max(8, self.summary_budget // 4))
+        tokens = count_tokens(lead)
+        self._summary.append((lead, tokens))
+        self._summary_tokens += tokens
+        while self._summary_tokens > self.summary_budget and self._summary:
+            _, dropped = self._summary.popleft()
+            self._summary_tokens -= dropped
+
+    def latest(self) -> Dict[str, str]:
+        return {r: msgs[-1] for r, msgs in self.turns.items()}
+
+    def tokens(self) -> int:
+        return self._recent_tokens + self._summary_tokens
+
+    def render(self) -> str:
+        if self._rendered is None:
+            parts = []
+            if self._summary:
+                parts.append("Earlier: " + " | ".join(line for line, _ in self._summary))
+            parts.extend(line for line, _ in self._recent)
+            self._rendered = "\n".join(parts)
+        return self._rendered
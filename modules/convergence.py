@@ -0,0 +1,78 @@
+# modules/convergence.py
+# Novelty tracking and early stopping for multi-turn agent sessions
+import os
+import re
+from typing import Dict, List
+
+NOVELTY_THRESHOLD = float(os.getenv("NOVELTY_THRESHOLD", "0.3"))
+
+_STOP = set(
+    "a an the to for in of on with and or if from at by is are was were be been this that these those "
+    "it its as we you they our your their will can should would could may might not no yes also more "
+    "most very just than then so such into about over use using".split()
+)
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+
+def _features(text: str) -> set:
+    """Content-word unigrams plus bigrams: cheap, order-aware lexical fingerprint."""
+    words = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOP]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the lexical fingerprints (0 = disjoint, 1 = identical)."""
+    fa, fb = _features(a), _features(b)
+    if not fa or not fb:
+        return 0.0
+    return len(fa & fb) / len(fa | fb)
+
+
+class ConvergenceDetector:
+    """
+    Scores each new message by its novelty: 1 minus its highest similarity to
+    the same role's previous message or any other role's latest message. A
+    turn's novelty is the mean over its messages; the session has converged once
+    `patience` consecutive turns (after `min_turns`) fall below `threshold`.
+    """
+
+    def __init__(self, threshold: float = NOVELTY_THRESHOLD, min_turns: int = 2, patience: int = 1):
+        self.threshold = threshold
+        self.min_turns = max(1, min_turns)
+        self.patience = max(1, patience)
+        self.novelty: List[float] = []
+        self._latest: Dict[str, str] = {}
+        self._turn: List[float] = []
+        self._low_streak = 0
+
+    def observe(self, role: str, text: str) -> float:
+        seen = list(self._latest.values())
+        score = 1.0 - max((similarity(text, prev) for prev in seen), default=0.0)
+        self._latest[role] = text
+        self._turn.append(score)
+        return score
+
+    def end_turn(self) -> float:
+        score = sum(self._turn) / len(self._turn) if self._turn else 1.0
+        self._turn = []
+        self.novelty.append(round(score, 3))
+        if len(self.novelty) >= self.min_turns and score < self.threshold:
+            self._low_streak += 1
+        else:
+            self._low_streak = 0
+        return score
+
+    @property
+    def converged(self) -> bool:
+        return self._low_streak >= self.patience
+
+    def report(self, max_steps: int, stop_reason: str = "max_steps") -> dict:
+        """`stop_reason` is the caller's: "converged" only if it actually stopped on convergence."""
+        turns = len(self.novelty)
+        return {
+            "stop_reason": stop_reason,
+            "turns_run": turns,
+            "turns_saved": max(0, max_steps - turns),
+            "novelty": list(self.novelty),
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,180 @@
+# modules/enrich.py
+# Article enrichment: fetch candidate pages concurrently (bounded pool, per-host
+# limits, size caps, streaming reads that stop after the first paragraphs),
+# extract title/description, cache by URL and rank against the consensus.
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+
+from modules import telemetry
+from modules.search import HEADERS, HTML_PARSER
+
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "8"))
+ENRICH_PER_HOST = int(os.getenv("ENRICH_PER_HOST", "2"))
+ENRICH_MAX_BYTES = int(os.getenv("ENRICH_MAX_BYTES", str(96 * 1024)))
+ENRICH_TIMEOUT = float(os.getenv("ENRICH_TIMEOUT", "5"))
+ENRICH_CACHE_TTL = float(os.getenv("ENRICH_CACHE_TTL", "86400"))     # seconds
+ENRICH_CACHE_ENTRIES = int(os.getenv("ENRICH_CACHE_ENTRIES", "1024"))
+# Stop reading once this many paragraphs have arrived; title and meta tags come before them.
+ENRICH_PARAGRAPHS = 3
+_FAILURE_TTL = 300.0
+
+_HEAD_TAGS = SoupStrainer(["title", "meta", "p"])
+
+
+class Article(NamedTuple):
+    title: str
+    url: str
+    snippet: str = ""
+    description: str = ""
+    text: str = ""
+    fetched: bool = False
+
+    def document(self) -> str:
+        return " ".join(p for p in (self.title, self.snippet, self.description, self.text) if p)
+
+
+def extract_page_info(html: str) -> Dict[str, str]:
+    """Title, meta/OpenGraph description and the opening paragraphs of a (possibly truncated) page."""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=_HEAD_TAGS)
+    meta = {}
+    for tag in soup.find_all("meta"):
+        key = (tag.get("property") or tag.get("name") or "").lower()
+        if key in ("og:title", "og:description", "description", "twitter:description") and tag.get("content"):
+            meta.setdefault(key, tag["content"].strip())
+    title = soup.find("title")
+    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")[:ENRICH_PARAGRAPHS]]
+    return {
+        "title": meta.get("og:title") or (title.get_text(strip=True) if title else ""),
+        "description": meta.get("description") or meta.get("og:description") or meta.get("twitter:description", ""),
+        "text": " ".join(p for p in paragraphs if p)[:2000],
+    }
+
+
+class ArticleEnricher:
+    """
+    Shared page fetcher. At most `per_host` requests run against one host at a
+    time, each read stops at `max_bytes` or after the first paragraphs, and
+    results (including failures, briefly) are cached per URL.
+    """
+
+    def __init__(self, workers: int = ENRICH_WORKERS, per_host: int = ENRICH_PER_HOST,
+                 max_bytes: int = ENRICH_MAX_BYTES, timeout: float = ENRICH_TIMEOUT,
+                 ttl: float = ENRICH_CACHE_TTL, max_entries: int = ENRICH_CACHE_ENTRIES):
+        self.workers = workers
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.http = requests.Session()
+        self.http.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=per_host)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self._hosts: Dict[str, threading.Semaphore] = {}
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "fetched": 0, "errors": 0, "bytes": 0}
+
+    def _host_slot(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.Semaphore(self.per_host)
+            return self._hosts[host]
+
+    def _read_head(self, url: str) -> Optional[str]:
+        """Stream the page and stop after the opening paragraphs or the size cap."""
+        with self._host_slot(url), telemetry.timed("http", "enrich:page") as rec:
+            with self.http.get(url, timeout=self.timeout, stream=True) as res:
+                res.raise_for_status()
+                if "html" not in res.headers.get("Content-Type", "text/html"):
+                    return None
+                buf = bytearray()
+                for chunk in res.iter_content(chunk_size=8192):
+                    buf.extend(chunk)
+                    if len(buf) >= self.max_bytes or buf.lower().count(b"</p>") >= ENRICH_PARAGRAPHS:
+                        break
+                rec["bytes"] = len(buf)
+                encoding = res.encoding if res.encoding and res.encoding.lower() != "iso-8859-1" else "utf-8"
+        with self._lock:
+            self.stats["bytes"] += len(buf)
+        return bytes(buf[:self.max_bytes]).decode(encoding, errors="replace")
+
+    def page_info(self, url: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            hit = self._cache.get(url)
+            if hit and time.time() < hit[0]:
+                self._cache.move_to_end(url)
+                self.stats["hits"] += 1
+                return hit[1]
+        try:
+            html = self._read_head(url)
+            info = extract_page_info(html) if html else None
+            ttl = self.ttl if info else _FAILURE_TTL
+            with self._lock:
+                self.stats["fetched"] += 1
+        except Exception as e:
+            print("📰 Article fetch failed:", url, type(e).__name__)
+            info, ttl = None, _FAILURE_TTL
+            with self._lock:
+                self.stats["errors"] += 1
+        with self._lock:
+            self._cache[url] = (time.time() + ttl, info)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return info
+
+    def enrich(self, results: Sequence) -> List[Article]:
+        """Fetch every candidate concurrently; results are (title, url[, snippet]) tuples."""
+        def _one(result) -> Article:
+            title, url = result[0], result[1]
+            snippet = result[2] if len(result) > 2 else ""
+            info = self.page_info(url) if url.startswith(("http://", "https://")) else None
+            if not info:
+                return Article(title, url, snippet)
+            return Article(title or info["title"], url, snippet, info["description"], info["text"], True)
+
+        if not results:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(results)))) as pool:
+            futures = [telemetry.submit(pool, _one, r) for r in results]
+            return [f.result() for f in futures]
+
+
+def rank_articles(articles: Sequence[Article], reference: str) -> List[Article]:
+    """Order articles by TF-IDF cosine similarity to `reference`; search order breaks ties."""
+    articles = list(articles)
+    if len(articles) < 2 or not reference.strip():
+        return articles
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    try:
+        matrix = TfidfVectorizer(stop_words="english", sublinear_tf=True).fit_transform(
+            [reference] + [a.document() for a in articles])
+    except ValueError:  # empty vocabulary
+        return articles
+    scores = cosine_similarity(matrix[0], matrix[1:])[0]
+    order = sorted(range(len(articles)), key=lambda i: (-scores[i], i))
+    return [articles[i] for i in order]
+
+
+_enricher: Optional[ArticleEnricher] = None
+_enricher_lock = threading.Lock()
+
+def get_enricher() -> ArticleEnricher:
+    global _enricher
+    with _enricher_lock:
+        if _enricher is None:
+            _enricher = ArticleEnricher()
+    return _enricher
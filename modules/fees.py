@@ -0,0 +1,167 @@
+# modules/fees.py
+# Fee oracle and gas-estimate cache for minting: base fee and priority-fee
+# percentiles are refreshed once per new block (eth_feeHistory) by a poller
+# that runs only while minting is active, and safeMint gas estimates are
+# cached per URI length bucket and kind of recipient and revalidated
+# periodically, so building a mint transaction needs no RPC round-trips in
+# steady state.
+import os
+import time
+import threading
+from statistics import median
+from typing import Callable, Dict, Optional, Tuple
+
+FEE_POLL = float(os.getenv("FEE_POLL", "1"))                       # seconds between block checks
+FEE_HISTORY_BLOCKS = int(os.getenv("FEE_HISTORY_BLOCKS", "10"))
+FEE_MAX_AGE = float(os.getenv("FEE_MAX_AGE", "15"))                 # older quotes are refreshed inline
+FEE_IDLE = float(os.getenv("FEE_IDLE", "120"))                      # poller stops after this long unused
+FEE_MIN_PRIORITY_GWEI = float(os.getenv("FEE_MIN_PRIORITY_GWEI", "1"))
+GAS_REVALIDATE_SECS = float(os.getenv("GAS_REVALIDATE_SECS", "600"))
+GAS_REVALIDATE_USES = int(os.getenv("GAS_REVALIDATE_USES", "50"))
+
+# Percentile of recent priority fees paid, per urgency.
+PERCENTILES = {"low": 25, "normal": 50, "high": 75}
+
+
+class FeeOracle:
+    """
+    Cached (maxFeePerGas, maxPriorityFeePerGas) quotes. maxFeePerGas leaves
+    room for the base fee to double; the tip is the median over recent blocks
+    of the chosen reward percentile, floored at FEE_MIN_PRIORITY_GWEI.
+    """
+
+    def __init__(self, web3, poll: float = FEE_POLL, history: int = FEE_HISTORY_BLOCKS,
+                 max_age: float = FEE_MAX_AGE, idle: float = FEE_IDLE):
+        self.web3 = web3
+        self.poll = poll
+        self.history = history
+        self.max_age = max_age
+        self.idle = idle
+        self.min_priority = web3.to_wei(FEE_MIN_PRIORITY_GWEI, "gwei")
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._block: Optional[int] = None
+        self._base_fee = 0
+        self._tips: Dict[str, int] = {}
+        self._updated = 0.0
+        self._last_used = 0.0
+        self._poller: Optional[threading.Thread] = None
+        self.stats = {"quotes": 0, "refreshes": 0, "inline_refreshes": 0}
+
+    def _fetch(self, block: Optional[int] = None):
+        """One eth_feeHistory call: next block's base fee and recent reward percentiles."""
+        try:
+            hist = self.web3.eth.fee_history(self.history, "latest", list(PERCENTILES.values()))
+            base_fee = int(hist["baseFeePerGas"][-1])  # the pending block's base fee
+            rewards = [r for r in (hist.get("reward") or []) if r]
+            tips = {name: int(median(r[i] for r in rewards)) if rewards else 0
+                    for i, name in enumerate(PERCENTILES)}
+            block = block if block is not None else int(hist["oldestBlock"]) + len(hist["baseFeePerGas"]) - 2
+        except Exception:
+            # nodes without eth_feeHistory: latest base fee and the node's suggested tip
+            latest = self.web3.eth.get_block("latest")
+            base_fee = int(latest.get("baseFeePerGas", self.web3.to_wei("1", "gwei")))
+            tip = int(self.web3.eth.max_priority_fee)
+            tips = {name: tip for name in PERCENTILES}
+            block = latest["number"]
+        with self._lock:
+            self._block, self._base_fee, self._tips = block, base_fee, tips
+            self._updated = time.time()
+            self.stats["refreshes"] += 1
+
+    def _poll(self):
+        while time.time() - self._last_used < self.idle:
+            try:
+                number = self.web3.eth.block_number
+                if number != self._block:
+                    self._fetch(number)
+            except Exception as e:
+                if self._last_used:  # not stopped while the request was out
+                    print("⛽ Fee oracle:", type(e).__name__, e)
+            time.sleep(self.poll)
+        with self._lock:
+            self._poller = None
+
+    def _ensure_poller(self):
+        with self._lock:
+            self._last_used = time.time()
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, daemon=True)
+                self._poller.start()
+
+    def quote(self, urgency: str = "normal") -> Tuple[int, int]:
+        self._ensure_poller()
+        if time.time() - self._updated > self.max_age:
+            with self._refresh_lock:  # first use, or the poller fell behind
+                if time.time() - self._updated > self.max_age:
+                    self._fetch()
+                    self.stats["inline_refreshes"] += 1
+        with self._lock:
+            self.stats["quotes"] += 1
+            priority = max(self.min_priority, self._tips.get(urgency, 0))
+            return int(2 * self._base_fee + priority), int(priority)
+
+    def stop(self):
+        """Let the poller exit at its next check (it restarts on the next quote)."""
+        with self._lock:
+            self._last_used = 0.0
+
+    @property
+    def base_fee(self) -> int:
+        return self._base_fee
+
+
+class GasEstimateCache:
+    """
+    Gas estimates keyed by (function, URI length in 32-byte words, recipient
+    kind). The URI is stored on-chain one 32-byte slot at a time, and the
+    recipient decides the rest: a zero balance slot costs a fresh write and a
+    contract runs onERC721Received, so the caller passes e.g. "holder", "new"
+    or a per-contract kind. Calls in one bucket cost the same up to calldata;
+    the largest estimate seen is kept, and a bucket is re-estimated every
+    GAS_REVALIDATE_USES uses or GAS_REVALIDATE_SECS seconds, or as soon as a
+    receipt shows more gas used.
+    """
+
+    def __init__(self, revalidate_secs: float = GAS_REVALIDATE_SECS, revalidate_uses: int = GAS_REVALIDATE_USES):
+        self.revalidate_secs = revalidate_secs
+        self.revalidate_uses = revalidate_uses
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, list] = {}  # key -> [gas, estimated_at, uses]
+        self.stats = {"hits": 0, "estimates": 0}
+
+    @staticmethod
+    def key(function: str, uri: str, kind: str = "") -> tuple:
+        return function, (len(uri.encode("utf-8")) + 31) // 32, kind
+
+    def get(self, function: str, uri: str, estimate: Callable[[], int], kind: str = "") -> int:
+        key = self.key(function, uri, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry and entry[2] < self.revalidate_uses
+                    and time.time() - entry[1] < self.revalidate_secs):
+                entry[2] += 1
+                self.stats["hits"] += 1
+                return entry[0]
+        gas = int(estimate())
+        with self._lock:
+            self.stats["estimates"] += 1
+            entry = self._entries.get(key)
+            self._entries[key] = [max(gas, entry[0]) if entry else gas, time.time(), 1]
+            return self._entries[key][0]
+
+    def invalidate(self, function: str, uri: str, kind: str = ""):
+        with self._lock:
+            self._entries.pop(self.key(function, uri, kind), None)
+
+    def observe(self, function: str, uri: str, gas_used: int, gas_limit: int, kind: str = ""):
+        """Learn from a receipt: raise the bucket if more gas was used; drop it on an out-of-gas."""
+        key = self.key(function, uri, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return
+            if gas_used >= gas_limit:
+                del self._entries[key]
+            elif gas_used > entry[0]:
+                entry[0] = gas_used
@@ -0,0 +1,252 @@
+# modules/gateway.py
+# IPFS content resolution for previews: a local size-bounded content cache
+# keyed by CID (primed at upload time), and on a miss a race across several
+# public gateways where the first verified response wins and the rest are
+# cancelled.
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules import telemetry
+from modules.cid import compute_cid
+
+IPFS_GATEWAYS = [g.strip().rstrip("/") + "/" for g in os.getenv(
+    "IPFS_GATEWAYS",
+    "https://gateway.pinata.cloud/ipfs/,https://ipfs.io/ipfs/,https://dweb.link/ipfs/,https://w3s.link/ipfs/",
+).split(",") if g.strip()]
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "15"))
+GATEWAY_MAX_BYTES = int(os.getenv("GATEWAY_MAX_BYTES", str(32 * 1024 * 1024)))
+GATEWAY_CACHE_DIR = os.getenv("GATEWAY_CACHE_DIR", os.path.join(".neuroweave", "ipfs"))
+GATEWAY_CACHE_BYTES = int(os.getenv("GATEWAY_CACHE_BYTES", str(256 * 1024 * 1024)))
+# Previews up to this size are inlined as data URIs; larger ones link to a gateway
+PREVIEW_INLINE_BYTES = int(os.getenv("PREVIEW_INLINE_BYTES", str(512 * 1024)))
+_COPY_BYTES = 256 * 1024
+
+
+def split_uri(uri: str) -> Tuple[str, str]:
+    """ipfs://CID/path (or a gateway URL) -> (CID, path)."""
+    if uri.startswith("ipfs://"):
+        rest = uri[len("ipfs://"):]
+    elif "/ipfs/" in uri:
+        rest = uri.split("/ipfs/", 1)[1]
+    else:
+        rest = uri
+    cid, _, path = rest.split("?", 1)[0].strip("/").partition("/")
+    return cid, path.strip("/")
+
+
+def cid_version(cid: str) -> int:
+    return 0 if cid.startswith("Qm") else 1
+
+
+def verify(cid: str, data: bytes) -> bool:
+    """True if `data` hashes to `cid` under the importer defaults modules.cid reproduces."""
+    return compute_cid(data, cid_version(cid)) == cid
+
+
+class ContentCache:
+    """
+    On-disk cache of IPFS content keyed by CID[/path], evicting least recently
+    used entries past `max_bytes`. Content under a CID never changes, so
+    entries never go stale.
+    """
+
+    def __init__(self, path: str = GATEWAY_CACHE_DIR, max_bytes: int = GATEWAY_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        # file name -> (last use, size), oldest first
+        entries = []
+        for entry in os.scandir(path):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.name, st.st_size))
+        self._entries = {name: (used, size) for used, name, size in sorted(entries)}
+        self.size = sum(size for _, size in self._entries.values())
+
+    @staticmethod
+    def _name(cid: str, path: str = "") -> str:
+        if not path:
+            return cid
+        return f"{cid}.{hashlib.sha256(path.encode('utf-8')).hexdigest()[:16]}"
+
+    def sizeof(self, cid: str, path: str = "") -> Optional[int]:
+        entry = self._entries.get(self._name(cid, path))
+        return entry[1] if entry else None
+
+    def get(self, cid: str, path: str = "") -> Optional[bytes]:
+        name = self._name(cid, path)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries[name] = (time.time(), self._entries.pop(name)[1])
+        try:
+            with open(os.path.join(self.path, name), "rb") as f:
+                data = f.read()
+            os.utime(os.path.join(self.path, name))
+            return data
+        except OSError:
+            with self._lock:
+                self._drop(name)
+            return None
+
+    def put(self, cid: str, source, path: str = "") -> int:
+        """Store bytes or a binary file object (copied from its current position); returns the size."""
+        name = self._name(cid, path)
+        tmp = os.path.join(self.path, f"{name}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as out:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                out.write(source)
+            else:
+                for chunk in iter(lambda: source.read(_COPY_BYTES), b""):
+                    out.write(chunk)
+            size = out.tell()
+        if size > self.max_bytes:
+            os.remove(tmp)
+            return size
+        os.replace(tmp, os.path.join(self.path, name))
+        with self._lock:
+            self._drop(name, unlink=False)
+            self._entries[name] = (time.time(), size)
+            self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+        return size
+
+    def _drop(self, name: str, unlink: bool = True):
+        entry = self._entries.pop(name, None)
+        if entry:
+            self.size -= entry[1]
+            if unlink:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+
+class GatewayResolver:
+    """
+    Resolves ipfs:// URIs to bytes: local cache first, otherwise every gateway
+    is asked at once and the first complete response that verifies against
+    the CID wins; the other downloads are abandoned mid-stream.
+
+    Only whole-CID URIs can be verified locally; for CID/path URIs the bytes
+    are checked against nothing but the gateway's status, so prime() those
+    at upload time when the content is at hand.
+    """
+
+    def __init__(self, gateways: Optional[List[str]] = None, cache: Optional[ContentCache] = None,
+                 timeout: float = GATEWAY_TIMEOUT, max_bytes: int = GATEWAY_MAX_BYTES):
+        self.gateways = list(gateways or IPFS_GATEWAYS)
+        self.cache = cache
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(1, len(self.gateways)), pool_maxsize=4)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "fetched": 0, "rejected": 0, "errors": 0, "wins": {}}
+
+    def url(self, uri: str) -> str:
+        """Browser-facing URL on the first configured gateway."""
+        cid, path = split_uri(uri)
+        return f"{self.gateways[0]}{cid}" + (f"/{path}" if path else "")
+
+    def prime(self, uri: str, source) -> None:
+        """Cache content already held locally (e.g. just uploaded) under its URI."""
+        if self.cache:
+            cid, path = split_uri(uri)
+            self.cache.put(cid, source, path)
+
+    def _download(self, gateway: str, cid: str, path: str, cancel: threading.Event,
+                  limit: int) -> Optional[bytes]:
+        url = f"{gateway}{cid}" + (f"/{path}" if path else "")
+        with self.http.get(url, timeout=self.timeout, stream=True) as res:
+            res.raise_for_status()
+            buf = bytearray()
+            for chunk in res.iter_content(chunk_size=65536):
+                if cancel.is_set():
+                    return None
+                buf.extend(chunk)
+                if len(buf) > limit:
+                    raise ValueError(f"{url} exceeds {limit} bytes")
+        data = bytes(buf)
+        if not path and not verify(cid, data):
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise ValueError(f"{url} returned content that does not match {cid}")
+        return data
+
+    def fetch(self, uri: str, max_bytes: Optional[int] = None) -> bytes:
+        """Content of `uri`; ValueError if it is larger than `max_bytes` (default: the resolver's limit)."""
+        cid, path = split_uri(uri)
+        limit = min(max_bytes, self.max_bytes) if max_bytes is not None else self.max_bytes
+        if self.cache:
+            size = self.cache.sizeof(cid, path)
+            if size is not None and size > limit:
+                raise ValueError(f"{uri} is {size} bytes, over {limit}")
+            data = self.cache.get(cid, path)
+            if data is not None:
+                with self._lock:
+                    self.stats["hits"] += 1
+                return data
+
+        cancel = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=len(self.gateways))
+        errors = []
+        try:
+            with telemetry.timed("http", "ipfs:gateway") as rec:
+                pending = {telemetry.submit(pool, self._download, g, cid, path, cancel, limit): g
+                           for g in self.gateways}
+                data = None
+                while pending and data is None:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for job in done:
+                        gateway = pending.pop(job)
+                        try:
+                            data = job.result()
+                        except Exception as e:
+                            errors.append(f"{gateway}: {type(e).__name__}")
+                            continue
+                        rec["gateway"] = gateway
+                        rec["bytes"] = len(data)
+                        with self._lock:
+                            self.stats["fetched"] += 1
+                            self.stats["wins"][gateway] = self.stats["wins"].get(gateway, 0) + 1
+                        break
+        finally:
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if data is None:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise RuntimeError(f"No gateway served {uri} ({'; '.join(errors)})")
+        if self.cache:
+            self.cache.put(cid, data, path)
+        return data
+
+
+_resolver: Optional[GatewayResolver] = None
+_resolver_lock = threading.Lock()
+
+def get_resolver() -> GatewayResolver:
+    """Shared resolver; the content cache is skipped if its directory can't be created."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            try:
+                cache = ContentCache() if GATEWAY_CACHE_BYTES > 0 else None
+            except OSError as e:
+                print("⚠️ IPFS content cache disabled:", e)
+                cache = None
+            _resolver = GatewayResolver(cache=cache)
+    return _resolver
@@ -1,49 +1,479 @@
 # modules/ipfs.py
 # Handles IPFS file uploads via Pinata for NeuroWeave AI
+#
+# CIDs are computed locally (modules.cid) and checked against a local index of
+# pinned CIDs (and, optionally, Pinata's pin list) first, so content that is
+# already pinned is never uploaded again.
+import io
 import os
-import requests
+import time
 import json
+import uuid
+import shutil
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-PINATA_API_KEY = os.getenv("PINATA_API_KEY")
-PINATA_SECRET_API_KEY = os.getenv("PINATA_SECRET_API_KEY")
+import requests
 
-def upload_to_pinata(filename: str, data: bytes, content_type: str):
-    """
-    Uploads a file to Pinata IPFS and returns (ipfs://CID, CID)
-    """
-    url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-    headers = {
+from modules import telemetry
+from modules.cid import compute_cid, directory_cids, file_node
+from modules.gateway import get_resolver
+
+PINATA_API_KEY = (os.getenv("PINATA_API_KEY") or "").strip()
+PINATA_SECRET_API_KEY = (os.getenv("PINATA_SECRET_API_KEY") or "").strip()
+PINATA_API_URL = os.getenv("PINATA_API_URL", "https://api.pinata.cloud").rstrip("/")
+PINATA_CID_VERSION = int(os.getenv("PINATA_CID_VERSION", "0"))
+# Ask Pinata whether a CID is pinned before uploading it (costs one small request).
+PINATA_CHECK_PINLIST = os.getenv("PINATA_CHECK_PINLIST", "1") != "0"
+PIN_INDEX_PATH = os.getenv("PIN_INDEX_PATH", os.path.join(".neuroweave", "pins.sqlite"))
+PINATA_MAX_UPLOAD_BYTES = int(os.getenv("PINATA_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 256 * 1024
+_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def _headers() -> dict:
+    return {
         "pinata_api_key": PINATA_API_KEY,
         "pinata_secret_api_key": PINATA_SECRET_API_KEY,
     }
-    files = {"file": (filename, data, content_type)}
-    res = requests.post(url, headers=headers, files=files, timeout=60)
+
+
+class PinIndex:
+    """
+    Locally computed CID -> CID pinned on Pinata, for content this install has
+    pinned (or seen pinned). The two only differ if Pinata chunked differently.
+    """
+
+    def __init__(self, path: str = PIN_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db().execute(
+            "CREATE TABLE IF NOT EXISTS pins"
+            " (cid TEXT PRIMARY KEY, pinned_cid TEXT NOT NULL, name TEXT, size INTEGER, pinned_at REAL NOT NULL)"
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, cid: str) -> Optional[str]:
+        row = self._db().execute("SELECT pinned_cid FROM pins WHERE cid = ?", (cid,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, cid: str, pinned_cid: Optional[str] = None, name: str = "", size: int = 0):
+        self._db().execute(
+            "INSERT OR REPLACE INTO pins (cid, pinned_cid, name, size, pinned_at) VALUES (?, ?, ?, ?, ?)",
+            (cid, pinned_cid or cid, name, size, time.time()))
+
+    def forget(self, cid: str):
+        self._db().execute("DELETE FROM pins WHERE cid = ?", (cid,))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_pin_index() -> Optional[PinIndex]:
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = PinIndex()
+            except (OSError, sqlite3.Error) as e:
+                print("📌 Pin index unavailable:", e)
+                return None
+    return _index
+
+
+def pinned_on_pinata(cid: str) -> bool:
+    """True if Pinata lists `cid` as pinned on this account (False on any error)."""
+    try:
+        with telemetry.timed("http", "pinata:pinlist"):
+            res = requests.get(f"{PINATA_API_URL}/data/pinList", headers=_headers(),
+                               params={"hashContains": cid, "status": "pinned", "pageLimit": 1}, timeout=10)
+        return res.status_code == 200 and any(r.get("ipfs_pin_hash") == cid for r in res.json().get("rows", []))
+    except (requests.RequestException, ValueError):
+        return False
+
+
+class _Source:
+    """
+    Bytes, a path or a binary file object, opened for reading with its size
+    known. Non-seekable streams are spooled (to disk past a few MiB) so the
+    content can be read twice: once for the CID, once for the upload.
+    """
+
+    def __init__(self, source):
+        self._close = False
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.fh = io.BytesIO(source)
+        elif isinstance(source, (str, os.PathLike)):
+            self.fh, self._close = open(source, "rb"), True
+        elif getattr(source, "seekable", lambda: False)():
+            self.fh = source
+        else:
+            self.fh, self._close = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES), True
+            shutil.copyfileobj(source, self.fh, UPLOAD_CHUNK_BYTES)
+            self.fh.seek(0)
+        self.start = self.fh.tell()
+        self.size = self.fh.seek(0, io.SEEK_END) - self.start
+        self.rewind()
+
+    def rewind(self):
+        self.fh.seek(self.start)
+
+    def close(self):
+        if self._close:
+            self.fh.close()
+
+
+class MultipartStream:
+    """
+    multipart/form-data body for pinFileToIPFS that reads each file in
+    UPLOAD_CHUNK_BYTES pieces as the socket asks for them, with a known
+    Content-Length. `files` are (filename, file object, size, content type);
+    several files with "dir/..." names make Pinata pin a directory.
+    `progress(sent, total)` is called as file bytes are read.
+    """
+
+    def __init__(self, files: list, fields: dict, progress=None):
+        self.boundary = uuid.uuid4().hex
+        head = b""
+        for name, value in fields.items():
+            head += (f"--{self.boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                     f"{value}\r\n").encode("utf-8")
+        # (reader, bytes left for file parts / None for fixed framing)
+        self._parts = [(io.BytesIO(head), None)]
+        self.length = len(head)
+        for filename, fh, size, content_type in files:
+            safe_name = filename.replace('"', "_").replace("\r", "").replace("\n", "")
+            part_head = (f"--{self.boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+                         f"filename=\"{safe_name}\"\r\nContent-Type: {content_type}\r\n\r\n").encode("utf-8")
+            self._parts += [(io.BytesIO(part_head), None), (fh, size), (io.BytesIO(b"\r\n"), None)]
+            self.length += len(part_head) + size + 2
+        tail = f"--{self.boundary}--\r\n".encode("ascii")
+        self._parts.append((io.BytesIO(tail), None))
+        self.length += len(tail)
+        self._total = sum(f[2] for f in files)
+        self._progress = progress
+        self._sent = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        size = UPLOAD_CHUNK_BYTES if size is None or size < 0 else size
+        while self._parts:
+            part, left = self._parts[0]
+            if left is None:
+                data = part.read(size)
+            else:
+                # never read past the measured size (the file object may be shared)
+                data = part.read(min(size, left)) if left else b""
+                self._parts[0] = (part, left - len(data))
+                self._sent += len(data)
+                if data and self._progress:
+                    self._progress(self._sent, self._total)
+            if data:
+                return data
+            self._parts.pop(0)
+        return b""
+
+
+def _pin_files(files: list, options: dict, progress=None, label: str = "pinata:file") -> str:
+    """Stream (filename, file object, size, content type) parts to pinFileToIPFS; returns the pinned CID."""
+    body = MultipartStream(files, {k: json.dumps(v) for k, v in options.items()}, progress)
+    headers = dict(_headers(), **{"Content-Type": body.content_type, "Content-Length": str(len(body))})
+    with telemetry.timed("http", label, bytes=sum(f[2] for f in files), files=len(files)):
+        res = requests.post(f"{PINATA_API_URL}/pinning/pinFileToIPFS", headers=headers, data=body,
+                            timeout=(10, 300))
 
     if res.status_code != 200:
         raise RuntimeError(f"Pinata upload failed: {res.text}")
 
     j = res.json()
-    cid = j.get("IpfsHash")
-    if not cid:
+    pinned = j.get("IpfsHash")
+    if not pinned:
         raise RuntimeError(f"Unexpected Pinata response: {j}")
+    return pinned
+
+
+def ensure_pinned(filename: str, source, content_type: str, progress=None,
+                  cid: Optional[str] = None) -> Tuple[str, str, bool]:
+    """
+    Pin content on Pinata unless its CID is already pinned. `source` is bytes,
+    a path or a binary file object; it is streamed, never loaded whole.
+    Returns (ipfs://CID, CID, uploaded).
+    """
+    src = _Source(source)
+    try:
+        if src.size > PINATA_MAX_UPLOAD_BYTES:
+            raise ValueError(f"{filename} is {src.size} bytes; the upload limit is {PINATA_MAX_UPLOAD_BYTES}"
+                             " (PINATA_MAX_UPLOAD_BYTES)")
+        if cid is None:
+            cid = compute_cid(src.fh, PINATA_CID_VERSION)
+            src.rewind()
+        index = get_pin_index()
+        known = index.get(cid) if index else None
+        if known:
+            if progress:
+                progress(src.size, src.size)
+            return f"ipfs://{known}", known, False
+        if PINATA_CHECK_PINLIST and pinned_on_pinata(cid):
+            if index:
+                index.add(cid, name=filename, size=src.size)
+            if progress:
+                progress(src.size, src.size)
+            return f"ipfs://{cid}", cid, False
 
-    return f"ipfs://{cid}", cid
+        pinned = _pin_files([(filename, src.fh, src.size, content_type)],
+                            {"pinataOptions": {"cidVersion": PINATA_CID_VERSION}}, progress)
+    finally:
+        src.close()
+
+    if pinned != cid:
+        print(f"📌 Local CID {cid} differs from Pinata's {pinned}")
+    if index:
+        index.add(cid, pinned, filename, src.size)
+    return f"ipfs://{pinned}", pinned, True
+
+
+def upload_to_pinata(filename: str, data, content_type: str, progress=None):
+    """
+    Uploads a file (bytes, path or binary file object) to Pinata IPFS and returns (ipfs://CID, CID)
+    """
+    uri, cid, _ = ensure_pinned(filename, data, content_type, progress)
+    return uri, cid
+
+
+def metadata_bytes(metadata: dict) -> bytes:
+    """Canonical metadata.json bytes, so identical metadata always has the same CID."""
+    return json.dumps(metadata, ensure_ascii=False).encode("utf-8")
 
 
 def upload_metadata_to_pinata(metadata: dict):
     """
-    Uploads JSON metadata to Pinata
+    Uploads JSON metadata to Pinata (as metadata.json, so its CID can be computed locally)
     """
-    url = "https://api.pinata.cloud/pinning/pinJSONToIPFS"
-    headers = {
-        "pinata_api_key": PINATA_API_KEY,
-        "pinata_secret_api_key": PINATA_SECRET_API_KEY,
-        "Content-Type": "application/json",
-    }
-    res = requests.post(url, headers=headers, data=json.dumps(metadata), timeout=60)
-    if res.status_code != 200:
-        raise RuntimeError(f"Pinata metadata upload failed: {res.text}")
+    return upload_to_pinata("metadata.json", metadata_bytes(metadata), "application/json")
 
-    j = res.json()
-    cid = j.get("IpfsHash")
-    return f"ipfs://{cid}", cid
+
+def _pinned_cid(cid: str) -> str:
+    index = get_pin_index()
+    return (index.get(cid) if index else None) or cid
+
+
+def expected_cid(source) -> str:
+    """The CID `source` will be pinned under, known before (or without) uploading it."""
+    src = _Source(source)
+    try:
+        return _pinned_cid(compute_cid(src.fh, PINATA_CID_VERSION))
+    finally:
+        src.rewind()
+        src.close()
+
+
+class NFTPinJob:
+    """
+    Pins an NFT's image and metadata.json concurrently. Both URIs are known up
+    front from the locally computed CIDs, so the metadata (which embeds the
+    image URI) and the mint transaction can be prepared while the uploads run;
+    wait() confirms both pins before anything is sent on-chain. Both files are
+    also put in the gateway content cache so previews never hit the network.
+    """
+
+    def __init__(self, metadata: dict, image: Optional[tuple] = None):
+        """`image` is (filename, bytes/path/file object, content type)."""
+        self.metadata = dict(metadata)
+        self.progress = {}
+        self._pool = ThreadPoolExecutor(max_workers=2)
+        self.image_uri = self._image_job = None
+        if image:
+            name, source, content_type = image
+            src = _Source(source)
+            cid = compute_cid(src.fh, PINATA_CID_VERSION)
+            src.rewind()
+            self.image_uri = f"ipfs://{_pinned_cid(cid)}"
+            self.metadata["image"] = self.image_uri
+            self._prime(self.image_uri, src.fh)
+            src.rewind()
+            self.progress["image"] = (0, src.size)
+            self._image_job = telemetry.submit(self._pool, ensure_pinned, name, src.fh, content_type,
+                                               self._tracker("image"), cid)
+            self._image_job.add_done_callback(lambda _: src.close())
+        meta = metadata_bytes(self.metadata)
+        self.metadata_uri = f"ipfs://{expected_cid(meta)}"
+        self._prime(self.metadata_uri, meta)
+        self.progress["metadata"] = (0, len(meta))
+        self._meta_job = telemetry.submit(self._pool, ensure_pinned, "metadata.json", meta, "application/json",
+                                          self._tracker("metadata"))
+        self._pool.shutdown(wait=False)
+
+    @staticmethod
+    def _prime(uri: str, source):
+        """Cache the content for previews now, while it is at hand (best effort)."""
+        try:
+            get_resolver().prime(uri, source)
+        except OSError as e:
+            print("⚠️ Could not cache", uri, e)
+
+    def _tracker(self, key: str):
+        def _update(sent: int, total: int):
+            self.progress[key] = (sent, total)
+        return _update
+
+    def sent(self) -> Tuple[int, int]:
+        """(bytes sent, bytes to send) across both uploads."""
+        values = list(self.progress.values())
+        return sum(v[0] for v in values), sum(v[1] for v in values)
+
+    @staticmethod
+    def _confirm(job: Future, expected_uri: str) -> bool:
+        uri, _, uploaded = job.result()
+        if uri != expected_uri:
+            raise RuntimeError(f"Pinned {uri}, but the metadata references {expected_uri}")
+        return uploaded
+
+    def wait(self, on_progress=None, poll: float = 0.2) -> dict:
+        """
+        Block until both pins are confirmed; returns {"image": uploaded?, "metadata": uploaded?}.
+        `on_progress(sent, total)` runs in the calling thread (safe for UI updates).
+        """
+        jobs = [j for j in (self._image_job, self._meta_job) if j]
+        while on_progress and not all(j.done() for j in jobs):
+            on_progress(*self.sent())
+            time.sleep(poll)
+        result = {
+            "image": self._confirm(self._image_job, self.image_uri) if self._image_job else None,
+            "metadata": self._confirm(self._meta_job, self.metadata_uri),
+        }
+        if on_progress:
+            on_progress(*self.sent())
+        return result
+
+
+# ------------------- BATCH (DIRECTORY) PINNING -------------------
+class PinnedDirectory(NamedTuple):
+    cid: str
+    uris: Dict[str, str]  # relative path -> ipfs://<dirCID>/<path>
+    uploaded: bool
+
+
+def _pin_tree(entries: list, dirname: str, progress=None) -> PinnedDirectory:
+    """entries: (relative path, _Source, content type, file_node) -> one multi-file upload."""
+    total = sum(e[1].size for e in entries)
+    if total > PINATA_MAX_UPLOAD_BYTES:
+        raise ValueError(f"Batch is {total} bytes; the upload limit is {PINATA_MAX_UPLOAD_BYTES}"
+                         " (PINATA_MAX_UPLOAD_BYTES)")
+    cid = directory_cids({e[0]: e[3] for e in entries}, PINATA_CID_VERSION)[""]
+    index = get_pin_index()
+    pinned = index.get(cid) if index else None
+    uploaded = False
+    if not pinned and PINATA_CHECK_PINLIST and pinned_on_pinata(cid):
+        pinned = cid
+        if index:
+            index.add(cid, name=dirname, size=total)
+    if not pinned:
+        for e in entries:
+            e[1].rewind()
+        pinned = _pin_files(
+            [(f"{dirname}/{path}", src.fh, src.size, ct) for path, src, ct, _ in entries],
+            {"pinataOptions": {"cidVersion": PINATA_CID_VERSION, "wrapWithDirectory": False},
+             "pinataMetadata": {"name": dirname}},
+            progress, "pinata:directory",
+        )
+        uploaded = True
+        if pinned != cid:
+            # the URIs (and pin_collection's metadata) were built from the local CID
+            raise RuntimeError(f"Pinata pinned directory {dirname} as {pinned}, but its local CID is {cid}")
+        if index:
+            index.add(cid, pinned, dirname, total)
+    elif progress:
+        progress(total, total)
+    return PinnedDirectory(pinned, {e[0]: f"ipfs://{pinned}/{e[0]}" for e in entries}, uploaded)
+
+
+def _open_entries(items: list) -> list:
+    entries, seen = [], set()
+    try:
+        for path, source, content_type in items:
+            path = path.strip("/")
+            if not path or path in seen:
+                raise ValueError(f"Empty or duplicate path in batch: {path!r}")
+            seen.add(path)
+            src = _Source(source)
+            node = file_node(src.fh, PINATA_CID_VERSION)
+            src.rewind()
+            entries.append((path, src, content_type, node))
+    except BaseException:
+        for e in entries:
+            e[1].close()
+        raise
+    return entries
+
+
+def pin_directory(items: List[tuple], dirname: str = "neuroweave", progress=None) -> PinnedDirectory:
+    """
+    Pin many files as one directory in a single streamed request. `items` are
+    (relative path, bytes/path/file object, content type); paths may contain
+    "/" for subdirectories. Skipped if the directory CID is already pinned.
+    """
+    entries = _open_entries(items)
+    try:
+        return _pin_tree(entries, dirname, progress)
+    finally:
+        for e in entries:
+            e[1].close()
+
+
+def pin_collection(items: List[dict], dirname: str = "collection", progress=None) -> List[dict]:
+    """
+    Pin a batch of NFTs as one directory: images/<n><ext> and metadata/<n>.json.
+    Each item is {"metadata": dict, "image": optional (filename, source, content type)}.
+    Metadata "image" fields point into the images/ subdirectory by its own CID
+    (computed locally, so the metadata can be written before anything is pinned).
+    Returns one {"token_uri", "image_uri", "metadata"} per item, in order; raises
+    RuntimeError if Pinata's directory CID is not the local one.
+    """
+    image_items = []
+    for n, item in enumerate(items):
+        if item.get("image"):
+            filename, source, content_type = item["image"]
+            ext = os.path.splitext(filename)[1].lower()
+            image_items.append((f"images/{n}{ext}", source, content_type))
+    image_entries = _open_entries(image_items)
+    try:
+        images_cid = (directory_cids({e[0]: e[3] for e in image_entries}, PINATA_CID_VERSION)["images"]
+                      if image_entries else None)
+        image_paths = {int(e[0].split("/")[1].split(".")[0]): e[0] for e in image_entries}
+
+        results, meta_items = [], []
+        for n, item in enumerate(items):
+            metadata = dict(item["metadata"])
+            image_uri = None
+            if n in image_paths:
+                image_uri = f"ipfs://{images_cid}/{image_paths[n].split('/', 1)[1]}"
+                metadata["image"] = image_uri
+            meta_items.append((f"metadata/{n}.json", metadata_bytes(metadata), "application/json"))
+            results.append({"image_uri": image_uri, "metadata": metadata})
+
+        entries = image_entries + _open_entries(meta_items)
+        pinned = _pin_tree(entries, dirname, progress)
+    finally:
+        for e in image_entries:
+            e[1].close()
+    for n, result in enumerate(results):
+        result["token_uri"] = pinned.uris[f"metadata/{n}.json"]
+    return results
@@ -0,0 +1,187 @@
+# modules/llm_cache.py
+# Content-addressed cache for LLM responses, shared across Streamlit workers
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from modules import telemetry
+from modules.scheduler import estimate_tokens, get_scheduler
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".neuroweave", "llm_cache.sqlite"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+
+
+def request_key(**request) -> str:
+    """SHA-256 of the full request (model, messages, temperature, max_tokens, ...)."""
+    blob = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-level cache: an in-process LRU in front of a SQLite file that several
+    processes can open at once (WAL mode). Entries expire after `ttl` seconds and
+    the table is trimmed to `max_entries` by least recent access.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: int = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._mem = OrderedDict()  # key -> (created, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db().execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db().execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; parallel agent rounds call in from a pool.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, created: float, value: str):
+        with self._lock:
+            self._mem[key] = (created, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.memory_entries:
+                self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit and now - hit[0] < self.ttl:
+                self._mem.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return hit[1]
+            if hit:
+                del self._mem[key]
+        try:
+            row = self._db().execute(
+                "SELECT value, created FROM responses WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                self._db().execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["disk_hits"] += 1
+        self._remember(key, row[1], row[0])
+        return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        self._remember(key, now, value)
+        try:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            with self._lock:
+                self.stats["writes"] += 1
+                self._writes += 1
+                evict = self._writes % 100 == 0
+            if evict:
+                self.evict()
+        except sqlite3.Error as e:
+            print("🗄️ LLM cache write error:", e)
+
+    def evict(self):
+        """Drop expired rows, then the least recently used beyond max_entries."""
+        db = self._db()
+        db.execute("DELETE FROM responses WHERE created <= ?", (time.time() - self.ttl,))
+        db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return hits / max(1, hits + self.stats["misses"])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[LLMCache]:
+    """Process-wide cache, or None when disabled or the store cannot be opened."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache()
+            except (OSError, sqlite3.Error) as e:
+                print("🗄️ LLM cache unavailable:", e)
+                return None
+    return _cache
+
+
+def cached_chat(client, messages: list, temperature: float, max_tokens: Optional[int] = None,
+                model: str = "gpt-4o-mini", label: str = "llm") -> str:
+    """
+    chat.completions.create through the cache and the rate-limit scheduler; returns
+    the text. Every call, hit or miss, is recorded in the current telemetry session.
+    """
+    started = time.perf_counter()
+    request = {"model": model, "messages": messages, "temperature": temperature}
+    if max_tokens is not None:
+        request["max_tokens"] = max_tokens
+    cache = get_cache()
+    key = request_key(**request)
+    if cache:
+        hit = cache.get(key)
+        if hit is not None:
+            telemetry.record("llm", label, time.perf_counter() - started, model=model, cached=True)
+            return hit
+    meta = {}
+    try:
+        out = get_scheduler().call(
+            lambda: client.chat.completions.create(**request),
+            est_tokens=estimate_tokens(messages, max_tokens),
+            meta=meta,
+        )
+    except Exception as e:
+        telemetry.record("llm", label, time.perf_counter() - started, model=model,
+                         retries=meta.get("retries", 0), error=f"{type(e).__name__}: {e}")
+        raise
+    text = out.choices[0].message.content
+    usage = getattr(out, "usage", None)
+    telemetry.record(
+        "llm", label, time.perf_counter() - started, model=model, retries=meta.get("retries", 0),
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+    )
+    if cache and text:
+        cache.set(key, text)
+    return text
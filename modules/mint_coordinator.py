@@ -0,0 +1,278 @@
+# modules/mint_coordinator.py
+# Process-wide mint coordinator shared by every Streamlit session: nonces for
+# the shared signer are allocated through SQLite (so several app processes can
+# mint from one key), requests from all sessions are queued on a small worker
+# pool, and each request's status lives in SQLite where any session or process
+# can poll it without blocking its script run.
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules import telemetry
+from modules.mint_queue import MintJob, MintQueue, NonceManager
+
+MINT_DB_PATH = os.getenv("MINT_DB_PATH", os.path.join(".neuroweave", "mints.sqlite"))
+MINT_WORKERS = int(os.getenv("MINT_WORKERS", "4"))
+
+# queued -> pinning -> sending -> sent -> mined | failed
+ACTIVE_STATUSES = ("queued", "pinning", "sending", "sent")
+HOLDING_STATUSES = ("sending", "sent")  # a nonce has been taken for the request
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+class MintStore:
+    """Mint requests and per-signer nonce counters, shared by every process using the file."""
+
+    def __init__(self, path: str = MINT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS mint_requests (
+                id TEXT PRIMARY KEY,
+                session_key TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                uri TEXT NOT NULL,
+                status TEXT NOT NULL,
+                nonce INTEGER,
+                tx_hash TEXT,
+                block_number INTEGER,
+                gas_used INTEGER,
+                error TEXT,
+                detail TEXT,
+                owner_pid INTEGER NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS mint_requests_session ON mint_requests(session_key, created);
+            CREATE INDEX IF NOT EXISTS mint_requests_status ON mint_requests(status);
+            CREATE TABLE IF NOT EXISTS nonces (address TEXT PRIMARY KEY, next INTEGER);
+            """
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- requests ----
+    def create(self, session_key: str, recipient: str, uri: str, detail: Optional[dict] = None) -> str:
+        request_id, now = uuid.uuid4().hex, time.time()
+        self._db().execute(
+            "INSERT INTO mint_requests (id, session_key, recipient, uri, status, detail, owner_pid, created, updated)"
+            " VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+            (request_id, session_key, recipient, uri, json.dumps(detail or {}), os.getpid(), now, now),
+        )
+        return request_id
+
+    def update(self, request_id: str, **fields):
+        if "detail" in fields:
+            fields["detail"] = json.dumps(fields["detail"])
+        fields["updated"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        self._db().execute(f"UPDATE mint_requests SET {cols} WHERE id = ?", (*fields.values(), request_id))
+
+    def get(self, request_id: str) -> Optional[dict]:
+        row = self._db().execute("SELECT * FROM mint_requests WHERE id = ?", (request_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def active(self, session_key: str) -> Optional[dict]:
+        row = self._db().execute(
+            f"SELECT * FROM mint_requests WHERE session_key = ? AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})"
+            " ORDER BY created DESC LIMIT 1", (session_key, *ACTIVE_STATUSES)).fetchone()
+        return self._row(row) if row else None
+
+    def unfinished(self) -> int:
+        return self._db().execute(
+            f"SELECT COUNT(*) FROM mint_requests WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+            ACTIVE_STATUSES).fetchone()[0]
+
+    def holding(self, exclude_pid: int) -> int:
+        """Requests of other processes that hold a nonce."""
+        return self._db().execute(
+            f"SELECT COUNT(*) FROM mint_requests WHERE owner_pid != ?"
+            f" AND status IN ({','.join('?' * len(HOLDING_STATUSES))})",
+            (exclude_pid, *HOLDING_STATUSES)).fetchone()[0]
+
+    def orphaned(self) -> List[dict]:
+        """Unfinished requests whose owning process is gone."""
+        rows = self._db().execute(
+            f"SELECT * FROM mint_requests WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+            ACTIVE_STATUSES).fetchall()
+        return [self._row(r) for r in rows if r["owner_pid"] != os.getpid() and not _alive(r["owner_pid"])]
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> dict:
+        out = dict(row)
+        out["detail"] = json.loads(out["detail"] or "{}")
+        return out
+
+    # ---- nonces ----
+    def allocate_nonce(self, address: str, chain_pending: Callable[[], int]) -> int:
+        """Next nonce for `address` across processes; the chain is asked only when no counter is held."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT next FROM nonces WHERE address = ?", (address,)).fetchone()
+            nonce = row["next"] if row and row["next"] is not None else chain_pending()
+            db.execute("INSERT INTO nonces (address, next) VALUES (?, ?)"
+                       " ON CONFLICT(address) DO UPDATE SET next = excluded.next", (address, nonce + 1))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return nonce
+
+    def release_nonce(self, address: str, nonce: int) -> bool:
+        cur = self._db().execute("UPDATE nonces SET next = ? WHERE address = ? AND next = ?",
+                                 (nonce, address, nonce + 1))
+        return cur.rowcount == 1
+
+    def advance_nonce(self, address: str, nonce: int):
+        self._db().execute("UPDATE nonces SET next = ? WHERE address = ? AND next < ?", (nonce, address, nonce))
+
+    def reset_nonce(self, address: str):
+        self._db().execute("UPDATE nonces SET next = NULL WHERE address = ?", (address,))
+
+
+class SharedNonceManager(NonceManager):
+    """NonceManager whose counter lives in a MintStore, so every process draws from one sequence."""
+
+    def __init__(self, web3, address: str, store: MintStore):
+        super().__init__(web3, address)
+        self.store = store
+
+    def _chain_pending(self) -> int:
+        return self.web3.eth.get_transaction_count(self.address, "pending")
+
+    def next(self) -> int:
+        with self._lock:
+            return self.store.allocate_nonce(self.address, self._chain_pending)
+
+    def release(self, nonce: int) -> bool:
+        return self.store.release_nonce(self.address, nonce)
+
+    def advance(self, nonce: int):
+        self.store.advance_nonce(self.address, nonce)
+
+    def resync(self):
+        """Reset the shared counter, unless another process has a request holding a nonce."""
+        if not self.store.holding(os.getpid()):
+            self.store.reset_nonce(self.address)
+
+
+class MintCoordinator:
+    """
+    Accepts mint requests from any session. request() returns at once with an
+    id; a worker estimates the mint, waits for the request's prerequisite
+    (e.g. its IPFS pins), then takes a nonce, signs and sends through the
+    shared MintQueue. status() is a cheap SQLite read.
+    """
+
+    def __init__(self, queue: MintQueue, store: MintStore, workers: int = MINT_WORKERS):
+        self.queue = queue
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mint")
+        self._reconcile_orphans()
+        if not store.unfinished():
+            queue.nonces.resync()  # nothing in flight anywhere: the chain's count is authoritative
+
+    def request(self, recipient: str, uri: str, session_key: str = "",
+                before: Optional[Callable[[], Optional[dict]]] = None, detail: Optional[dict] = None) -> str:
+        """
+        Queue a mint. Gas and fees are quoted as soon as a worker picks the
+        request up, then `before` runs (its returned dict is merged into the
+        request detail); only once it returns is a nonce taken, so a slow
+        upload never holds up other sessions' mints. If `before` raises,
+        nothing is sent.
+        """
+        request_id = self.store.create(session_key, recipient, uri, detail)
+        telemetry.submit(self._pool, self._run, request_id, recipient, uri, before, dict(detail or {}))
+        return request_id
+
+    def status(self, request_id: str) -> Optional[dict]:
+        return self.store.get(request_id)
+
+    def active(self, session_key: str) -> Optional[dict]:
+        """The session's unfinished request, if any (the double-submit guard)."""
+        return self.store.active(session_key)
+
+    def _run(self, request_id: str, recipient: str, uri: str, before, detail: dict):
+        job = None
+        try:
+            if before:
+                self.store.update(request_id, status="pinning")
+            job = self.queue.quote(recipient, uri)  # estimated while the pins upload
+            if before:
+                detail.update(before() or {})
+            self.queue.assign(job)
+            self.store.update(request_id, status="sending", nonce=job.nonce, detail=detail)
+            self.queue.send(job)
+        except Exception as e:
+            if job is not None:
+                self.queue.cancel(job)
+            self.store.update(request_id, status="failed", error=f"{type(e).__name__}: {e}")
+            return
+        self.store.update(request_id, status="sent", nonce=job.nonce, tx_hash=job.tx_hash)
+        job.add_done_callback(lambda j: self._finished(request_id, j))
+
+    def _finished(self, request_id: str, job: MintJob):
+        fields = {"status": job.status, "nonce": job.nonce, "tx_hash": job.tx_hash, "error": job.error}
+        if job.receipt is not None:
+            tx_hash = job.receipt.transactionHash
+            fields.update(tx_hash=tx_hash.to_0x_hex() if hasattr(tx_hash, "to_0x_hex") else str(tx_hash),
+                          block_number=job.receipt.blockNumber, gas_used=job.receipt.gasUsed)
+        self.store.update(request_id, **fields)
+
+    def _reconcile_orphans(self):
+        """Settle requests left behind by processes that exited mid-mint."""
+        for row in self.store.orphaned():
+            if not row["tx_hash"]:
+                if row["nonce"] is not None:
+                    self.queue.fill(row["nonce"])  # taken but maybe never broadcast
+                self.store.update(row["id"], status="failed", error="worker exited before sending")
+                continue
+            try:
+                receipt = self.queue.web3.eth.get_transaction_receipt(row["tx_hash"])
+            except Exception:
+                continue  # not mined (yet); leave it for the next start
+            self.store.update(row["id"], status="mined" if receipt.status == 1 else "failed",
+                              block_number=receipt.blockNumber, gas_used=receipt.gasUsed,
+                              error=None if receipt.status == 1 else "reverted")
+
+
+_coordinators: Dict[Tuple[str, str], MintCoordinator] = {}
+_coordinators_lock = threading.Lock()
+
+def get_mint_coordinator(web3, private_key: str, contract_address: str, abi: list,
+                         chain_id: Optional[int] = None, path: str = MINT_DB_PATH) -> MintCoordinator:
+    """One coordinator per signer and contract in this process, all drawing nonces from `path`."""
+    address = web3.eth.account.from_key(private_key).address
+    with _coordinators_lock:
+        key = (address, contract_address)
+        if key not in _coordinators:
+            store = MintStore(path)
+            queue = MintQueue(web3, private_key, contract_address, abi, chain_id,
+                              nonces=SharedNonceManager(web3, address, store))
+            _coordinators[key] = MintCoordinator(queue, store)
+        return _coordinators[key]
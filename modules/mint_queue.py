@@ -0,0 +1,558 @@
+# modules/mint_queue.py
+# Pipelined safeMint submission: nonces are assigned locally so many mints can
+# be signed and sent back-to-back, receipts are tracked by a background thread,
+# and stuck or dropped transactions are re-broadcast or replaced (same nonce,
+# bumped fees) instead of blocking everything behind them. Collections go out
+# as safeMintBatch calls sized to fit the block gas limit.
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from eth_utils import keccak
+from web3.exceptions import TransactionNotFound, Web3RPCError
+from web3.logs import DISCARD
+
+from modules.fees import FeeOracle, GasEstimateCache
+
+MINT_URGENCY = os.getenv("MINT_URGENCY", "normal")                 # low | normal | high (fee percentile)
+MINT_GAS_MARGIN = float(os.getenv("MINT_GAS_MARGIN", "1.3"))
+MINT_STUCK_AFTER = float(os.getenv("MINT_STUCK_AFTER", "45"))     # seconds pending before a fee bump
+MINT_REBROADCAST_AFTER = float(os.getenv("MINT_REBROADCAST_AFTER", "10"))
+MINT_POLL = float(os.getenv("MINT_POLL", "1"))
+MINT_MAX_ATTEMPTS = int(os.getenv("MINT_MAX_ATTEMPTS", "6"))
+MINT_RECIPIENTS_CACHED = int(os.getenv("MINT_RECIPIENTS_CACHED", "4096"))
+MINT_BATCH_MAX = int(os.getenv("MINT_BATCH_MAX", "100"))           # the contract's MAX_BATCH
+MINT_BATCH_GAS_FRACTION = float(os.getenv("MINT_BATCH_GAS_FRACTION", "0.5"))  # of the block gas limit
+# Nodes reject a same-nonce replacement unless both fees rise by at least 10%.
+FEE_BUMP = 1.125
+
+
+def _rejected(error: Exception) -> bool:
+    """True if the node answered with an error, as opposed to not answering at all."""
+    return isinstance(error, (Web3RPCError, ValueError)) and not isinstance(error, OSError)
+
+
+class NonceManager:
+    """Hands out consecutive nonces for one account without a round-trip per transaction."""
+
+    def __init__(self, web3, address: str):
+        self.web3 = web3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next: Optional[int] = None
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next is None:
+                self._next = self.web3.eth.get_transaction_count(self.address, "pending")
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce: int) -> bool:
+        """Give back a nonce that was never broadcast; only the most recent one can be reused."""
+        with self._lock:
+            if self._next is not None and nonce == self._next - 1:
+                self._next = nonce
+                return True
+            return False
+
+    def advance(self, nonce: int):
+        """Never hand out a nonce below `nonce` again (the chain has already used them)."""
+        with self._lock:
+            if self._next is not None and self._next < nonce:
+                self._next = nonce
+
+    def resync(self):
+        """Re-read the account's pending nonce on the next call; only safe while no job holds a nonce."""
+        with self._lock:
+            self._next = None
+
+
+class MintJob:
+    """
+    One mint transaction; every broadcast hash (original, re-sends,
+    replacements) is kept. For batch calls `recipient` and `uri` are lists
+    (one entry per token) and `args` holds the contract call arguments.
+    """
+
+    def __init__(self, recipient, uri, function: str = "safeMint", args: Optional[tuple] = None):
+        self.recipient = recipient
+        self.uri = uri
+        self.function = function
+        self.args = args or (recipient, uri)
+        self.token_ids: List[int] = []
+        self.nonce: Optional[int] = None
+        self.gas = 0
+        self.fees: Tuple[int, int] = (0, 0)  # (maxFeePerGas, maxPriorityFeePerGas)
+        self.raw: Optional[bytes] = None
+        self.hashes: List[str] = []
+        self.nonce_from = 0  # hashes[nonce_from:] were sent under the current nonce
+        self.status = "prepared"  # prepared -> sent -> mined | failed
+        self.receipt = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.consumed_polls = 0
+        self.created_at = time.time()
+        self.sent_at = 0.0
+        self.mined_at = 0.0
+        self._done = threading.Event()
+        self._callbacks: list = []
+
+    @property
+    def tokens(self) -> int:
+        return len(self.uri) if isinstance(self.uri, list) else 1
+
+    @property
+    def tx_hash(self) -> Optional[str]:
+        return self.hashes[-1] if self.hashes else None
+
+    def _finish(self, status: str, receipt=None, error: Optional[str] = None):
+        self.status, self.receipt, self.error = status, receipt, error
+        self.mined_at = time.time()
+        self._done.set()
+        for fn in self._callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                print("⛓ Mint callback failed:", type(e).__name__, e)
+
+    def add_done_callback(self, fn):
+        """Call fn(job) once mined or failed (right away if already done), on the tracker thread."""
+        self._callbacks.append(fn)
+        if self._done.is_set():
+            fn(self)
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until mined; returns the receipt or raises on failure/timeout."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Mint {self.tx_hash} not mined after {timeout}s")
+        if self.status != "mined":
+            raise RuntimeError(f"Mint failed: {self.error}")
+        return self.receipt
+
+
+class MintQueue:
+    """
+    Submits safeMint transactions for one signer. quote() estimates gas and
+    fees; prepare() also assigns a nonce and signs; send() broadcasts (taking
+    a nonce first for a quoted job); submit() does it all. A tracker thread
+    polls receipts for everything in flight, re-broadcasts transactions the
+    node has lost, replaces ones pending longer than `stuck_after` and fills
+    nonces that were given up but could not be filled at the time.
+    """
+
+    def __init__(self, web3, private_key: str, contract_address: str, abi: list,
+                 chain_id: Optional[int] = None, stuck_after: float = MINT_STUCK_AFTER,
+                 rebroadcast_after: float = MINT_REBROADCAST_AFTER, poll: float = MINT_POLL,
+                 nonces: Optional[NonceManager] = None, oracle: Optional[FeeOracle] = None,
+                 gas_cache: Optional[GasEstimateCache] = None):
+        self.web3 = web3
+        self.account = web3.eth.account.from_key(private_key)
+        self.contract = web3.eth.contract(address=contract_address, abi=abi)
+        self.chain_id = chain_id or web3.eth.chain_id
+        self.nonces = nonces or NonceManager(web3, self.account.address)
+        self.oracle = oracle or FeeOracle(web3)
+        self.gas_cache = gas_cache or GasEstimateCache()
+        self._recipients: Dict[str, str] = {}  # address -> gas cache kind
+        self.stuck_after = stuck_after
+        self.rebroadcast_after = rebroadcast_after
+        self.poll = poll
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._inflight: Dict[int, MintJob] = {}
+        self._prepared: Dict[int, MintJob] = {}  # signed with a nonce, not sent yet
+        self._gaps: Dict[int, float] = {}  # nonce -> when to retry filling it
+        self._jobs: List[MintJob] = []
+        self._tracker: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self.stats = {"sent": 0, "rebroadcast": 0, "replaced": 0, "renonced": 0, "regassed": 0, "mined": 0,
+                      "failed": 0}
+
+    # ------------------- fees & signing -------------------
+    def fees(self) -> Tuple[int, int]:
+        """(maxFeePerGas, maxPriorityFeePerGas) from the cached per-block quote."""
+        return self.oracle.quote(MINT_URGENCY)
+
+    def _call(self, job: MintJob):
+        return getattr(self.contract.functions, job.function)(*job.args)
+
+    def _recipient_kind(self, recipient: str) -> str:
+        """
+        Gas class of a mint recipient, looked up once per address: a contract
+        (its own kind, since each onERC721Received costs differently), "new"
+        (zero balance: the balance slot is written fresh) or "holder".
+        """
+        kind = self._recipients.get(recipient)
+        if kind is None:
+            if self.web3.eth.get_code(recipient):
+                kind = f"contract:{recipient}"
+            elif self.contract.functions.balanceOf(recipient).call() == 0:
+                kind = "new"
+            else:
+                kind = "holder"
+            with self._lock:
+                if len(self._recipients) >= MINT_RECIPIENTS_CACHED:
+                    self._recipients.pop(next(iter(self._recipients)))
+                self._recipients[recipient] = kind
+        return kind
+
+    def _estimate(self, job: MintJob, fresh: bool = False) -> int:
+        """Gas limit for the job; single mints use the cached estimate for their URI length and recipient."""
+        def _rpc() -> int:
+            return self._call(job).estimate_gas({"from": self.account.address})
+        if job.function != "safeMint":
+            return int(_rpc() * MINT_GAS_MARGIN)
+        kind = self._recipient_kind(job.recipient)
+        if fresh:
+            self.gas_cache.invalidate("safeMint", job.uri, kind)
+        return int(self.gas_cache.get("safeMint", job.uri, _rpc, kind) * MINT_GAS_MARGIN)
+
+    def _sign(self, job: MintJob):
+        txn = self._call(job).build_transaction({
+            "from": self.account.address,
+            "nonce": job.nonce,
+            "gas": job.gas,
+            "maxFeePerGas": job.fees[0],
+            "maxPriorityFeePerGas": job.fees[1],
+            "chainId": self.chain_id,
+        })
+        job.raw = self.account.sign_transaction(txn).raw_transaction
+
+    def quote(self, recipient: str, uri: str, fees: Optional[Tuple[int, int]] = None) -> MintJob:
+        """A safeMint with gas and fees filled in but no nonce: nothing waits behind it until assign()."""
+        job = MintJob(recipient, uri)
+        job.gas = self._estimate(job)
+        job.fees = fees or self.fees()
+        return job
+
+    def prepare(self, recipient: str, uri: str, fees: Optional[Tuple[int, int]] = None) -> MintJob:
+        return self._prepare(MintJob(recipient, uri), fees)
+
+    def prepare_batch(self, recipients, uris: Sequence[str], fees: Optional[Tuple[int, int]] = None) -> MintJob:
+        """One safeMintBatch (safeMintBatchTo when every token goes to one address)."""
+        return self._prepare(self._batch_job(recipients, uris), fees)
+
+    @staticmethod
+    def _batch_job(recipients, uris: Sequence[str]) -> MintJob:
+        uris = list(uris)
+        if isinstance(recipients, str):
+            recipients = [recipients] * len(uris)
+        recipients = list(recipients)
+        if len(recipients) != len(uris):
+            raise ValueError(f"{len(recipients)} recipients for {len(uris)} URIs")
+        if len(set(recipients)) == 1:
+            return MintJob(recipients, uris, "safeMintBatchTo", (recipients[0], uris))
+        return MintJob(recipients, uris, "safeMintBatch", (recipients, uris))
+
+    def _prepare(self, job: MintJob, fees: Optional[Tuple[int, int]]) -> MintJob:
+        job.gas = self._estimate(job)
+        job.fees = fees or self.fees()
+        return self.assign(job)
+
+    def assign(self, job: MintJob) -> MintJob:
+        """Take the next nonce for a quoted job and sign it; send it promptly, later mints wait on it."""
+        with self._lock:
+            self._prepared.pop(job.nonce, None)
+            job.nonce = self.nonces.next()
+            self._prepared[job.nonce] = job
+        self._sign(job)
+        return job
+
+    def _resync(self) -> bool:
+        """Re-read the nonce from the chain, unless a prepared or in-flight job still holds one."""
+        with self._lock:
+            if self._prepared or self._inflight:
+                return False
+            self.nonces.resync()
+            self._gaps.clear()
+            return True
+
+    # ------------------- broadcasting -------------------
+    def _broadcast(self, job: MintJob) -> str:
+        """
+        Send job.raw. Only an error reply from the node raises: without an
+        answer (timeout, dropped connection) the transaction may have gone out,
+        so its hash is recorded as sent and the tracker re-broadcasts the same
+        bytes if the node turns out not to know it. The nonce is never reused.
+        """
+        try:
+            tx_hash = self.web3.eth.send_raw_transaction(job.raw)
+            tx_hash = tx_hash.to_0x_hex() if hasattr(tx_hash, "to_0x_hex") else "0x" + bytes(tx_hash).hex()
+        except Exception as e:
+            if _rejected(e) and "already known" not in str(e).lower():
+                raise
+            if not _rejected(e):
+                print(f"⛓ No answer sending nonce {job.nonce} ({type(e).__name__}); tracking it as sent")
+            tx_hash = "0x" + keccak(job.raw).hex()
+        if tx_hash not in job.hashes:
+            job.hashes.append(tx_hash)
+        job.attempts += 1
+        job.sent_at = time.time()
+        return tx_hash
+
+    def send(self, job: MintJob) -> MintJob:
+        """Broadcast a job (assigning a nonce first if it was only quoted); a stale nonce is re-assigned once."""
+        rejected = None
+        with self._send_lock:
+            if job.nonce is None:
+                self.assign(job)
+            try:
+                self._broadcast(job)
+            except Exception as e:
+                rejected = e
+                if "nonce too low" in str(e).lower():
+                    # someone else used the account: move past what the chain has seen. Re-reading its
+                    # count instead could hand out nonces that prepared jobs still hold.
+                    self.nonces.advance(self.web3.eth.get_transaction_count(self.account.address, "pending"))
+                    self.assign(job)
+                    try:
+                        self._broadcast(job)
+                        rejected = None
+                        with self._lock:
+                            self.stats["renonced"] += 1
+                    except Exception as again:
+                        rejected = again
+            if rejected is None:
+                job.status = "sent"
+                with self._lock:
+                    self._prepared.pop(job.nonce, None)
+                    self.stats["sent"] += 1
+                    self._inflight[job.nonce] = job
+                    self._jobs.append(job)
+        if rejected is not None:
+            # the node refused it outright, so the nonce is still free
+            job._finish("failed", error=str(rejected))
+            with self._lock:
+                self._prepared.pop(job.nonce, None)
+                self.stats["failed"] += 1
+            self._give_back(job.nonce)
+            raise rejected
+        self._ensure_tracker()
+        return job
+
+    def cancel(self, job: MintJob):
+        """
+        Abandon a job that will never be sent. A quoted job holds no nonce; a
+        prepared one gives its nonce back if it was the last one handed out,
+        otherwise later transactions would wait behind the gap, so a
+        zero-value self-transfer takes the nonce.
+        """
+        if job.status != "prepared":
+            return
+        job._finish("failed", error="cancelled before sending")
+        if job.nonce is None:
+            return
+        with self._lock:
+            self._prepared.pop(job.nonce, None)
+        self._give_back(job.nonce)
+
+    def _give_back(self, nonce: int):
+        if not self.nonces.release(nonce):
+            self.fill(nonce)
+
+    def fill(self, nonce: int) -> bool:
+        """
+        Take `nonce` with a zero-value self-transfer. If that fails, the
+        counter is re-read from the chain when no job holds a nonce (the gap
+        is then handed out again); otherwise the tracker retries the fill.
+        """
+        try:
+            max_fee, priority = self.fees()
+            txn = {"from": self.account.address, "to": self.account.address, "value": 0, "nonce": nonce,
+                   "gas": 21000, "maxFeePerGas": max_fee, "maxPriorityFeePerGas": priority,
+                   "chainId": self.chain_id}
+            with self._send_lock:
+                self.web3.eth.send_raw_transaction(self.account.sign_transaction(txn).raw_transaction)
+        except Exception as e:
+            error = str(e).lower()
+            if not any(s in error for s in ("nonce too low", "already known", "underpriced")):
+                print("⛓ Could not fill nonce", nonce, "-", type(e).__name__, e)
+                if not self._resync():
+                    with self._lock:
+                        self._gaps[nonce] = time.time() + self.rebroadcast_after
+                    self._ensure_tracker()
+                return False
+            # otherwise a transaction already holds the nonce: there is no gap
+        with self._lock:
+            self._gaps.pop(nonce, None)
+        return True
+
+    def submit(self, recipient: str, uri: str) -> MintJob:
+        return self.send(self.prepare(recipient, uri))
+
+    def submit_many(self, items: Sequence[Tuple[str, str]]) -> List[MintJob]:
+        """Sign and send (recipient, uri) mints back-to-back under one fee quote; receipts come later."""
+        fees = self.fees()
+        return [self.send(self.prepare(recipient, uri, fees)) for recipient, uri in items]
+
+    def batch_size(self, recipients, uris: Sequence[str]) -> int:
+        """
+        Tokens per batch call that fit MINT_BATCH_GAS_FRACTION of the block gas
+        limit, from estimates of 1- and 2-token batches of the longest URI.
+        """
+        uris = list(uris)
+        longest = max(uris, key=lambda u: len(u.encode("utf-8")))
+        recipient = recipients if isinstance(recipients, str) else recipients[0]
+        single = isinstance(recipients, str) or len(set(recipients)) == 1
+        probe = [recipient, recipient if single else self.account.address]
+        one, two = (self._call(self._batch_job(probe[:n], [longest] * n)).estimate_gas({"from": self.account.address})
+                    for n in (1, 2))
+        per_token = max(1, two - one)
+        budget = self.web3.eth.get_block("latest")["gasLimit"] * MINT_BATCH_GAS_FRACTION / MINT_GAS_MARGIN
+        return max(1, min(MINT_BATCH_MAX, int((budget - (one - per_token)) // per_token)))
+
+    def submit_batch(self, recipients, uris: Sequence[str]) -> List[MintJob]:
+        """
+        Mint many tokens with as few transactions as fit the block gas limit,
+        sent back-to-back. `recipients` is one address or one per URI.
+        """
+        uris = list(uris)
+        if not uris:
+            return []
+        recipients = [recipients] * len(uris) if isinstance(recipients, str) else list(recipients)
+        size = self.batch_size(recipients, uris)
+        fees = self.fees()
+        return [self.send(self.prepare_batch(recipients[i:i + size], uris[i:i + size], fees))
+                for i in range(0, len(uris), size)]
+
+    def token_ids(self, receipt) -> List[int]:
+        """IDs minted in a receipt, from the contract's Transfer events (from the zero address)."""
+        events = self.contract.events.Transfer().process_receipt(receipt, errors=DISCARD)
+        return [e["args"]["tokenId"] for e in events if int(e["args"]["from"], 16) == 0]
+
+    def wait(self, jobs: Optional[Sequence[MintJob]] = None, timeout: Optional[float] = None) -> list:
+        """Receipts of `jobs` (default: everything sent), in order."""
+        deadline = time.time() + timeout if timeout else None
+        return [job.wait(None if deadline is None else max(0.0, deadline - time.time()))
+                for job in (jobs if jobs is not None else list(self._jobs))]
+
+    # ------------------- tracking -------------------
+    def _ensure_tracker(self):
+        with self._lock:
+            if self._tracker is None or not self._tracker.is_alive():
+                self._tracker = threading.Thread(target=self._track, daemon=True)
+                self._tracker.start()
+        self._wake.set()
+
+    def _receipt(self, job: MintJob):
+        for tx_hash in reversed(job.hashes[job.nonce_from:]):
+            try:
+                return self.web3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None
+
+    def _known(self, job: MintJob) -> bool:
+        try:
+            self.web3.eth.get_transaction(job.tx_hash)
+            return True
+        except TransactionNotFound:
+            return False
+
+    def _replace(self, job: MintJob):
+        """Same nonce, fees bumped enough for the node to accept it (or today's quote, if higher)."""
+        job.fees = tuple(max(int(f * FEE_BUMP) + 1, q) for f, q in zip(job.fees, self.fees()))
+        self._sign(job)
+        with self._send_lock:
+            self._broadcast(job)
+        with self._lock:
+            self.stats["replaced"] += 1
+
+    def _resend_new_nonce(self, job: MintJob):
+        with self._send_lock:
+            job.nonce = self.nonces.next()
+            job.nonce_from = len(job.hashes)
+            self._sign(job)
+            self._broadcast(job)
+        with self._lock:
+            self._inflight[job.nonce] = job
+
+    def _check(self, job: MintJob, confirmed: int):
+        receipt = self._receipt(job)
+        if receipt is not None:
+            if job.function == "safeMint":
+                self.gas_cache.observe("safeMint", job.uri, receipt.gasUsed, job.gas,
+                                       self._recipient_kind(job.recipient))
+            if receipt.status != 1 and receipt.gasUsed >= job.gas and job.attempts < MINT_MAX_ATTEMPTS:
+                # out of gas on a stale cached estimate: mint again with a fresh one
+                with self._lock:
+                    self._inflight.pop(job.nonce, None)
+                    self.stats["regassed"] += 1
+                job.gas = self._estimate(job, fresh=True)
+                self._resend_new_nonce(job)
+                return
+            if receipt.status == 1:
+                job.token_ids = self.token_ids(receipt)
+                with self._lock:
+                    for recipient in (job.recipient if isinstance(job.recipient, list) else [job.recipient]):
+                        if self._recipients.get(recipient) == "new":
+                            self._recipients[recipient] = "holder"
+            with self._lock:
+                self._inflight.pop(job.nonce, None)
+                self.stats["mined" if receipt.status == 1 else "failed"] += 1
+            job._finish("mined" if receipt.status == 1 else "failed", receipt,
+                        None if receipt.status == 1 else "reverted")
+            return
+        if confirmed > job.nonce:
+            job.consumed_polls += 1
+            if job.consumed_polls < 2:
+                return  # the receipt may just lag the nonce on a load-balanced RPC
+            # the nonce was consumed by a transaction we didn't send: mint again under a new nonce
+            job.consumed_polls = 0
+            with self._lock:
+                self._inflight.pop(job.nonce, None)
+                self.stats["renonced"] += 1
+            self.nonces.advance(confirmed)
+            self._resend_new_nonce(job)
+            return
+        if job.attempts >= MINT_MAX_ATTEMPTS:
+            return  # keep waiting on what was sent; stop spending fees on it
+        age = time.time() - job.sent_at
+        if age > self.rebroadcast_after and not self._known(job):
+            with self._send_lock:
+                self._broadcast(job)
+            with self._lock:
+                self.stats["rebroadcast"] += 1
+        elif age > self.stuck_after:
+            self._replace(job)
+
+    def _track(self):
+        while True:
+            with self._lock:
+                jobs = sorted(self._inflight.values(), key=lambda j: j.nonce)
+                gaps = [nonce for nonce, due in self._gaps.items() if due <= time.time()]
+            if not jobs and not self._gaps:
+                self._wake.clear()
+                if not self._wake.wait(30):
+                    return
+                continue
+            for nonce in gaps:
+                self.fill(nonce)
+            try:
+                confirmed = self.web3.eth.get_transaction_count(self.account.address, "latest")
+                for job in jobs:
+                    self._check(job, confirmed)
+            except Exception as e:
+                print("⛓ Mint tracker:", type(e).__name__, e)
+            time.sleep(self.poll)
+
+    # ------------------- reporting -------------------
+    def report(self, jobs: Optional[Sequence[MintJob]] = None) -> dict:
+        """Throughput of mined jobs: tokens per block over the blocks they span, gas per token and wall time."""
+        jobs = list(jobs if jobs is not None else self._jobs)
+        mined = [j for j in jobs if j.status == "mined"]
+        if not mined:
+            return {"mints": 0, "blocks": 0, "mints_per_block": 0.0, "gas_per_token": 0, "wall_s": 0.0}
+        numbers = [j.receipt.blockNumber for j in mined]
+        blocks = max(numbers) - min(numbers) + 1
+        tokens = sum(j.tokens for j in mined)
+        wall = max(j.mined_at for j in mined) - min(j.created_at for j in jobs)
+        return {"mints": tokens, "blocks": blocks, "mints_per_block": round(tokens / blocks, 2),
+                "gas_per_token": sum(j.receipt.gasUsed for j in mined) // tokens,
+                "wall_s": round(wall, 3), **self.stats}
+
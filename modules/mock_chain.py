@@ -0,0 +1,503 @@
+# modules/mock_chain.py
+# Local dev-chain stand-in (JSON-RPC) for offline minting tests and benchmarks:
+# accepts signed raw transactions, keeps a per-sender nonce-ordered mempool with
+# fee-bump replacement, and mines blocks on a timer up to a gas limit. Calls to
+# NeuroWeaveNFT's mint functions are decoded, charged by a gas model of the
+# contract (first-time holders and receiver contracts cost more) and emit
+# Transfer events with consecutive token IDs.
+#
+#   python -m modules.mock_chain --port 8545 --block-time 1 --drop-rate 0.1
+#   CELO_RPC=http://127.0.0.1:8545 streamlit run app.py
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import rlp
+from eth_abi import decode as abi_decode
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+
+CHAIN_ID = 44787  # Alfajores
+REPLACEMENT_BUMP = 1.1
+
+# Gas model of NeuroWeaveNFT (OpenZeppelin ERC721URIStorage). These are estimates
+# from the storage writes and events each call makes, not measured on an EVM: they
+# order safeMintBatch against safeMint, but receipts here are no gas measurement.
+COUNTER_GAS = 5000   # nextTokenId write, once per transaction
+TOKEN_GAS = 52000    # owner and balance writes, Transfer event, receiver check
+NEW_HOLDER_GAS = 17100  # extra for a recipient whose balance slot is still zero
+RECEIVER_GAS = 25000    # default onERC721Received cost of a receiver contract
+SLOT_GAS = 22100     # per fresh storage slot of the token URI
+LOOP_GAS = 800       # per token of batch bookkeeping (array reads, bounds checks)
+MAX_BATCH = 100
+TRANSFER_TOPIC = "0x" + keccak(b"Transfer(address,address,uint256)").hex()
+_BALANCE_OF = keccak(b"balanceOf(address)")[:4]
+_NEXT_TOKEN_ID = keccak(b"nextTokenId()")[:4]
+_MINT_FUNCTIONS = {
+    keccak(b"safeMint(address,string)")[:4]: ("safeMint", ["address", "string"]),
+    keccak(b"safeMintBatch(address[],string[])")[:4]: ("safeMintBatch", ["address[]", "string[]"]),
+    keccak(b"safeMintBatchTo(address,string[])")[:4]: ("safeMintBatchTo", ["address", "string[]"]),
+}
+
+
+class ChainConfig:
+    """
+    `drop_rate` silently discards that fraction of accepted transactions (lost
+    by the network); transactions tipping less than `min_tip` stay pending
+    until replaced with a higher fee.
+    """
+
+    def __init__(self, block_time: float = 1.0, block_gas_limit: int = 10_000_000,
+                 base_fee: int = 5 * 10 ** 9, drop_rate: float = 0.0, min_tip: int = 0,
+                 seed: int = 7, chain_id: int = CHAIN_ID):
+        self.block_time = block_time
+        self.block_gas_limit = block_gas_limit
+        self.base_fee = base_fee
+        self.drop_rate = drop_rate
+        self.min_tip = min_tip
+        self.seed = seed
+        self.chain_id = chain_id
+
+
+class RPCError(Exception):
+    def __init__(self, message: str, code: int = -32000):
+        super().__init__(message)
+        self.code = code
+
+
+def _int(b: bytes) -> int:
+    return int.from_bytes(b, "big")
+
+
+def _hex(n: int) -> str:
+    return hex(n)
+
+
+def decode_raw(raw: bytes) -> dict:
+    """Fields of a signed legacy or EIP-1559 transaction."""
+    if raw[0] == 2:
+        f = rlp.decode(raw[1:])
+        tx = {"type": 2, "chainId": _int(f[0]), "nonce": _int(f[1]), "maxPriorityFeePerGas": _int(f[2]),
+              "maxFeePerGas": _int(f[3]), "gas": _int(f[4]), "to": f[5], "value": _int(f[6]), "input": f[7]}
+    elif raw[0] >= 0xc0:
+        f = rlp.decode(raw)
+        tx = {"type": 0, "nonce": _int(f[0]), "maxFeePerGas": _int(f[1]), "maxPriorityFeePerGas": _int(f[1]),
+              "gas": _int(f[2]), "to": f[3], "value": _int(f[4]), "input": f[5]}
+    else:
+        raise RPCError(f"unsupported transaction type {raw[0]}")
+    tx["from"] = Account.recover_transaction(raw)
+    tx["to"] = to_checksum_address(tx["to"]) if tx["to"] else None
+    tx["hash"] = "0x" + keccak(raw).hex()
+    return tx
+
+
+def decode_mints(data: bytes) -> Optional[List[tuple]]:
+    """(recipient, uri) per token minted by a NeuroWeaveNFT call; None if it isn't a mint call."""
+    fn = _MINT_FUNCTIONS.get(bytes(data[:4]))
+    if not fn:
+        return None
+    name, types = fn
+    args = abi_decode(types, bytes(data[4:]))
+    if name == "safeMint":
+        return [(args[0], args[1])]
+    recipients = args[0] if name == "safeMintBatch" else [args[0]] * len(args[1])
+    if len(recipients) != len(args[1]) or not 0 < len(args[1]) <= MAX_BATCH:
+        raise ValueError("NeuroWeave: bad batch")
+    return list(zip(recipients, args[1]))
+
+
+def _uri_slots(uri: str) -> int:
+    size = len(uri.encode("utf-8"))
+    return 1 if size < 32 else 1 + (size + 31) // 32  # short strings share the length slot
+
+
+def gas_needed(data: bytes, recipient_gas: Optional[Callable[[str], int]] = None) -> int:
+    """
+    Intrinsic + calldata + (for mint calls) modelled execution cost;
+    `recipient_gas(recipient)` adds the state-dependent cost of each token.
+    """
+    gas = 21000 + sum(16 if b else 4 for b in data)
+    try:
+        mints = decode_mints(data)
+    except Exception:
+        return gas + 2000  # reverts early
+    if mints:
+        gas += COUNTER_GAS + sum(TOKEN_GAS + SLOT_GAS * _uri_slots(uri) + (recipient_gas(to) if recipient_gas else 0)
+                                 for to, uri in mints)
+        if _MINT_FUNCTIONS[bytes(data[:4])][0] != "safeMint":
+            gas += LOOP_GAS * len(mints)
+    return gas
+
+
+def _hexify(record: dict) -> dict:
+    return {k: (_hex(v) if isinstance(v, int) and not isinstance(v, bool) else v) for k, v in record.items()}
+
+
+def _topic(value: int) -> str:
+    return "0x" + value.to_bytes(32, "big").hex()
+
+
+class Chain:
+    def __init__(self, config: ChainConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.nonces: Dict[str, int] = {}
+        self.mempool: Dict[str, Dict[int, dict]] = {}  # sender -> nonce -> tx
+        self.txs: Dict[str, dict] = {}
+        self.receipts: Dict[str, dict] = {}
+        self.blocks: List[dict] = []
+        self.dropped = 0
+        self.calls: Dict[str, int] = {}  # JSON-RPC method -> requests served
+        self.next_token: Dict[str, int] = {}  # contract -> nextTokenId
+        self.balances: Dict[tuple, int] = {}  # (contract, owner) -> tokens held
+        self.receivers: Dict[str, int] = {}  # address with code -> its onERC721Received gas
+        self._mine([])  # genesis
+
+    def add_receiver(self, address: str, gas: int = RECEIVER_GAS):
+        """Give `address` code, so minting to it runs an onERC721Received hook costing `gas`."""
+        with self.lock:
+            self.receivers[to_checksum_address(address)] = gas
+
+    def _recipient_gas(self, contract: Optional[str]) -> Callable[[str], int]:
+        """Per-token cost that depends on state, for one call (earlier tokens of a batch count)."""
+        minted: Dict[str, int] = {}
+
+        def _gas(recipient: str) -> int:
+            recipient = to_checksum_address(recipient)
+            fresh = self.balances.get((contract, recipient), 0) + minted.get(recipient, 0) == 0
+            minted[recipient] = minted.get(recipient, 0) + 1
+            return (NEW_HOLDER_GAS if fresh else 0) + self.receivers.get(recipient, 0)
+        return _gas
+
+    # ------------------- mempool -------------------
+    def send_raw(self, raw: bytes) -> str:
+        tx = decode_raw(raw)
+        if tx["type"] == 2 and tx["chainId"] != self.config.chain_id:
+            raise RPCError("invalid chain id")
+        with self.lock:
+            sender = tx["from"]
+            if tx["hash"] in self.txs:
+                return tx["hash"]  # rebroadcast of a known transaction
+            if tx["nonce"] < self.nonces.get(sender, 0):
+                raise RPCError("nonce too low")
+            if tx["maxFeePerGas"] < self.config.base_fee:
+                raise RPCError("max fee per gas less than block base fee")
+            if tx["gas"] > self.config.block_gas_limit:
+                raise RPCError("exceeds block gas limit")
+            pool = self.mempool.setdefault(sender, {})
+            old = pool.get(tx["nonce"])
+            if old:
+                if (tx["maxFeePerGas"] < old["maxFeePerGas"] * REPLACEMENT_BUMP
+                        or tx["maxPriorityFeePerGas"] < old["maxPriorityFeePerGas"] * REPLACEMENT_BUMP):
+                    raise RPCError("replacement transaction underpriced")
+                self.txs.pop(old["hash"], None)
+            if self.config.drop_rate and self.rng.random() < self.config.drop_rate:
+                self.dropped += 1  # accepted by the node, never propagated
+                return tx["hash"]
+            pool[tx["nonce"]] = tx
+            self.txs[tx["hash"]] = tx
+            return tx["hash"]
+
+    def pending_nonce(self, address: str) -> int:
+        with self.lock:
+            nonce = self.nonces.get(address, 0)
+            while nonce in self.mempool.get(address, {}):
+                nonce += 1
+            return nonce
+
+    # ------------------- mining -------------------
+    def _mine(self, included: List[dict]) -> dict:
+        number = len(self.blocks)
+        block = {
+            "number": number,
+            "hash": "0x" + keccak(f"block{number}".encode()).hex(),
+            "parentHash": self.blocks[-1]["hash"] if self.blocks else "0x" + "00" * 32,
+            "timestamp": int(time.time()),
+            "gasLimit": self.config.block_gas_limit,
+            "gasUsed": 0,
+            "baseFeePerGas": self.config.base_fee,
+            "transactions": [],
+        }
+        log_index = 0
+        for index, tx in enumerate(included):
+            needed = gas_needed(tx["input"], self._recipient_gas(tx["to"]))
+            used = min(needed, tx["gas"])
+            block["gasUsed"] += used
+            block["transactions"].append(tx["hash"])
+            tx["blockNumber"] = number
+            try:
+                mints = decode_mints(tx["input"])
+                ok = tx["gas"] >= needed
+            except Exception:
+                mints, ok = None, False
+            logs = []
+            if ok and mints and tx["to"]:
+                token_id = self.next_token.get(tx["to"], 0)
+                for recipient, _ in mints:
+                    owner = (tx["to"], to_checksum_address(recipient))
+                    self.balances[owner] = self.balances.get(owner, 0) + 1
+                    logs.append({
+                        "address": tx["to"],
+                        "topics": [TRANSFER_TOPIC, _topic(0), _topic(int(recipient, 16)), _topic(token_id)],
+                        "data": "0x", "blockNumber": number, "blockHash": block["hash"],
+                        "transactionHash": tx["hash"], "transactionIndex": index,
+                        "logIndex": log_index,
+                        "removed": False,
+                    })
+                    token_id += 1
+                    log_index += 1
+                self.next_token[tx["to"]] = token_id
+            self.receipts[tx["hash"]] = {
+                "transactionHash": tx["hash"],
+                "transactionIndex": index,
+                "blockHash": block["hash"],
+                "blockNumber": number,
+                "from": tx["from"],
+                "to": tx["to"],
+                "cumulativeGasUsed": block["gasUsed"],
+                "gasUsed": used,
+                "effectiveGasPrice": min(tx["maxFeePerGas"], self.config.base_fee + tx["maxPriorityFeePerGas"]),
+                "contractAddress": None,
+                "logs": logs,
+                "logsBloom": "0x" + "00" * 256,
+                "status": 1 if ok else 0,
+                "type": tx["type"],
+            }
+        self.blocks.append(block)
+        return block
+
+    def mine(self) -> dict:
+        """Include executable transactions (contiguous nonces per sender) up to the block gas limit."""
+        with self.lock:
+            ready = []
+            for sender, pool in self.mempool.items():
+                nonce = self.nonces.get(sender, 0)
+                while nonce in pool:
+                    ready.append(pool[nonce])
+                    nonce += 1
+            included, gas = [], 0
+            for tx in ready:
+                if tx["nonce"] != self.nonces.get(tx["from"], 0):
+                    continue  # an earlier nonce of this sender wasn't included
+                if min(tx["maxPriorityFeePerGas"], tx["maxFeePerGas"] - self.config.base_fee) < self.config.min_tip:
+                    continue
+                if gas + tx["gas"] > self.config.block_gas_limit:
+                    continue
+                gas += tx["gas"]
+                included.append(tx)
+                self.nonces[tx["from"]] = tx["nonce"] + 1
+                del self.mempool[tx["from"]][tx["nonce"]]
+            return self._mine(included)
+
+    # ------------------- JSON-RPC -------------------
+    def _block(self, tag, full: bool = False) -> Optional[dict]:
+        if tag in ("latest", "safe", "finalized", "pending"):
+            block = self.blocks[-1]
+        elif tag == "earliest":
+            block = self.blocks[0]
+        else:
+            n = int(tag, 16)
+            if n >= len(self.blocks):
+                return None
+            block = self.blocks[n]
+        out = {k: (_hex(v) if isinstance(v, int) else v) for k, v in block.items()}
+        out.update({"miner": "0x" + "00" * 20, "difficulty": "0x0", "totalDifficulty": "0x0",
+                    "extraData": "0x", "size": "0x0", "nonce": "0x0000000000000000",
+                    "sha3Uncles": "0x" + "00" * 32, "logsBloom": "0x" + "00" * 256,
+                    "stateRoot": "0x" + "00" * 32, "receiptsRoot": "0x" + "00" * 32,
+                    "transactionsRoot": "0x" + "00" * 32, "mixHash": "0x" + "00" * 32, "uncles": []})
+        if full:
+            out["transactions"] = [self._tx_json(self.txs[h]) for h in block["transactions"]]
+        return out
+
+    def _tx_json(self, tx: dict) -> dict:
+        number = tx.get("blockNumber")
+        return {
+            "hash": tx["hash"], "from": tx["from"], "to": tx["to"], "nonce": _hex(tx["nonce"]),
+            "gas": _hex(tx["gas"]), "value": _hex(tx["value"]), "input": "0x" + bytes(tx["input"]).hex(),
+            "maxFeePerGas": _hex(tx["maxFeePerGas"]), "maxPriorityFeePerGas": _hex(tx["maxPriorityFeePerGas"]),
+            "gasPrice": _hex(tx["maxFeePerGas"]), "type": _hex(tx["type"]), "chainId": _hex(self.config.chain_id),
+            "blockNumber": _hex(number) if number is not None else None,
+            "blockHash": self.blocks[number]["hash"] if number is not None else None,
+            "transactionIndex": "0x0" if number is not None else None,
+            "v": "0x0", "r": "0x0", "s": "0x0",
+        }
+
+    def _tip(self) -> int:
+        """The tip the market is paying: 1 gwei, or whatever min_tip currently demands."""
+        return max(10 ** 9, self.config.min_tip)
+
+    def call(self, method: str, params: list):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "eth_chainId":
+            return _hex(self.config.chain_id)
+        if method == "net_version":
+            return str(self.config.chain_id)
+        if method == "eth_blockNumber":
+            with self.lock:
+                return _hex(len(self.blocks) - 1)
+        if method == "eth_gasPrice":
+            return _hex(self.config.base_fee + self._tip())
+        if method == "eth_maxPriorityFeePerGas":
+            return _hex(self._tip())
+        if method == "eth_getTransactionCount":
+            address = to_checksum_address(params[0])
+            if len(params) > 1 and params[1] == "pending":
+                return _hex(self.pending_nonce(address))
+            with self.lock:
+                return _hex(self.nonces.get(address, 0))
+        if method == "eth_getBalance":
+            return _hex(10 ** 24)
+        if method == "eth_estimateGas":
+            data = bytes.fromhex((params[0].get("data") or params[0].get("input") or "0x")[2:])
+            try:
+                decode_mints(data)
+            except Exception as e:
+                raise RPCError(f"execution reverted: {e}", 3)
+            contract = to_checksum_address(params[0]["to"]) if params[0].get("to") else None
+            with self.lock:
+                return _hex(gas_needed(data, self._recipient_gas(contract)))
+        if method == "eth_getCode":
+            with self.lock:
+                return "0x6080" if to_checksum_address(params[0]) in self.receivers else "0x"
+        if method == "eth_call":
+            contract = to_checksum_address(params[0]["to"])
+            data = bytes.fromhex((params[0].get("data") or params[0].get("input") or "0x")[2:])
+            with self.lock:
+                if data[:4] == _BALANCE_OF:
+                    owner = to_checksum_address(abi_decode(["address"], data[4:])[0])
+                    return _topic(self.balances.get((contract, owner), 0))
+                if data[:4] == _NEXT_TOKEN_ID:
+                    return _topic(self.next_token.get(contract, 0))
+            raise RPCError("execution reverted", 3)
+        if method == "eth_sendRawTransaction":
+            return self.send_raw(bytes.fromhex(params[0][2:]))
+        if method == "eth_getTransactionReceipt":
+            with self.lock:
+                receipt = self.receipts.get(params[0])
+            if receipt is None:
+                return None
+            out = _hexify(receipt)
+            out["logs"] = [_hexify(log) for log in receipt["logs"]]
+            return out
+        if method == "eth_getTransactionByHash":
+            with self.lock:
+                tx = self.txs.get(params[0])
+                return self._tx_json(tx) if tx else None
+        if method == "eth_getBlockByNumber":
+            with self.lock:
+                return self._block(params[0], bool(params[1]) if len(params) > 1 else False)
+        if method == "eth_feeHistory":
+            with self.lock:
+                count = min(int(params[0], 16) if isinstance(params[0], str) else int(params[0]), len(self.blocks))
+                blocks = self.blocks[-count:]
+            return {"oldestBlock": _hex(blocks[0]["number"]),
+                    "baseFeePerGas": [_hex(b["baseFeePerGas"]) for b in blocks] + [_hex(self.config.base_fee)],
+                    "gasUsedRatio": [b["gasUsed"] / b["gasLimit"] for b in blocks],
+                    "reward": [[_hex(self._tip()) for _ in (params[2] if len(params) > 2 else [])] for _ in blocks]}
+        raise RPCError(f"method {method} not supported", -32601)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+        batch = body if isinstance(body, list) else [body]
+        out = []
+        for req in batch:
+            reply = {"jsonrpc": "2.0", "id": req.get("id")}
+            try:
+                reply["result"] = self.server.chain.call(req.get("method"), req.get("params") or [])
+            except RPCError as e:
+                reply["error"] = {"code": e.code, "message": str(e)}
+            except Exception as e:
+                reply["error"] = {"code": -32603, "message": f"{type(e).__name__}: {e}"}
+            out.append(reply)
+        payload = json.dumps(out if isinstance(body, list) else out[0]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class MockChainServer:
+    """Threaded JSON-RPC server mining a block every `block_time` seconds; use as a context manager."""
+
+    def __init__(self, config: Optional[ChainConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or ChainConfig()
+        self.chain = Chain(self.config)
+        self.httpd = _QuietServer((host, port), _Handler)
+        self.httpd.chain = self.chain
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _miner(self):
+        while not self._stop.wait(self.config.block_time):
+            self.chain.mine()
+
+    def start(self):
+        for target in (self.httpd.serve_forever, self._miner):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local dev-chain JSON-RPC mock.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--block-time", type=float, default=1.0)
+    parser.add_argument("--block-gas-limit", type=int, default=10_000_000)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of transactions silently lost")
+    parser.add_argument("--min-tip", type=int, default=0, help="wei; lower-tipping transactions stay pending")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    cfg = ChainConfig(block_time=args.block_time, block_gas_limit=args.block_gas_limit,
+                      drop_rate=args.drop_rate, min_tip=args.min_tip, seed=args.seed)
+    server = MockChainServer(cfg, host=args.host, port=args.port)
+    print(f"🧪 Mock chain (id {cfg.chain_id}) listening on {server.url}", flush=True)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# modules/mock_openai.py
+# Local OpenAI-compatible stand-in server for offline benchmarks
+#
+#   python -m modules.mock_openai --port 8001 --latency 0.4 --tps 80 --rate-limit 0.05
+#   OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8001/v1 streamlit run app.py
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from modules.context import count_tokens
+
+_WORDS = (
+    "plan pilot metric users data model launch iterate risk budget team clinic sensor "
+    "feedback retention growth privacy workflow dashboard prototype partner market cost "
+    "latency accuracy adoption trust insight roadmap milestone scale evidence empathy"
+).split()
+
+
+class MockConfig:
+    """Latency is lognormal around `latency` seconds; output streams at `tps` tokens/s."""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.35, tps: float = 120.0,
+                 error_rate: float = 0.0, rate_limit: float = 0.0, retry_after: float = 0.2,
+                 seed: int = 7, max_tokens: int = 200):
+        self.latency = latency
+        self.jitter = jitter
+        self.tps = tps
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.seed = seed
+        self.max_tokens = max_tokens
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls, self.errors, self.rate_limited = 0, 0, 0
+            self.latencies, self.prompt_tokens, self.completion_tokens = [], 0, 0
+
+    def record(self, seconds: float, prompt: int, completion: int):
+        with self._lock:
+            self.calls += 1
+            self.latencies.append(seconds)
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+
+
+def _completion_text(body: dict, seed: int, limit: int) -> str:
+    """Deterministic pseudo-text: same request + seed -> same output."""
+    digest = hashlib.sha256((str(seed) + json.dumps(body, sort_keys=True)).encode("utf-8")).hexdigest()
+    rng = random.Random(digest)
+    n = rng.randint(max(8, limit // 3), max(9, limit))
+    words = [rng.choice(_WORDS) for _ in range(n)]
+    sentences, i = [], 0
+    while i < len(words):
+        k = rng.randint(6, 14)
+        sentences.append(" ".join(words[i:i + k]).capitalize() + ".")
+        i += k
+    return " ".join(sentences)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockOpenAI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        cfg, stats = self.server.config, self.server.stats
+        started = time.monotonic()
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+        with self.server.rng_lock:
+            roll = self.server.rng.random()
+            delay = self.server.rng.lognormvariate(0, cfg.jitter) * cfg.latency
+        if roll < cfg.rate_limit:
+            with stats._lock:
+                stats.rate_limited += 1
+            return self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                   {"retry-after-ms": str(int(cfg.retry_after * 1000))})
+        if roll < cfg.rate_limit + cfg.error_rate:
+            with stats._lock:
+                stats.errors += 1
+            return self._send_json(500, {"error": {"message": "Injected server error"}})
+
+        limit = min(int(body.get("max_tokens") or cfg.max_tokens), cfg.max_tokens)
+        text = _completion_text(body, cfg.seed, limit)
+        prompt_tokens = sum(count_tokens(m.get("content") or "") + 4 for m in body.get("messages", []))
+        pieces = text.split(" ")
+        completion_tokens = count_tokens(text)
+        time.sleep(delay)  # time to first token
+        base = {"id": "chatcmpl-mock", "created": int(time.time()), "model": body.get("model", "mock")}
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, piece in enumerate(pieces):
+                delta = {"content": piece if i == 0 else " " + piece}
+                chunk = dict(base, object="chat.completion.chunk",
+                             choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(1.0 / cfg.tps)
+            done = dict(base, object="chat.completion.chunk",
+                        choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            # Record before the final bytes so readers of stats never miss a finished call.
+            tail = f"data: {json.dumps(done)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = dict(base, object="chat.completion.chunk", choices=[],
+                             usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                    "total_tokens": prompt_tokens + completion_tokens})
+                tail += f"data: {json.dumps(usage)}\n\n"
+            stats.record(time.monotonic() - started, prompt_tokens, completion_tokens)
+            self._write_chunk(tail + "data: [DONE]\n\n")
+            self._write_chunk("")
+        else:
+            time.sleep(completion_tokens / cfg.tps)
+            stats.record(time.monotonic() - started, prompt_tokens, completion_tokens)
+            self._send_json(200, dict(
+                base, object="chat.completion",
+                choices=[{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                       "total_tokens": prompt_tokens + completion_tokens},
+            ))
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop keep-alive connections after a stream; that is not an error.
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+class MockOpenAIServer:
+    """Threaded server; use as a context manager or call start()/stop()."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.httpd = _QuietServer((host, port), _Handler)
+        self.httpd.config = self.config
+        self.httpd.stats = self.stats
+        self.httpd.rng = random.Random(self.config.seed)
+        self.httpd.rng_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3, help="median time to first token (s)")
+    parser.add_argument("--jitter", type=float, default=0.35, help="lognormal sigma of latency")
+    parser.add_argument("--tps", type=float, default=120.0, help="output tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    cfg = MockConfig(latency=args.latency, jitter=args.jitter, tps=args.tps,
+                     error_rate=args.error_rate, rate_limit=args.rate_limit, seed=args.seed)
+    server = MockOpenAIServer(cfg, host=args.host, port=args.port)
+    print(f"🧪 Mock OpenAI listening on {server.base_url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
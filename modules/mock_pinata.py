@@ -0,0 +1,178 @@
+# modules/mock_pinata.py
+# Local Pinata-compatible stand-in (pinFileToIPFS, pinList and a read-only
+# gateway) for offline pinning tests and benchmarks
+#
+#   python -m modules.mock_pinata --port 8002 --latency 0.2
+#   PINATA_API_URL=http://127.0.0.1:8002 PINATA_API_KEY=mock PINATA_SECRET_API_KEY=mock streamlit run app.py
+import sys
+import json
+import time
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from modules.cid import compute_cid, directory_cids, file_node
+
+
+class PinataStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.uploads, self.files, self.bytes, self.pin_lists = 0, 0, 0, 0
+
+    def record(self, files: int, size: int):
+        with self._lock:
+            self.uploads += 1
+            self.files += files
+            self.bytes += size
+
+
+def _parse_multipart(content_type: str, body: bytes) -> tuple:
+    """(files as [(filename, bytes)], fields as {name: str}) of a multipart/form-data body."""
+    msg = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body)
+    files, fields = [], {}
+    for part in msg.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        filename = part.get_param("filename", header="content-disposition")
+        payload = part.get_payload(decode=True) or b""
+        if filename is not None:
+            files.append((filename, payload))
+        elif name:
+            fields[name] = payload.decode("utf-8")
+    return files, fields
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/pinning/pinFileToIPFS":
+            return self._send_json(404, {"error": "not found"})
+        if not self.headers.get("Authorization") and not self.headers.get("pinata_api_key"):
+            return self._send_json(401, {"error": "missing credentials"})
+        body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        files, fields = _parse_multipart(self.headers.get("Content-Type", ""), body)
+        if not files:
+            return self._send_json(400, {"error": "no file"})
+        options = json.loads(fields.get("pinataOptions") or "{}")
+        version = int(options.get("cidVersion", 0))
+        time.sleep(self.server.latency)
+
+        store = self.server.store
+        if len(files) == 1 and "/" not in files[0][0]:
+            cid = compute_cid(files[0][1], version)
+            contents = {"": files[0][1]}
+        else:
+            # "folder/a/b.json" -> "a/b.json"; the folder itself is what gets pinned
+            contents = {name.split("/", 1)[1] if "/" in name else name: data for name, data in files}
+            dirs = directory_cids({path: file_node(data, version) for path, data in contents.items()}, version)
+            cid = dirs[""]
+            with self.server.lock:  # subdirectories resolve by their own CIDs too, as on a real gateway
+                for sub, sub_cid in dirs.items():
+                    prefix = f"{sub}/" if sub else ""
+                    store.setdefault(sub_cid, {p[len(prefix):]: d for p, d in contents.items()
+                                               if p.startswith(prefix)})
+        with self.server.lock:
+            store[cid] = contents
+        self.server.stats.record(len(files), len(body))
+        self._send_json(200, {"IpfsHash": cid, "PinSize": sum(len(d) for d in contents.values()),
+                              "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/data/pinList":
+            want = parse_qs(url.query).get("hashContains", [""])[0]
+            with self.server.lock:
+                self.server.stats.pin_lists += 1
+                rows = [{"ipfs_pin_hash": cid} for cid in self.server.store if want in cid]
+            return self._send_json(200, {"count": len(rows), "rows": rows})
+        if url.path.startswith("/ipfs/"):
+            cid, _, path = url.path[len("/ipfs/"):].partition("/")
+            with self.server.lock:
+                data = self.server.store.get(cid, {}).get(path.strip("/"))
+            if data is None:
+                return self._send(404, b"not found", "text/plain")
+            return self._send(200, data, "application/octet-stream")
+        self._send_json(404, {"error": "not found"})
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients dropping the connection mid-upload is expected noise
+        pass
+
+
+class MockPinataServer:
+    """Threaded server; use as a context manager or call start()/stop(). Pins live in `store`."""
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.stats = PinataStats()
+        self.store: Dict[str, Dict[str, bytes]] = {}
+        self.httpd = _QuietServer((host, port), _Handler)
+        self.httpd.latency = latency
+        self.httpd.stats = self.stats
+        self.httpd.store = self.store
+        self.httpd.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local Pinata-compatible mock server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.0, help="added delay per upload (s)")
+    args = parser.parse_args(argv)
+    server = MockPinataServer(args.latency, host=args.host, port=args.port)
+    print(f"🧪 Mock Pinata listening on {server.base_url} (gateway at {server.base_url}/ipfs/)", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,8 @@ import os
 import json
 from web3 import Web3
 
+from modules.mint_coordinator import get_mint_coordinator
+
 CELO_RPC = os.getenv("CELO_RPC", "https://alfajores-forno.celo-testnet.org")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS")
@@ -18,23 +20,37 @@ try:
 except Exception:
     CONTRACT_ABI_JSON = []
 
+def _queue():
+    return get_mint_coordinator(web3, PRIVATE_KEY, CONTRACT_ADDRESS, CONTRACT_ABI_JSON).queue
+
+
 def mint_nft(recipient: str, metadata_uri: str):
     """
     Mints NFT on Celo Alfajores Testnet with metadata URI (IPFS link)
     """
-    contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI_JSON)
-    nonce = web3.eth.get_transaction_count(account.address)
-    gas_estimate = contract.functions.safeMint(recipient, metadata_uri).estimate_gas({"from": account.address})
-
-    txn = contract.functions.safeMint(recipient, metadata_uri).build_transaction({
-        "from": account.address,
-        "nonce": nonce,
-        "gas": int(gas_estimate * 1.2),
-        "gasPrice": web3.to_wei("2", "gwei"),
-        "chainId": 44787  # Alfajores Testnet
-    })
-
-    signed_tx = web3.eth.account.sign_transaction(txn, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    tx_receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-    return tx_hash.hex(), tx_receipt
+    job = _queue().submit(recipient, metadata_uri)
+    tx_receipt = job.wait()
+    return job.tx_hash, tx_receipt
+
+
+def mint_many(items):
+    """
+    Mints (recipient, metadata URI) pairs back-to-back with locally assigned
+    nonces; returns the MintJobs immediately (job.wait() for each receipt)
+    """
+    return _queue().submit_many(items)
+
+
+def mint_batch(recipients, metadata_uris):
+    """
+    Mints a collection with safeMintBatch calls chunked to fit the block gas
+    limit; `recipients` is one address or one per URI. Returns one
+    {"recipient", "uri", "token_id", "tx_hash"} per token, in order.
+    """
+    jobs = _queue().submit_batch(recipients, metadata_uris)
+    minted = []
+    for job in jobs:
+        job.wait()
+        minted.extend({"recipient": r, "uri": u, "token_id": t, "tx_hash": job.tx_hash}
+                      for r, u, t in zip(job.recipient, job.uri, job.token_ids))
+    return minted
@@ -0,0 +1,81 @@
+# modules/roles.py
+# Registry of agent personas and collaboration modes
+#
+# Built-in personas are registered below. Extra ones can be added in code with
+# register_role()/register_mode() or from a JSON file (NEUROWEAVE_ROLES_PATH,
+# default roles.json) shaped like:
+#   {"roles": {"Legal": {"primer": "You are LegalAI. ...", "emoji": "⚖️", "color": "#0ea5e9"}},
+#    "modes": {"Panel (Wide)": {"roles": ["Logic", "Legal", "Data"], "sequential": false}}}
+import os
+import json
+from typing import Dict, List, Optional
+
+ROLES_PATH = os.getenv("NEUROWEAVE_ROLES_PATH", "roles.json")
+
+SYSTEM_PRIMERS: Dict[str, str] = {}
+ROLE_STYLES: Dict[str, dict] = {}
+MODES: Dict[str, List[str]] = {}
+# Modes where each agent must see the previous agent's reply within the same turn.
+SEQUENTIAL_MODES = set()
+
+_PALETTE = ["#0ea5e9", "#f97316", "#14b8a6", "#a855f7", "#ef4444", "#84cc16", "#eab308", "#64748b"]
+
+
+def register_role(name: str, primer: str, emoji: str = "🤖", color: Optional[str] = None,
+                  focus: str = "contributed its perspective to the discussion."):
+    """Add or replace a persona. `focus` completes the dashboard's reasoning-trace line."""
+    SYSTEM_PRIMERS[name] = primer
+    if color is None:
+        color = _PALETTE[len(ROLE_STYLES) % len(_PALETTE)]
+    ROLE_STYLES[name] = {"emoji": emoji, "color": color, "focus": focus}
+
+
+def register_mode(name: str, roles: List[str], sequential: bool = False):
+    unknown = [r for r in roles if r not in SYSTEM_PRIMERS]
+    if unknown:
+        raise ValueError(f"Mode {name!r} uses unregistered roles: {unknown}")
+    MODES[name] = list(roles)
+    if sequential:
+        SEQUENTIAL_MODES.add(name)
+    else:
+        SEQUENTIAL_MODES.discard(name)
+
+
+def role_style(name: str) -> dict:
+    return ROLE_STYLES.get(name, {"emoji": "🤖", "color": "#374151", "focus": "contributed to the discussion."})
+
+
+def load_roles_file(path: str = ROLES_PATH) -> bool:
+    """Register personas and modes from a JSON file; returns False if it does not exist."""
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    for name, role in (spec.get("roles") or {}).items():
+        register_role(name, role["primer"], emoji=role.get("emoji", "🤖"), color=role.get("color"),
+                      focus=role.get("focus", "contributed its perspective to the discussion."))
+    for name, mode in (spec.get("modes") or {}).items():
+        if isinstance(mode, list):
+            mode = {"roles": mode}
+        register_mode(name, mode["roles"], sequential=bool(mode.get("sequential", False)))
+    return True
+
+
+# ------------------- BUILT-IN PERSONAS -------------------
+register_role("Creative", "You are CreativeAI. Generate bold, novel, visual ideas.",
+              emoji="🎨", color="#7c3aed", focus="contributed innovative associations.")
+register_role("Logic", "You are LogicAI. Structure, validate, and make plans.",
+              emoji="🧠", color="#2563eb", focus="structured the core reasoning and flow.")
+register_role("Empathy", "You are EmpathAI. Understand human perspectives and emotions.",
+              emoji="💞", color="#db2777", focus="refined human-centered phrasing and tone.")
+register_role("Data", "You are DataAI. Back insights with evidence and metrics.",
+              emoji="📊", color="#16a34a", focus="cross-verified key metrics and factual data.")
+
+register_mode("Planner (Structured)", ["Logic", "Data", "Empathy", "Creative"])
+register_mode("Debate (Critical)", ["Logic", "Creative", "Data"], sequential=True)
+register_mode("Brainstorm (Divergent)", ["Creative", "Empathy", "Data", "Logic"])
+
+try:
+    load_roles_file()
+except (OSError, ValueError, KeyError) as e:
+    print("🧩 Could not load custom roles:", e)
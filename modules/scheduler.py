@@ -0,0 +1,174 @@
+# modules/scheduler.py
+# Rate-limit-aware scheduler shared by every OpenAI call in the process
+import os
+import time
+import random
+import threading
+from typing import Callable, Optional
+
+from modules.context import count_tokens
+
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+OPENAI_LATENCY_TARGET = float(os.getenv("OPENAI_LATENCY_TARGET", "20"))  # seconds
+
+_RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRY_ERRORS = {"APIConnectionError", "APITimeoutError", "Timeout", "ConnectionError"}
+
+
+def estimate_tokens(messages: list, max_tokens: Optional[int] = None) -> int:
+    """Prompt tokens plus the completion allowance, for the tokens-per-minute budget."""
+    prompt = sum(count_tokens(m.get("content") or "") + 4 for m in messages)
+    return prompt + (max_tokens or 1000)
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, bursting up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                wait = (amount - self.level) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def refund(self, amount: float):
+        """Give back (or, if negative, charge) the gap between estimated and actual use."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+
+def _status_code(err: Exception) -> Optional[int]:
+    code = getattr(err, "status_code", None)
+    if code is None and getattr(err, "response", None) is not None:
+        code = getattr(err.response, "status_code", None)
+    return code
+
+
+def _retry_after(err: Exception) -> Optional[float]:
+    """Seconds from Retry-After / retry-after-ms headers, when the server sent one."""
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class OpenAIScheduler:
+    """
+    Gates calls with requests-per-minute and tokens-per-minute buckets and an
+    AIMD concurrency limit: the limit grows by ~1 per window of successful fast
+    calls and halves on every 429. Retryable failures back off exponentially
+    with full jitter, honoring Retry-After.
+    """
+
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM,
+                 max_concurrency: int = OPENAI_MAX_CONCURRENCY, max_retries: int = OPENAI_MAX_RETRIES,
+                 latency_target: float = OPENAI_LATENCY_TARGET, base_delay: float = 0.5, max_delay: float = 30.0):
+        self._rpm = TokenBucket(rpm)
+        self._tpm = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(min(4, self.max_concurrency))
+        self.max_retries = max_retries
+        self.latency_target = latency_target
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._active = 0
+        self._cond = threading.Condition()
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+
+    # ---- concurrency slots ----
+    def _enter(self):
+        with self._cond:
+            while self._active >= int(self.limit):
+                self._cond.wait()
+            self._active += 1
+
+    def _leave(self, latency: Optional[float] = None, throttled: bool = False):
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            elif latency is not None and latency > self.latency_target:
+                self.limit = max(1.0, self.limit * 0.9)
+            elif latency is not None:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _backoff(self, err: Exception, attempt: int) -> Optional[float]:
+        code = _status_code(err)
+        if code not in _RETRY_STATUS and type(err).__name__ not in _RETRY_ERRORS:
+            return None
+        hinted = _retry_after(err)
+        if hinted is not None:
+            return min(self.max_delay, hinted) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn: Callable, est_tokens: int = 1000, meta: Optional[dict] = None):
+        """
+        Run fn() within the budgets, retrying transient failures.
+        est_tokens is charged up front and corrected from response.usage if present.
+        If given, meta["retries"] is set to the number of retries used.
+        """
+        meta = meta if meta is not None else {}
+        for attempt in range(self.max_retries + 1):
+            meta["retries"] = attempt
+            self._rpm.acquire(1)
+            self._tpm.acquire(est_tokens)
+            self._enter()
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = _status_code(e) == 429
+                self._leave(throttled=throttled)
+                delay = self._backoff(e, attempt)
+                with self._cond:
+                    self.stats["rate_limited"] += throttled
+                    if delay is None or attempt == self.max_retries:
+                        self.stats["failures"] += 1
+                        raise
+                    self.stats["retries"] += 1
+                time.sleep(delay)
+                continue
+            self._leave(latency=time.monotonic() - started)
+            with self._cond:
+                self.stats["calls"] += 1
+            usage = getattr(result, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self._tpm.refund(est_tokens - usage.total_tokens)
+            return result
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> OpenAIScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = OpenAIScheduler()
+    return _scheduler
@@ -0,0 +1,213 @@
+# modules/search.py
+# Article search backends behind one interface (SEARCH_BACKEND):
+#   duckduckgo  HTML scrape with a pooled keep-alive session, TTL result cache and
+#               in-flight coalescing (concurrent identical queries share one fetch)
+#   local       offline BM25 index over a directory or JSONL corpus (modules.bm25)
+import os
+import abc
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote, urlparse, parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+
+from modules import telemetry
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "duckduckgo").lower()
+SEARCH_URL = "https://duckduckgo.com/html/"
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))       # seconds
+SEARCH_CACHE_ENTRIES = int(os.getenv("SEARCH_CACHE_ENTRIES", "256"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "20"))
+SEARCH_POOL_SIZE = int(os.getenv("SEARCH_POOL_SIZE", "8"))
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+# lxml is optional: a faster tokenizer for the same strained parse.
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# Only result title and snippet anchors are materialized; the rest of the page
+# (region selector, forms, icons, extras) is tokenized but never built into the tree.
+_RESULT_ANCHORS = SoupStrainer("a", class_=["result__a", "result__snippet"])
+
+
+class SearchResult(NamedTuple):
+    title: str
+    url: str
+    snippet: str = ""
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def decode_duck_url(url: str) -> str:
+    """Convert DuckDuckGo redirect link (/l/?uddg=...) to real article URL."""
+    if "uddg=" in url:
+        try:
+            qs = parse_qs(urlparse(url).query)
+            return unquote(qs.get("uddg", [url])[0])
+        except Exception:
+            return url
+    return url
+
+
+def _is_ad(url: str) -> bool:
+    parsed = urlparse(url)
+    return parsed.netloc.endswith("duckduckgo.com") and parsed.path.startswith("/y.js")
+
+
+def _results_region(html: str) -> str:
+    """Cut the page down to the results list so the header and footer are never tokenized."""
+    start = html.find('<div id="links"')
+    if start < 0:
+        return html
+    end = html.find('<div class="nav-link"', start)
+    return html[start:end] if end > 0 else html[start:]
+
+
+def parse_results(html: str) -> List[SearchResult]:
+    """Title, decoded URL and snippet of every organic result on a DuckDuckGo HTML page."""
+    soup = BeautifulSoup(_results_region(html), HTML_PARSER, parse_only=_RESULT_ANCHORS)
+    results: List[SearchResult] = []
+    current = None
+    for a in soup.find_all("a"):
+        if "result__a" in a.get("class", ()):
+            if current:
+                results.append(current)
+            href = a.get("href", "")
+            url = decode_duck_url(href)
+            current = SearchResult(a.get_text(strip=True), url) if "http" in url and not _is_ad(href) else None
+        elif current and not current.snippet:
+            current = current._replace(snippet=a.get_text(" ", strip=True))
+    if current:
+        results.append(current)
+    return results
+
+
+class SearchBackend(abc.ABC):
+    """Interface for article search: results for a query, best first."""
+
+    name = "base"
+    # Whether result URLs point at live pages worth fetching for enrichment.
+    fetch_pages = True
+
+    @abc.abstractmethod
+    def search(self, query: str) -> List[SearchResult]:
+        """Results for `query`, best first."""
+
+
+class DuckDuckGoSearch(SearchBackend):
+    """
+    One shared client per process. Parsed results are cached per normalized
+    query for `ttl` seconds; failed fetches are not cached, so the next call
+    retries.
+    """
+
+    name = "duckduckgo"
+
+    def __init__(self, ttl: float = SEARCH_CACHE_TTL, max_entries: int = SEARCH_CACHE_ENTRIES,
+                 timeout: float = SEARCH_TIMEOUT, pool_size: int = SEARCH_POOL_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.http.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self._cache: "OrderedDict[str, Tuple[float, List[SearchResult]]]" = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def _fetch(self, query: str) -> List[SearchResult]:
+        with telemetry.timed("http", "search:duckduckgo"):
+            res = self.http.get(SEARCH_URL, params={"q": query}, timeout=self.timeout)
+            res.raise_for_status()
+        return parse_results(res.text)
+
+    def search(self, query: str) -> List[SearchResult]:
+        key = normalize_query(query)
+        if not key:
+            return []
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and time.time() - hit[0] < self.ttl:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return list(hit[1])
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                owner = True
+                self.stats["misses"] += 1
+            else:
+                owner = False
+                self.stats["coalesced"] += 1
+
+        if not owner:
+            return list(pending.result())
+
+        try:
+            results = self._fetch(key)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                del self._inflight[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            self._cache[key] = (time.time(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            del self._inflight[key]
+        pending.set_result(results)
+        return list(results)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class LocalSearch(SearchBackend):
+    """Offline search over the BM25 index built with `python -m modules.bm25 add <corpus>`."""
+
+    name = "local"
+    fetch_pages = False  # the index already holds the text; air-gapped hosts cannot fetch anyway
+
+    def __init__(self, index=None, limit: int = 10):
+        from modules.bm25 import get_index
+        self.index = index or get_index()
+        self.limit = limit
+
+    def search(self, query: str) -> List[SearchResult]:
+        hits = self.index.search(query, k=self.limit)
+        return [SearchResult(h["title"] or h["url"], h["url"], h["snippet"] or "") for h in hits]
+
+
+BACKENDS = {"duckduckgo": DuckDuckGoSearch, "local": LocalSearch}
+
+_client: Optional[SearchBackend] = None
+_client_lock = threading.Lock()
+
+def get_search_client() -> SearchBackend:
+    """The process-wide backend chosen by SEARCH_BACKEND (unknown names fall back to DuckDuckGo)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            backend = BACKENDS.get(SEARCH_BACKEND)
+            if backend is None:
+                print(f"🔎 Unknown SEARCH_BACKEND {SEARCH_BACKEND!r}, using duckduckgo")
+                backend = DuckDuckGoSearch
+            _client = backend()
+    return _client
@@ -0,0 +1,197 @@
+# modules/session_store.py
+# Persistent store of collective sessions (every turn, final answer, articles, metrics)
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional
+
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(".neuroweave", "sessions.sqlite"))
+
+# Session columns stored as JSON text
+_JSON_FIELDS = ("options", "transcript", "article", "more_articles", "stats", "telemetry", "derived")
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(" ".join(prompt.lower().split()).encode("utf-8")).hexdigest()
+
+
+class SessionStore:
+    """
+    SQLite-backed session history. `sessions` holds one row per run (indexed by
+    prompt hash, mode and creation time); `turns` holds every reply of every
+    role so an interrupted or finished session can be resumed.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = self._db()
+        db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                status TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                temperature REAL,
+                steps INTEGER,
+                options TEXT,
+                final TEXT,
+                transcript TEXT,
+                article TEXT,
+                more_articles TEXT,
+                stats TEXT,
+                telemetry TEXT,
+                derived TEXT
+            );
+            CREATE INDEX IF NOT EXISTS sessions_prompt ON sessions(prompt_hash);
+            CREATE INDEX IF NOT EXISTS sessions_mode ON sessions(mode, created);
+            CREATE INDEX IF NOT EXISTS sessions_created ON sessions(created);
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL,
+                turn INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                text TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (session_id, turn, role)
+            );
+            """
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- writes ----
+    def create(self, prompt: str, mode: str, temperature: float, steps: int, **options) -> str:
+        sid = uuid.uuid4().hex[:12]
+        now = time.time()
+        self._db().execute(
+            "INSERT INTO sessions (id, created, updated, status, prompt, prompt_hash, mode, temperature, steps, options)"
+            " VALUES (?, ?, ?, 'running', ?, ?, ?, ?, ?, ?)",
+            (sid, now, now, prompt, prompt_hash(prompt), mode, temperature, steps, json.dumps(options)),
+        )
+        return sid
+
+    def add_turn(self, session_id: str, turn: int, role: str, text: str):
+        db = self._db()
+        seq = db.execute("SELECT COUNT(*) FROM turns WHERE session_id = ?", (session_id,)).fetchone()[0]
+        db.execute(
+            "INSERT OR REPLACE INTO turns (session_id, turn, seq, role, text, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, turn, seq, role, text, time.time()),
+        )
+
+    def update(self, session_id: str, **fields):
+        """Set any session columns; JSON columns accept plain Python values."""
+        if not fields:
+            return
+        cols, values = [], []
+        for key, value in fields.items():
+            cols.append(f"{key} = ?")
+            values.append(json.dumps(value, ensure_ascii=False) if key in _JSON_FIELDS else value)
+        cols.append("updated = ?")
+        values.extend([time.time(), session_id])
+        self._db().execute(f"UPDATE sessions SET {', '.join(cols)} WHERE id = ?", values)
+
+    def merge_derived(self, session_id: str, **values):
+        """Add computed results (AI summary, business data, ...) to the session's `derived` map."""
+        row = self._db().execute("SELECT derived FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        derived = json.loads(row["derived"]) if row and row["derived"] else {}
+        derived.update(values)
+        self.update(session_id, derived=derived)
+
+    def finish(self, session_id: str, transcript, final: str, stats: Optional[dict] = None,
+               telemetry: Optional[dict] = None):
+        self.update(session_id, status="complete", transcript=transcript, final=final,
+                    stats=stats, telemetry=telemetry)
+
+    # ---- reads ----
+    def _row(self, row: sqlite3.Row) -> dict:
+        out = dict(row)
+        for key in _JSON_FIELDS:
+            if out.get(key):
+                out[key] = json.loads(out[key])
+        return out
+
+    def load(self, session_id: str) -> Optional[dict]:
+        db = self._db()
+        row = db.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        out = self._row(row)
+        out["turns"] = [
+            (r["turn"], r["role"], r["text"])
+            for r in db.execute("SELECT turn, role, text FROM turns WHERE session_id = ? ORDER BY seq",
+                                (session_id,))
+        ]
+        return out
+
+    def list(self, limit: int = 20, mode: Optional[str] = None, prompt: Optional[str] = None,
+             since: Optional[float] = None) -> List[dict]:
+        """Newest first; filter by mode, exact (normalized) prompt or creation time."""
+        where, args = [], []
+        if mode:
+            where.append("mode = ?")
+            args.append(mode)
+        if prompt:
+            where.append("prompt_hash = ?")
+            args.append(prompt_hash(prompt))
+        if since:
+            where.append("created >= ?")
+            args.append(since)
+        sql = "SELECT id, created, updated, status, prompt, mode, temperature, steps FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC LIMIT ?"
+        return [dict(r) for r in self._db().execute(sql, (*args, limit))]
+
+    def history(self, session_id: str) -> List[tuple]:
+        """(turn, role, text) for every complete turn, ready for iter_collective_session(history=...)."""
+        session = self.load(session_id)
+        if not session:
+            return []
+        expected = len(_mode_roles(session["mode"]))
+        by_turn = {}
+        for turn, role, text in session["turns"]:
+            by_turn.setdefault(turn, []).append((turn, role, text))
+        complete = []
+        for turn in sorted(by_turn):
+            if len(by_turn[turn]) < expected:
+                break  # partially written turn: re-run it
+            complete.extend(by_turn[turn])
+        return complete
+
+
+def _mode_roles(mode: str) -> list:
+    from modules.roles import MODES
+    return MODES.get(mode, MODES["Planner (Structured)"])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> Optional[SessionStore]:
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = SessionStore()
+            except (OSError, sqlite3.Error) as e:
+                print("🗂️ Session store unavailable:", e)
+                return None
+    return _store
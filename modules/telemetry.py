@@ -0,0 +1,123 @@
+# modules/telemetry.py
+# Per-call telemetry (latency, time to first token, tokens, retries, cost)
+#
+#   with telemetry.session() as tel:
+#       ... run LLM / HTTP calls ...
+#   tel.summary()  # measured numbers for the dashboard and reports
+#
+# Records go to the collector bound to the current context. Worker threads do
+# not inherit it automatically, so pools submit through telemetry.submit().
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from statistics import mean, median
+from typing import List, Optional
+
+# USD per 1M tokens (input, output)
+PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+_current = contextvars.ContextVar("neuroweave_telemetry", default=None)
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = PRICING.get(model, PRICING["gpt-4o-mini"])
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def _pct(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))] if ordered else 0.0
+
+
+class Telemetry:
+    """Thread-safe list of call records for one session."""
+
+    def __init__(self):
+        self.records: List[dict] = []
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, record: dict):
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self) -> dict:
+        with self._lock:
+            records = list(self.records)
+        llm = [r for r in records if r["kind"] == "llm"]
+        live = [r for r in llm if not r.get("cached")]
+        agent = [r for r in live if r.get("label", "").startswith("agent")]
+        ttfts = [r["ttft_s"] for r in live if r.get("ttft_s") is not None]
+        lat = [r["latency_s"] for r in live]
+        prompt_tokens = sum(r.get("prompt_tokens", 0) for r in live)
+        completion_tokens = sum(r.get("completion_tokens", 0) for r in live)
+        return {
+            "wall_s": round((self.finished or time.time()) - self.started, 3),
+            "llm_calls": len(llm),
+            "cached_calls": len(llm) - len(live),
+            "http_calls": sum(1 for r in records if r["kind"] == "http"),
+            "errors": sum(1 for r in records if r.get("error")),
+            "retries": sum(r.get("retries", 0) for r in records),
+            "avg_latency_s": round(mean(lat), 3) if lat else None,
+            "p50_latency_s": round(median(lat), 3) if lat else None,
+            "p95_latency_s": round(_pct(lat, 95), 3) if lat else None,
+            "avg_agent_latency_s": round(mean(r["latency_s"] for r in agent), 3) if agent else None,
+            "avg_ttft_s": round(mean(ttfts), 3) if ttfts else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cost_usd": round(sum(r.get("cost_usd", 0.0) for r in live), 6),
+            "http_latency_s": round(sum(r["latency_s"] for r in records if r["kind"] == "http"), 3),
+        }
+
+
+@contextmanager
+def session(tel: Optional[Telemetry] = None):
+    """Bind a collector to the current context for the duration of the block."""
+    tel = tel or Telemetry()
+    token = _current.set(tel)
+    try:
+        yield tel
+    finally:
+        tel.finished = time.time()
+        _current.reset(token)
+
+
+def current() -> Optional[Telemetry]:
+    return _current.get()
+
+
+def record(kind: str, label: str, latency_s: float, **fields):
+    """Add one call record to the current collector (no-op outside a session)."""
+    tel = _current.get()
+    if tel is None:
+        return
+    rec = {"kind": kind, "label": label, "latency_s": round(latency_s, 4), "at": time.time()}
+    rec.update(fields)
+    if kind == "llm" and not fields.get("cached"):
+        rec["cost_usd"] = call_cost(fields.get("model", ""), fields.get("prompt_tokens", 0),
+                                    fields.get("completion_tokens", 0))
+    tel.add(rec)
+
+
+@contextmanager
+def timed(kind: str, label: str, **fields):
+    """Time a block (e.g. an HTTP request) and record it, including failures."""
+    started = time.perf_counter()
+    try:
+        yield fields
+    except Exception as e:
+        fields["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record(kind, label, time.perf_counter() - started, **fields)
+
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit that carries the caller's telemetry collector into the worker."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
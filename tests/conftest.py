@@ -0,0 +1,55 @@
+# tests/conftest.py
+# Shared fixtures: every test runs against local mock servers and temporary
+# SQLite/cache files, never the network or the working tree's .neuroweave/
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def pinata(tmp_path, monkeypatch):
+    """A MockPinataServer with modules.ipfs pointed at it and a fresh pin index and gateway cache."""
+    from modules import gateway, ipfs
+    from modules.mock_pinata import MockPinataServer
+
+    with MockPinataServer() as server:
+        monkeypatch.setattr(ipfs, "PINATA_API_URL", server.base_url)
+        monkeypatch.setattr(ipfs, "PINATA_API_KEY", "mock")
+        monkeypatch.setattr(ipfs, "PINATA_SECRET_API_KEY", "mock")
+        monkeypatch.setattr(ipfs, "_index", ipfs.PinIndex(str(tmp_path / "pins.sqlite")))
+        monkeypatch.setattr(gateway, "_resolver", gateway.GatewayResolver(
+            gateways=[f"{server.base_url}/ipfs/"], cache=gateway.ContentCache(str(tmp_path / "ipfs"))))
+        yield server
+
+
+@pytest.fixture
+def abi():
+    import json
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "contract_abi.json")) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def chain():
+    """A MockChainServer with fast blocks; the server object has .url and .chain."""
+    from modules.mock_chain import ChainConfig, MockChainServer
+
+    with MockChainServer(ChainConfig(block_time=0.2)) as server:
+        yield server
+
+
+@pytest.fixture
+def mint_queue(chain, abi):
+    """A MintQueue for a fresh account against `chain`, with tracker timings scaled to its blocks."""
+    from eth_account import Account
+    from web3 import Web3
+    from modules.mint_queue import MintQueue
+
+    queue = MintQueue(Web3(Web3.HTTPProvider(chain.url)), Account.create().key.hex(),
+                      Web3.to_checksum_address("0x" + "11" * 20), abi,
+                      poll=0.05, rebroadcast_after=0.4, stuck_after=30)
+    yield queue
+    queue.oracle.stop()
@@ -0,0 +1,50 @@
+# tests/record_kubo_cids.py
+# Fill the null CIDs in tests/fixtures/kubo_cids.json from a local kubo:
+#
+#   python tests/record_kubo_cids.py          # only missing entries
+#   python tests/record_kubo_cids.py --all    # re-record everything
+#
+# With the ipfs CLI both versions are recorded; with only KUBO_LIB set
+# (see tests/kubo_vectors.py), the v0 CIDs.
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kubo_vectors  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Record reference CIDs with kubo.")
+    parser.add_argument("--all", action="store_true", help="re-record entries that already have CIDs")
+    args = parser.parse_args(argv)
+    versions = kubo_vectors.versions()
+    if not versions:
+        print("ipfs (kubo) is not on PATH and KUBO_LIB is not set", file=sys.stderr)
+        return 1
+    data = kubo_vectors.load()
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("files", "directories"):
+            for n, entry in enumerate(data[kind]):
+                todo = [v for v in versions if args.all or not entry[f"v{v}"]]
+                if not todo:
+                    continue
+                path = os.path.join(tmp, f"{kind}-{n}")
+                if kind == "files":
+                    with open(path, "wb") as f:
+                        f.write(kubo_vectors.content(entry["content"]))
+                else:
+                    kubo_vectors.write_tree(path, entry["files"])
+                for version in todo:
+                    entry[f"v{version}"] = kubo_vectors.kubo_cid(path, version)
+                print(f"{kind[:-1]} {entry['name']}: {entry['v0']} {entry['v1']}")
+    with open(kubo_vectors.FIXTURE, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
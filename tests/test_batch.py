@@ -0,0 +1,42 @@
+import json
+
+from modules import batch
+
+
+def test_resume_after_interrupted_write(tmp_path, monkeypatch):
+    out = tmp_path / "results.jsonl"
+    out.write_text(json.dumps({"id": "a", "status": "ok"}) + "\n" + '{"id": "b", "status": "o', encoding="utf-8")
+    monkeypatch.setattr(batch, "run_job", lambda job: {"id": job["id"], "status": "ok", "seconds": 0})
+
+    summary = batch.run_batch([{"id": "a"}, {"id": "b"}, {"id": "c"}], str(out), workers=2)
+
+    rows = batch.load_rows(str(out))  # every line parses again
+    assert summary["skipped"] == 1 and summary["ok"] == 2
+    assert sorted(r["id"] for r in rows) == ["a", "b", "c"]
+    assert batch.completed_ids(str(out)) == {"a", "b", "c"}
+
+
+def test_run_job_records_every_turn(monkeypatch):
+    def _session(prompt, mode, temperature, steps, parallel, stream, novelty_threshold):
+        for turn in range(2):
+            for role in ("Planner", "Critic"):
+                yield {"type": "token", "role": role, "turn": turn, "text": "..."}
+                yield {"type": "message", "role": role, "turn": turn, "text": f"{role} {turn}"}
+            yield {"type": "turn", "turn": turn, "novelty": 0.5}
+        yield {"type": "done", "ordered": [("Planner", "Planner 1"), ("Critic", "Critic 1")], "final": "plan",
+               "stats": {"turns": 2}, "telemetry": None}
+
+    monkeypatch.setattr(batch, "iter_collective_session", _session)
+    job = batch.expand_jobs([{"prompt": "p"}])[0]
+    rec = batch.run_job(job)
+    assert rec["status"] == "ok" and rec["final"] == "plan"
+    assert rec["transcript"] == [[0, "Planner", "Planner 0"], [0, "Critic", "Critic 0"],
+                                 [1, "Planner", "Planner 1"], [1, "Critic", "Critic 1"]]
+
+
+def test_job_ids_cover_every_session_option():
+    rows = [{"prompt": "p"}, {"prompt": "p", "parallel": True}, {"prompt": "p", "novelty_threshold": 0.2},
+            {"prompt": "p", "steps": 4}, {"prompt": "p", "temperature": 0.2}]
+    ids = [job["id"] for job in batch.expand_jobs(rows)]
+    assert len(set(ids)) == len(rows)
+    assert batch.expand_jobs([{"prompt": "p"}])[0]["id"] == ids[0]
@@ -0,0 +1,17 @@
+import os
+
+from modules import agents, llm_cache
+from modules.bench import run_benchmark
+from modules.mock_openai import MockConfig
+
+
+def test_session_benchmark_is_repeatable_and_leaves_agents_as_it_found_them():
+    before = (dict(os.environ), agents._client, agents.USE_OPENAI, llm_cache.LLM_CACHE_ENABLED)
+    mode = list(agents.MODES)[0]
+    runs = [run_benchmark(steps=1, config=MockConfig(latency=0.01, jitter=0.0, tps=5000), modes=[mode])
+            for _ in range(2)]
+    for [row] in runs:
+        assert row["mode"] == mode and row["errors"] == 0
+        assert row["calls"] > 0 and row["p50_s"] > 0
+    assert runs[0][0]["calls"] == runs[1][0]["calls"]  # the cache stayed off for the second run
+    assert (dict(os.environ), agents._client, agents.USE_OPENAI, llm_cache.LLM_CACHE_ENABLED) == before
@@ -0,0 +1,108 @@
+import os
+import time
+
+import pytest
+
+from modules.bench import _synthetic_corpus
+from modules.bm25 import BM25Index
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _segment_files(index):
+    return sorted(n for n in os.listdir(index.path) if n.endswith(".post"))
+
+
+@pytest.fixture
+def articles(tmp_path):
+    root = tmp_path / "articles"
+    root.mkdir()
+    _write(root / "triage.md", "# Rural triage\nNurses use AI triage in rural clinics.")
+    _write(root / "solar.md", "# Solar microgrids\nMicrogrids keep rural clinics powered.")
+    _write(root / "farming.txt", "Vertical farming\nSensors tune crop yield indoors.")
+    return root
+
+
+def test_ranks_matching_documents_first(tmp_path, articles):
+    index = BM25Index(str(tmp_path / "index"))
+    assert index.add_corpus(str(articles)) == 3
+    hits = index.search("ai triage nurses")
+    assert hits[0]["title"] == "Rural triage"
+    assert [h["title"] for h in index.search("rural clinics")][:2] == ["Rural triage", "Solar microgrids"]
+    assert index.search("blockchain") == []
+
+
+def test_changed_files_supersede_and_deleted_files_retire(tmp_path, articles):
+    index = BM25Index(str(tmp_path / "index"))
+    index.add_corpus(str(articles))
+    assert index.add_corpus(str(articles)) == 0  # nothing changed
+
+    _write(articles / "solar.md", "# Wind turbines\nTurbines power remote villages.")
+    assert index.add_corpus(str(articles)) == 1
+    assert index.search("microgrids") == []
+    assert [h["title"] for h in index.search("turbines")] == ["Wind turbines"]
+    assert index.doc_count == 3
+
+    os.remove(articles / "farming.txt")
+    assert index.add_corpus(str(articles)) == 0
+    assert index.search("crop yield") == [] and index.doc_count == 2
+    # a fresh handle on the same directory agrees
+    assert BM25Index(index.path).doc_count == 2
+
+
+def test_add_supersedes_by_url(tmp_path):
+    index = BM25Index(str(tmp_path / "index"))
+    index.add([{"url": "u1", "title": "first", "text": "alpha beta"}, {"url": "u2", "title": "other", "text": "beta"}])
+    index.add([{"url": "u1", "title": "second", "text": "gamma"}])
+    assert index.search("alpha") == []
+    assert [h["title"] for h in index.search("gamma")] == ["second"]
+    assert index.doc_count == 2
+
+
+def test_compaction_keeps_results_and_drops_superseded_documents(tmp_path):
+    index = BM25Index(str(tmp_path / "index"))
+    corpus = list(_synthetic_corpus(600))
+    for start in range(0, 600, 100):
+        index.add(corpus[start:start + 100])
+    index.add([dict(doc, text=doc["text"] + " w19999") for doc in corpus[:50]])  # supersede 50
+    queries = ["w3 w700", "w19999", "w1 w2 w3", "w12345 w40"]
+    before = [index.search(q, k=20) for q in queries]
+    assert len(_segment_files(index)) == 7
+
+    index.compact()
+    assert [index.search(q, k=20) for q in queries] == before
+    assert len(_segment_files(index)) == 1 and index.doc_count == 600
+    assert index._db().execute("SELECT COUNT(*) FROM docs").fetchone()[0] == 600
+    # a fresh handle reads the compacted segment
+    assert [BM25Index(index.path).search(q, k=20) for q in queries] == before
+
+
+def test_compacting_away_every_posting(tmp_path, articles):
+    index = BM25Index(str(tmp_path / "index"))
+    index.add_corpus(str(articles))
+    _write(articles / "triage.md", "# Rural triage\nNurses and doctors use AI triage.")
+    index.add_corpus(str(articles))
+    for name in os.listdir(articles):
+        os.remove(articles / name)
+    index.add_corpus(str(articles))
+    index.compact()
+    assert _segment_files(index) == [] and index.doc_count == 0 and index.search("triage") == []
+
+
+def test_queries_take_a_few_milliseconds(tmp_path):
+    index = BM25Index(str(tmp_path / "index"))
+    corpus = _synthetic_corpus(5000)
+    for _ in range(3):
+        index.add(doc for _, doc in zip(range(5000 // 3), corpus))
+    queries = [f"w{n} w{n * 7 % 20000} w{n * 13 % 20000}" for n in range(1, 101)]
+    for q in queries[:5]:
+        index.search(q)  # warm the memory maps
+    timings = []
+    for q in queries:
+        started = time.perf_counter()
+        index.search(q)
+        timings.append(time.perf_counter() - started)
+    assert sorted(timings)[len(timings) // 2] < 0.01
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+import kubo_vectors
+from modules.cid import CHUNK_SIZE, MAX_LINKS, compute_cid, directory_cids, file_node
+
+VECTORS = kubo_vectors.load()
+FILES = [(e["name"], e["content"], v, e[f"v{v}"]) for e in VECTORS["files"] for v in (0, 1)]
+DIRS = [(e["name"], e["files"], v, e[f"v{v}"]) for e in VECTORS["directories"] for v in (0, 1)]
+
+
+def _dir_cid(files: dict, version: int) -> str:
+    return directory_cids({p: file_node(kubo_vectors.content(s), version) for p, s in files.items()}, version)[""]
+
+
+@pytest.mark.parametrize("name,spec,version,expected", FILES, ids=[f"{f[0]}-v{f[2]}" for f in FILES])
+def test_file_cids_match_kubo(name, spec, version, expected):
+    if expected is None:
+        pytest.skip("no kubo reference recorded (python tests/record_kubo_cids.py)")
+    assert compute_cid(kubo_vectors.content(spec), version) == expected
+
+
+@pytest.mark.parametrize("name,files,version,expected", DIRS, ids=[f"{d[0]}-v{d[2]}" for d in DIRS])
+def test_directory_cids_match_kubo(name, files, version, expected):
+    if expected is None:
+        pytest.skip("no kubo reference recorded (python tests/record_kubo_cids.py)")
+    assert _dir_cid(files, version) == expected
+
+
+@pytest.mark.parametrize("version", (0, 1))
+def test_against_local_kubo(tmp_path, version):
+    """Every fixture, recorded or not, against the installed kubo."""
+    if version not in kubo_vectors.versions():
+        pytest.skip(f"no kubo producing CIDv{version} installed (ipfs on PATH, or KUBO_LIB for v0)")
+    for n, entry in enumerate(VECTORS["files"]):
+        path = tmp_path / f"file-{n}"
+        path.write_bytes(kubo_vectors.content(entry["content"]))
+        assert compute_cid(path.read_bytes(), version) == kubo_vectors.kubo_cid(str(path), version), entry["name"]
+    for n, entry in enumerate(VECTORS["directories"]):
+        root = tmp_path / f"dir-{n}"
+        kubo_vectors.write_tree(str(root), entry["files"])
+        assert _dir_cid(entry["files"], version) == kubo_vectors.kubo_cid(str(root), version), entry["name"]
+
+
+@pytest.mark.parametrize("version", (0, 1))
+def test_streamed_and_short_reads_match_bytes(version):
+    data = kubo_vectors.content({"pattern": "stream", "size": 3 * CHUNK_SIZE + 17})
+
+    class _Trickle(io.RawIOBase):
+        """Returns at most 1000 bytes per read, like a socket."""
+        def __init__(self):
+            self._buf = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def read(self, size=-1):
+            return self._buf.read(min(size, 1000) if size >= 0 else 1000)
+
+    assert compute_cid(io.BytesIO(data), version) == compute_cid(data, version) == compute_cid(_Trickle(), version)
+
+
+def test_chunk_boundaries_change_the_cid():
+    one_chunk = compute_cid(bytes(CHUNK_SIZE))
+    assert compute_cid(bytes(CHUNK_SIZE + 1)) not in (one_chunk, compute_cid(bytes(CHUNK_SIZE - 1)))
+    wide = MAX_LINKS * CHUNK_SIZE
+    assert compute_cid(bytes(wide)) != compute_cid(bytes(wide + 1))
+
+
+@pytest.mark.parametrize("version", (0, 1))
+def test_subdirectory_cids_are_consistent(version):
+    files = {"images/0.png": b"a", "images/1.png": b"b", "metadata/0.json": b"{}"}
+    nodes = {p: file_node(d, version) for p, d in files.items()}
+    tree = directory_cids(nodes, version)
+    assert set(tree) == {"", "images", "metadata"}
+    assert tree["images"] == directory_cids({p.split("/", 1)[1]: n for p, n in nodes.items()
+                                             if p.startswith("images/")}, version)[""]
+    nodes["images/1.png"] = file_node(b"changed", version)
+    changed = directory_cids(nodes, version)
+    assert changed["metadata"] == tree["metadata"]
+    assert changed["images"] != tree["images"] and changed[""] != tree[""]
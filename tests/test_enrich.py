@@ -0,0 +1,104 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.enrich import Article, ArticleEnricher, extract_page_info, rank_articles
+
+BODY_KB = 256
+
+
+class _Pages(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay: float):
+        super().__init__(("127.0.0.1", 0), _Page)
+        self.delay = delay
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _Page(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.active += 1
+            srv.peak = max(srv.peak, srv.active)
+        try:
+            time.sleep(srv.delay)
+            if self.path == "/missing":
+                self.send_error(404)
+                return
+            topic = self.path.strip("/").replace("-", " ")
+            body = (f"<html><head><title>{topic}</title><meta name=\"description\" content=\"About {topic}.\">"
+                    f"</head><body>" + f"<p>{topic} in depth.</p>" * (BODY_KB * 1024 // 20) + "</body></html>")
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except ConnectionError:
+                pass
+        finally:
+            with srv.lock:
+                srv.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hosts():
+    servers = [_Pages(0.3) for _ in range(2)]
+    for s in servers:
+        threading.Thread(target=s.serve_forever, daemon=True).start()
+    yield servers
+    for s in servers:
+        s.shutdown()
+        s.server_close()
+
+
+def test_enrich_fetches_concurrently_within_per_host_limit(hosts):
+    candidates = [(f"R{i}", f"{hosts[i % 2].base}/topic-{i}") for i in range(8)]
+    enricher = ArticleEnricher(workers=8, per_host=2)
+    started = time.perf_counter()
+    articles = enricher.enrich(candidates)
+    wall = time.perf_counter() - started
+    assert [a.url for a in articles] == [u for _, u in candidates]  # search order kept
+    assert all(a.fetched and a.description == f"About topic {i}." for i, a in enumerate(articles))
+    assert wall < 8 * 0.3 / 2  # 2 hosts x 2 slots: ~2 rounds, not 8 sequential fetches
+    assert max(s.peak for s in hosts) == 2
+    assert enricher.stats["bytes"] < 8 * BODY_KB * 1024 / 4  # reads stop after the opening paragraphs
+
+
+def test_enrich_caches_and_survives_failures(hosts):
+    enricher = ArticleEnricher(workers=4)
+    good, bad = (f"{hosts[0].base}/cached-page", f"{hosts[0].base}/missing")
+    first = enricher.enrich([("A", good), ("B", bad, "kept snippet")])
+    assert first[0].fetched and not first[1].fetched
+    assert first[1] == Article("B", bad, "kept snippet")
+    enricher.enrich([("A", good), ("B", bad)])
+    assert enricher.stats["hits"] == 2  # failures are cached briefly too
+    assert enricher.stats["errors"] == 1
+
+
+def test_extract_page_info_prefers_meta_description():
+    html = ('<html><head><title>T</title><meta property="og:description" content="og">'
+            '<meta name="description" content="meta"></head><body><p>one</p><p>two</p></body></html>')
+    assert extract_page_info(html) == {"title": "T", "description": "meta", "text": "one two"}
+
+
+def test_rank_articles_against_consensus():
+    articles = [Article("Battery storage", "u1", "grid batteries"),
+                Article("Nurse triage", "u2", "AI triage for nurses in rural clinics"),
+                Article("Crop sensors", "u3", "soil moisture sensors")]
+    ranked = rank_articles(articles, "AI-assisted triage for nurses at rural clinics")
+    assert ranked[0].url == "u2"
+    assert rank_articles(articles, "") == articles
@@ -0,0 +1,153 @@
+import os
+import json
+import threading
+
+import pytest
+
+from modules import ipfs
+from modules.cid import compute_cid, directory_cids, file_node
+
+
+def _pipe(data: bytes):
+    """Read end of an OS pipe fed with `data` from a thread (not seekable)."""
+    read_fd, write_fd = os.pipe()
+
+    def _feed():
+        with os.fdopen(write_fd, "wb") as w:
+            w.write(data)
+
+    threading.Thread(target=_feed, daemon=True).start()
+    return os.fdopen(read_fd, "rb")
+
+
+class _Generated:
+    """Minimal file-like object over a generator of chunks, with no seek()."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buf) < size:
+            try:
+                self._buf += next(self._chunks)
+            except StopIteration:
+                break
+        out, self._buf = (self._buf, b"") if size < 0 else (self._buf[:size], self._buf[size:])
+        return out
+
+
+def test_source_spools_non_seekable_streams():
+    data = os.urandom(1000)
+    with _pipe(data) as fh:
+        src = ipfs._Source(fh)
+        assert (src.start, src.size) == (0, 1000)
+        assert src.fh.read() == data
+        src.close()
+
+
+def test_ensure_pinned_from_pipe(pinata):
+    data = os.urandom(300 * 1024)  # two chunks
+    with _pipe(data) as fh:
+        uri, cid, uploaded = ipfs.ensure_pinned("pipe.bin", fh, "application/octet-stream")
+    assert uploaded
+    assert cid == compute_cid(data) == uri[len("ipfs://"):]
+    assert pinata.store[cid][""] == data
+
+
+def test_ensure_pinned_from_generator(pinata):
+    data = b"neuroweave " * 5000
+    _, cid, uploaded = ipfs.ensure_pinned("gen.txt", _Generated(data[i:i + 777] for i in range(0, len(data), 777)),
+                                          "text/plain")
+    assert uploaded
+    assert cid == compute_cid(data)
+    assert pinata.store[cid][""] == data
+
+
+def test_already_pinned_content_is_not_uploaded_again(pinata):
+    data = b"same bytes twice"
+    first = ipfs.ensure_pinned("a.txt", data, "text/plain")
+    second = ipfs.ensure_pinned("b.txt", data, "text/plain")
+    assert first[:2] == second[:2]
+    assert (first[2], second[2]) == (True, False)
+    assert pinata.stats.uploads == 1
+
+
+def _gateway(pinata, uri: str) -> bytes:
+    import requests
+    res = requests.get(f"{pinata.base_url}/ipfs/{uri[len('ipfs://'):]}", timeout=5)
+    res.raise_for_status()
+    return res.content
+
+
+def test_pinned_cid_matches_kubo_reference(pinata):
+    # the mock computes CIDs with modules.cid too, so pin against a CID kubo produced
+    _, cid, _ = ipfs.ensure_pinned("hello.txt", b"hello world\n", "text/plain")
+    assert cid == "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+
+
+def test_pin_collection_is_one_upload_with_resolvable_uris(pinata):
+    images = [os.urandom(300 * 1024), b"small image"]
+    items = [{"metadata": {"name": f"NeuroWeave #{n}"}, "image": (f"art{n}.PNG", data, "image/png")}
+             for n, data in enumerate(images)]
+    items.append({"metadata": {"name": "text only"}})
+    minted = ipfs.pin_collection(items, "drop-1")
+
+    assert pinata.stats.uploads == 1 and pinata.stats.files == 5
+    assert [m["metadata"]["name"] for m in minted] == ["NeuroWeave #0", "NeuroWeave #1", "text only"]
+    for n, m in enumerate(minted):
+        metadata = json.loads(_gateway(pinata, m["token_uri"]))
+        assert metadata == m["metadata"]
+        if n < len(images):
+            assert m["image_uri"] == metadata["image"] and m["image_uri"].endswith(f"/{n}.png")
+            assert _gateway(pinata, m["image_uri"]) == images[n]
+        else:
+            assert m["image_uri"] is None and "image" not in metadata
+
+    again = ipfs.pin_collection(items, "drop-1")
+    assert [m["token_uri"] for m in again] == [m["token_uri"] for m in minted]
+    assert pinata.stats.uploads == 1  # the directory CID was already pinned
+
+
+def test_pin_collection_rejects_a_root_cid_other_than_the_local_one(pinata, monkeypatch):
+    pin_files = ipfs._pin_files
+    monkeypatch.setattr(ipfs, "_pin_files", lambda *args, **kwargs: compute_cid(pin_files(*args, **kwargs).encode()))
+    items = [{"metadata": {"name": "one"}, "image": ("art.png", b"pixels", "image/png")}]
+    with pytest.raises(RuntimeError, match="local CID"):
+        ipfs.pin_collection(items, "drop-2")
+
+
+def test_pin_directory_dedupes_against_pinata_pin_list(pinata, tmp_path, monkeypatch):
+    items = [("a.txt", b"a", "text/plain"), ("sub/b.txt", b"b", "text/plain")]
+    first = ipfs.pin_directory(items, "tree")
+    assert first.uploaded and first.cid == directory_cids({p: file_node(d) for p, d, _ in items})[""]
+    # a fresh install (empty local index) still finds the pin through pinList
+    monkeypatch.setattr(ipfs, "_index", ipfs.PinIndex(str(tmp_path / "other.sqlite")))
+    second = ipfs.pin_directory(items, "tree")
+    assert not second.uploaded and second.cid == first.cid
+    assert pinata.stats.uploads == 1 and pinata.stats.pin_lists >= 1
+    assert _gateway(pinata, second.uris["sub/b.txt"]) == b"b"
+
+
+def test_nft_pin_job_uris_are_known_up_front(pinata):
+    job = ipfs.NFTPinJob({"name": "one"}, ("art.png", b"pixels", "image/png"))
+    assert job.image_uri == f"ipfs://{compute_cid(b'pixels')}"
+    assert job.wait() == {"image": True, "metadata": True}
+    assert json.loads(_gateway(pinata, job.metadata_uri)) == {"name": "one", "image": job.image_uri}
+
+
+def test_fetch_with_a_size_cap_reads_neither_cache_nor_gateway_past_it(pinata, tmp_path):
+    from modules import gateway
+    big, small = os.urandom(300 * 1024), b"small image"
+    big_uri, _ = ipfs.upload_to_pinata("big.png", big, "image/png")
+    small_uri, _ = ipfs.upload_to_pinata("small.png", small, "image/png")
+    cached = gateway.get_resolver()
+    cached.prime(big_uri, big)
+    uncached = gateway.GatewayResolver(gateways=[f"{pinata.base_url}/ipfs/"],
+                                       cache=gateway.ContentCache(str(tmp_path / "fresh")))
+    for resolver in (cached, uncached):
+        with pytest.raises((ValueError, RuntimeError)):
+            resolver.fetch(big_uri, max_bytes=100 * 1024)
+        assert resolver.fetch(small_uri, max_bytes=100 * 1024) == small
+        assert resolver.fetch(big_uri) == big
+    assert cached.stats["fetched"] == 1  # only the small image came from the gateway
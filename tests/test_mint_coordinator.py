@@ -0,0 +1,70 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+from modules.mint_coordinator import MintCoordinator, MintStore, SharedNonceManager
+
+
+def _uri(i: int) -> str:
+    return f"ipfs://bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi/{i}.json"
+
+
+@pytest.fixture
+def coordinator(mint_queue, tmp_path):
+    store = MintStore(str(tmp_path / "mints.sqlite"))
+    mint_queue.nonces = SharedNonceManager(mint_queue.web3, mint_queue.account.address, store)
+    return MintCoordinator(mint_queue, store)
+
+
+def _settled(coordinator, request_id: str, timeout: float = 10) -> dict:
+    deadline = time.time() + timeout
+    row = coordinator.status(request_id)
+    while row["status"] not in ("mined", "failed"):
+        if time.time() > deadline:
+            raise TimeoutError(row)
+        time.sleep(0.05)
+        row = coordinator.status(request_id)
+    return row
+
+
+def test_a_slow_upload_takes_no_nonce_until_it_finishes(coordinator):
+    me = coordinator.queue.account.address
+    uploaded = threading.Event()
+    slow = coordinator.request(me, _uri(0), "slow", before=lambda: uploaded.wait(10) and {"pinned": True})
+    rows = [_settled(coordinator, coordinator.request(me, _uri(i), f"s{i}")) for i in (1, 2)]
+    assert [(r["status"], r["nonce"]) for r in rows] == [("mined", 0), ("mined", 1)]
+    assert coordinator.status(slow)["status"] == "pinning"
+    uploaded.set()
+    row = _settled(coordinator, slow)
+    assert (row["status"], row["nonce"], row["detail"]["pinned"]) == ("mined", 2, True)
+    assert coordinator.queue.stats["replaced"] == 0
+
+
+def test_a_failed_upload_sends_nothing(coordinator, chain):
+    me = coordinator.queue.account.address
+
+    def _down():
+        raise RuntimeError("pinata is down")
+
+    row = _settled(coordinator, coordinator.request(me, _uri(0), "a", before=_down))
+    assert (row["status"], row["nonce"]) == ("failed", None) and "pinata is down" in row["error"]
+    row = _settled(coordinator, coordinator.request(me, _uri(1), "b"))
+    assert (row["status"], row["nonce"]) == ("mined", 0)
+    assert chain.chain.nonces[me] == 1  # no self-transfer was needed
+
+
+def test_nonce_of_a_process_that_died_before_sending_is_filled(coordinator, chain):
+    store, queue = coordinator.store, coordinator.queue
+    me = queue.account.address
+    dead = subprocess.Popen(["true"])
+    dead.wait()
+    orphan = store.create("gone", me, _uri(0))
+    store.update(orphan, status="sending", nonce=queue.nonces.next(), owner_pid=dead.pid)
+
+    restarted = MintCoordinator(queue, store)
+    assert restarted.status(orphan)["status"] == "failed"
+    row = _settled(restarted, restarted.request(me, _uri(1), "b"))
+    assert (row["status"], row["nonce"]) == ("mined", 1)
+    assert chain.chain.nonces[me] == 2
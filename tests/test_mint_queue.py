@@ -0,0 +1,199 @@
+import time
+
+import pytest
+import requests
+from eth_account import Account
+
+from modules.mint_queue import MINT_BATCH_GAS_FRACTION
+
+
+def _uri(i: int) -> str:
+    return f"ipfs://bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi/{i}.json"
+
+
+def test_no_answer_keeps_the_nonce_and_rebroadcasts(mint_queue, monkeypatch):
+    eth = mint_queue.web3.eth
+    send = eth.send_raw_transaction
+    calls = []
+
+    def _lost(raw):
+        calls.append(raw)
+        if len(calls) == 1:
+            raise requests.ConnectionError("connection reset")  # never reached the node
+        return send(raw)
+
+    monkeypatch.setattr(eth, "send_raw_transaction", _lost)
+    first = mint_queue.submit(mint_queue.account.address, _uri(0))
+    second = mint_queue.submit(mint_queue.account.address, _uri(1))
+    mint_queue.wait([first, second], timeout=10)
+    assert (first.status, second.status) == ("mined", "mined")
+    assert (first.nonce, second.nonce) == (0, 1)
+    assert mint_queue.stats["rebroadcast"] >= 1
+
+
+def test_timeout_after_delivery_is_not_sent_twice(mint_queue, monkeypatch):
+    eth = mint_queue.web3.eth
+    send = eth.send_raw_transaction
+
+    def _slow(raw):
+        send(raw)
+        raise requests.Timeout("read timed out")  # the node has it, the answer is lost
+
+    monkeypatch.setattr(eth, "send_raw_transaction", _slow)
+    job = mint_queue.submit(mint_queue.account.address, _uri(0))
+    monkeypatch.setattr(eth, "send_raw_transaction", send)
+    nxt = mint_queue.submit(mint_queue.account.address, _uri(1))
+    mint_queue.wait([job, nxt], timeout=10)
+    assert (job.status, nxt.status) == ("mined", "mined")
+    assert (job.nonce, nxt.nonce) == (0, 1)
+    assert job.receipt.transactionHash.hex().removeprefix("0x") == job.tx_hash.removeprefix("0x")
+
+
+def test_rejected_send_gives_the_nonce_back(mint_queue):
+    job = mint_queue.prepare(mint_queue.account.address, _uri(0))
+    job.gas = 10 ** 9  # over the block gas limit: the node refuses it
+    mint_queue._sign(job)
+    with pytest.raises(Exception, match="exceeds block gas limit"):
+        mint_queue.send(job)
+    assert job.status == "failed"
+    retry = mint_queue.submit(mint_queue.account.address, _uri(0))
+    assert retry.nonce == 0
+    assert retry.wait(timeout=10).status == 1
+
+
+def test_gas_estimates_are_kept_per_recipient_kind(mint_queue, chain):
+    from eth_account import Account
+
+    holder, fresh, receiver = (Account.create().address for _ in range(3))
+    chain.chain.add_receiver(receiver, gas=100_000)  # more than the 30% margin covers
+    first = mint_queue.submit(holder, _uri(0))
+    first.wait(timeout=10)
+    # same URI bucket: a holder's cached estimate must not be reused for a new holder or a contract
+    jobs = [mint_queue.submit(to, _uri(i)) for i, to in enumerate((holder, fresh, receiver), start=1)]
+    mint_queue.wait(jobs, timeout=10)
+    assert [j.status for j in jobs] == ["mined"] * 3
+    assert mint_queue.stats["regassed"] == 0
+    assert jobs[0].gas < jobs[1].gas < jobs[2].gas
+    assert mint_queue._recipients[holder] == mint_queue._recipients[fresh] == "holder"
+
+
+def test_pipelined_mints_get_consecutive_nonces(mint_queue):
+    me = mint_queue.account.address
+    jobs = mint_queue.submit_many([(me, _uri(i)) for i in range(12)])
+    assert [j.nonce for j in jobs] == list(range(12))
+    mint_queue.wait(jobs, timeout=15)
+    assert all(j.status == "mined" for j in jobs)
+    assert [t for j in jobs for t in j.token_ids] == list(range(12))
+    report = mint_queue.report(jobs)
+    assert report["mints"] == 12 and report["blocks"] <= 3
+
+
+def test_cancel_releases_or_fills_the_nonce(mint_queue, chain):
+    me = mint_queue.account.address
+    last = mint_queue.prepare(me, _uri(0))
+    mint_queue.cancel(last)
+    assert last.status == "failed"
+    middle = mint_queue.prepare(me, _uri(1))
+    after = mint_queue.prepare(me, _uri(2))
+    assert (middle.nonce, after.nonce) == (0, 1)  # the released nonce was handed out again
+    mint_queue.cancel(middle)  # not the latest: a self-transfer takes nonce 0
+    mint_queue.send(after)
+    assert after.wait(timeout=10).status == 1
+    assert chain.chain.nonces[me] == 2
+
+
+def test_stuck_mint_is_replaced_with_higher_fees(mint_queue, chain):
+    mint_queue.stuck_after = 0.5
+    job = mint_queue.prepare(mint_queue.account.address, _uri(0))
+    chain.chain.config.min_tip = 3 * 10 ** 9  # the market jumps: the tip we signed no longer gets included
+    mint_queue.send(job)
+    assert job.wait(timeout=15).status == 1
+    assert mint_queue.stats["replaced"] >= 1
+    assert len(job.hashes) >= 2 and job.receipt.transactionHash.to_0x_hex() == job.hashes[-1]
+    assert job.fees[1] >= chain.chain.config.min_tip
+
+
+def test_dropped_transactions_are_rebroadcast(mint_queue, chain):
+    chain.chain.config.drop_rate = 0.5
+    me = mint_queue.account.address
+    jobs = mint_queue.submit_many([(me, _uri(i)) for i in range(6)])
+    mint_queue.wait(jobs, timeout=20)
+    assert all(j.status == "mined" for j in jobs)
+    assert chain.chain.dropped >= 1 and mint_queue.stats["rebroadcast"] >= 1
+
+
+def test_batches_are_chunked_to_fit_the_block_gas_limit(mint_queue, chain):
+    chain.chain.config.block_gas_limit = 1_500_000
+    while mint_queue.web3.eth.get_block("latest")["gasLimit"] != 1_500_000:
+        time.sleep(0.05)  # batch_size reads the limit from the latest block
+    uris = [_uri(i) for i in range(40)]
+    size = mint_queue.batch_size(mint_queue.account.address, uris)
+    jobs = mint_queue.submit_batch(mint_queue.account.address, uris)
+    assert len(jobs) == -(-len(uris) // size) > 1
+    assert all(j.function == "safeMintBatchTo" for j in jobs)
+    assert all(j.gas <= 1_500_000 * MINT_BATCH_GAS_FRACTION for j in jobs)
+    mint_queue.wait(jobs, timeout=20)
+    assert all(j.status == "mined" and j.receipt.gasUsed <= j.gas for j in jobs)
+    assert [t for j in jobs for t in j.token_ids] == list(range(len(uris)))
+
+
+def test_batch_to_many_recipients_keeps_their_order(mint_queue):
+    me = mint_queue.account.address
+    others = [Account.create().address for _ in range(3)]
+    recipients = [others[i % 3] if i % 2 else me for i in range(10)]
+    jobs = mint_queue.submit_batch(recipients, [_uri(i) for i in range(10)])
+    assert [j.function for j in jobs] == ["safeMintBatch"]
+    mint_queue.wait(jobs, timeout=10)
+    assert jobs[0].token_ids == list(range(10))
+    minted = mint_queue.contract.events.Transfer().process_receipt(jobs[0].receipt)
+    assert [(e["args"]["to"], e["args"]["tokenId"]) for e in minted] == list(zip(recipients, range(10)))
+
+
+def test_batches_cost_less_modelled_gas_per_token_than_single_mints(mint_queue):
+    # mock_chain's gas model, not an EVM: this checks the queue reports it, not the contract's cost
+    me = mint_queue.account.address
+    singles = mint_queue.submit_many([(me, _uri(i)) for i in range(5)])
+    mint_queue.wait(singles, timeout=10)
+    batch = mint_queue.submit_batch(me, [_uri(i) for i in range(5, 25)])
+    mint_queue.wait(batch, timeout=10)
+    assert mint_queue.report(batch)["gas_per_token"] < mint_queue.report(singles)["gas_per_token"]
+
+
+def test_nonce_too_low_moves_past_nonces_prepared_jobs_hold(mint_queue):
+    me = mint_queue.account.address
+    first = mint_queue.prepare(me, _uri(0))
+    second = mint_queue.prepare(me, _uri(1))
+    # the key is used elsewhere too: nonce 0 gets mined behind the queue's back
+    outside = mint_queue.account.sign_transaction({
+        "to": me, "value": 0, "nonce": 0, "gas": 21000, "maxFeePerGas": first.fees[0],
+        "maxPriorityFeePerGas": first.fees[1], "chainId": mint_queue.chain_id})
+    eth = mint_queue.web3.eth
+    eth.wait_for_transaction_receipt(eth.send_raw_transaction(outside.raw_transaction), timeout=5)
+    mint_queue.send(first)
+    mint_queue.send(second)
+    mint_queue.wait([first, second], timeout=10)
+    assert (first.nonce, second.nonce) == (2, 1)  # not the chain's count (1), which `second` holds
+    assert mint_queue.stats["renonced"] == 1
+
+
+def test_unfilled_gap_is_retried_instead_of_resyncing(mint_queue, monkeypatch):
+    me = mint_queue.account.address
+    cancelled = mint_queue.prepare(me, _uri(0))
+    held = mint_queue.prepare(me, _uri(1))
+    eth = mint_queue.web3.eth
+    send = eth.send_raw_transaction
+    calls = []
+
+    def _lost_once(raw):
+        calls.append(raw)
+        if len(calls) == 1:
+            raise requests.ConnectionError("connection reset")
+        return send(raw)
+
+    monkeypatch.setattr(eth, "send_raw_transaction", _lost_once)
+    mint_queue.cancel(cancelled)  # not the latest nonce, and the filling self-transfer is lost
+    assert set(mint_queue._gaps) == {0}
+    later = mint_queue.prepare(me, _uri(2))
+    assert later.nonce == 2  # re-reading the chain (0) would collide with `held`
+    mint_queue.wait([mint_queue.send(held), mint_queue.send(later)], timeout=10)
+    assert not mint_queue._gaps
@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from modules import search
+from modules.bench import _full_tree_parse
+from modules.search import decode_duck_url, parse_results
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "duckduckgo")
+PAGES = sorted(n for n in os.listdir(FIXTURES) if n.endswith(".html"))
+
+
+def _page(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_strained_parse_matches_full_tree_minus_ads(name):
+    html = _page(name)
+    results = parse_results(html)
+    organic = [(t, u) for t, u in _full_tree_parse(html) if "duckduckgo.com/y.js" not in u]
+    assert [(r.title, r.url) for r in results] == organic
+    assert len(results) == 10
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_results_have_real_urls_and_snippets(name):
+    for r in parse_results(_page(name)):
+        assert r.url.startswith("https://") and "duckduckgo.com" not in r.url
+        assert r.title and r.snippet
+
+
+def test_decode_duck_url():
+    assert decode_duck_url("//duckduckgo.com/l/?uddg=https%3A%2F%2Fexample.org%2Fa%3Fb%3D1&rut=x") == \
+        "https://example.org/a?b=1"
+    assert decode_duck_url("https://example.org/plain") == "https://example.org/plain"
+
+
+def test_page_without_results_region():
+    html = ('<html><body><a class="result__a" href="https://example.org/x">X</a>'
+            '<a class="result__snippet">about x</a></body></html>')
+    assert [tuple(r) for r in parse_results(html)] == [("X", "https://example.org/x", "about x")]
+
+
+class _Duck(ThreadingHTTPServer):
+    """Local DuckDuckGo stand-in: counts requests per query; "boom" queries fail with a 500."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _DuckPage)
+        self.requests = Counter()
+        self.arrived = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+
+class _DuckPage(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        self.server.requests[query] += 1
+        self.server.arrived.set()
+        self.server.release.wait(10)
+        if query.startswith("boom"):
+            self.send_error(500)
+            return
+        data = (f'<div id="links"><a class="result__a" href="https://example.org/{query.replace(" ", "-")}">'
+                f'{query}</a><a class="result__snippet">About {query}.</a></div>').encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def duck(monkeypatch):
+    server = _Duck()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(search, "SEARCH_URL", f"http://127.0.0.1:{server.server_port}/html/")
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_results_are_cached_per_normalized_query_until_the_ttl(duck):
+    backend = search.DuckDuckGoSearch(ttl=0.3)
+    first = backend.search("AI  Triage")
+    assert first == [search.SearchResult("ai triage", "https://example.org/ai-triage", "About ai triage.")]
+    assert backend.search("ai triage ") == first
+    assert duck.requests["ai triage"] == 1 and backend.stats["hits"] == 1
+    time.sleep(0.35)
+    assert backend.search("ai triage") == first
+    assert duck.requests["ai triage"] == 2
+
+
+def test_least_recently_used_query_is_evicted(duck):
+    backend = search.DuckDuckGoSearch(max_entries=2)
+    for query in ("a1", "b1", "a1", "c1"):  # the hit on a1 makes b1 the oldest
+        backend.search(query)
+    backend.search("a1")
+    assert duck.requests == {"a1": 1, "b1": 1, "c1": 1}
+    backend.search("b1")
+    assert duck.requests["b1"] == 2
+
+
+def _together(duck, backend, query, waiters):
+    """One search, then `waiters` more once its request is held at the server; every outcome, in order."""
+    outcomes = [None] * (waiters + 1)
+
+    def _run(i):
+        try:
+            outcomes[i] = backend.search(query)
+        except Exception as e:
+            outcomes[i] = e
+
+    duck.release.clear()
+    threads = [threading.Thread(target=_run, args=(i,)) for i in range(waiters + 1)]
+    threads[0].start()
+    assert duck.arrived.wait(5)
+    for t in threads[1:]:
+        t.start()
+    deadline = time.time() + 5
+    while backend.stats["coalesced"] < waiters and time.time() < deadline:
+        time.sleep(0.01)
+    duck.release.set()
+    for t in threads:
+        t.join(5)
+    return outcomes
+
+
+def test_concurrent_identical_queries_share_one_fetch(duck):
+    backend = search.DuckDuckGoSearch()
+    outcomes = _together(duck, backend, "rural clinics", 4)
+    assert duck.requests["rural clinics"] == 1
+    assert backend.stats["coalesced"] == 4 and backend.stats["misses"] == 1
+    assert all(o == outcomes[0] for o in outcomes) and outcomes[0][0].url == "https://example.org/rural-clinics"
+
+
+def test_waiters_get_the_owners_error_and_failures_are_not_cached(duck):
+    backend = search.DuckDuckGoSearch()
+    outcomes = _together(duck, backend, "boom", 3)
+    assert duck.requests["boom"] == 1 and backend.stats["errors"] == 1
+    assert all(isinstance(o, requests.HTTPError) for o in outcomes)
+    assert len({id(o) for o in outcomes}) == 1  # the waiters get the owner's exception
+    with pytest.raises(requests.HTTPError):
+        backend.search("boom")
+    assert duck.requests["boom"] == 2